@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Routage par affinité : un même projet (fichier principal + liste des chemins,
+voir projets.project_affinity_key) est envoyé de préférence au même esclave, qui
+a déjà ses objets compilés dans cache_projets. Les fichiers seuls n'ont pas de
+cache sur l'esclave : ils restent routés par charge.
+
+ - Anneau de hachage cohérent sur les esclaves (plusieurs points virtuels par
+   esclave) : à l'ajout ou au retrait d'un esclave, seules les clés de cet
+   esclave changent de place (environ 1/N des clés)
+ - Charge bornée : un esclave n'est retenu que si sa charge reste sous
+   AFFINITY_BALANCE fois la moyenne ; une clé très demandée déborde sur les
+   esclaves suivants de l'anneau au lieu de saturer son esclave attitré
+ - Statistiques par esclave : jobs attitrés, servis chez lui (succès), reçus
+   d'autres clés par débordement
+"""
+
+import math
+import bisect
+import hashlib
+import threading
+
+VIRTUAL_NODES = 160
+
+
+def _point(value):
+    """Position sur l'anneau (déterministe d'un processus à l'autre, contrairement à hash())."""
+    return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], "big")
+
+
+class HashRing:
+    """Anneau de hachage cohérent ; les membres sont des adresses (ip, port)."""
+
+    def __init__(self, virtual_nodes=VIRTUAL_NODES):
+        self.virtual_nodes = virtual_nodes
+        self.members = frozenset()
+        self.changes = 0
+        self._points = []     # positions triées
+        self._owners = []     # membre de chaque position
+
+    def update(self, members):
+        """Reconstruit l'anneau si l'ensemble des membres a changé."""
+        members = frozenset(members)
+        if members == self.members:
+            return False
+        ring = sorted((_point(f"{ip}:{port}#{i}"), (ip, port))
+                      for ip, port in members for i in range(self.virtual_nodes))
+        self._points = [p for p, _ in ring]
+        self._owners = [m for _, m in ring]
+        self.members = members
+        self.changes += 1
+        return True
+
+    def preference(self, key):
+        """Membres dans l'ordre de l'anneau à partir de la clé (le premier est l'esclave attitré)."""
+        if not self._points:
+            return []
+        start = bisect.bisect(self._points, _point(key))
+        order = []
+        for i in range(len(self._owners)):
+            owner = self._owners[(start + i) % len(self._owners)]
+            if owner not in order:
+                order.append(owner)
+                if len(order) == len(self.members):
+                    break
+        return order
+
+
+def bounded_order(preference, loads, balance):
+    """
+    Ordre de l'anneau, en ne gardant en tête que les membres sous la borne de charge
+    ceil(balance * (charge totale + 1) / N) ; les autres suivent, du moins chargé au plus chargé.
+    """
+    if not preference:
+        return []
+    bound = math.ceil(balance * (sum(loads.get(m, 0) for m in preference) + 1) / len(preference))
+    under = [m for m in preference if loads.get(m, 0) + 1 <= bound]
+    over = sorted((m for m in preference if m not in under), key=lambda m: loads.get(m, 0))
+    return under + over
+
+
+class AffinityStats:
+    """Compteurs de routage par affinité, par esclave (thread-safe)."""
+
+    def __init__(self):
+        self._slaves = {}
+        self._lock = threading.Lock()
+
+    def record(self, home, served):
+        with self._lock:
+            st = self._slaves.setdefault(home, {"home": 0, "hits": 0, "spill_in": 0})
+            st["home"] += 1
+            if served == home:
+                st["hits"] += 1
+            else:
+                self._slaves.setdefault(served, {"home": 0, "hits": 0, "spill_in": 0})["spill_in"] += 1
+
+    def forget(self, addr):
+        with self._lock:
+            self._slaves.pop(addr, None)
+
+    def get(self, addr):
+        with self._lock:
+            return dict(self._slaves.get(addr, {"home": 0, "hits": 0, "spill_in": 0}))
+
+    def totals(self):
+        with self._lock:
+            home = sum(st["home"] for st in self._slaves.values())
+            hits = sum(st["hits"] for st in self._slaves.values())
+        return home, hits
+
+
+def format_affinity(st):
+    """Fragment de ligne GET_INFO pour un esclave."""
+    if not st["home"] and not st["spill_in"]:
+        return ""
+    rate = f"{st['hits'] / st['home']:.0%}" if st["home"] else "-"
+    return f", affinité {st['hits']}/{st['home']} ({rate}), {st['spill_in']} débordé(s) reçus"
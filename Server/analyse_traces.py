@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Analyse des traces écrites par le maître et les esclaves (traces/*.jsonl*).
+
+ - Agrégat par étape (nœud + span) : nombre, total, moyenne, p95, max
+ - Chronologie des N jobs les plus lents, ou d'un job précis (--trace)
+
+Exemples :
+    python analyse_traces.py                   # lit ./traces
+    python analyse_traces.py traces/ --top 5
+    python analyse_traces.py --trace 3f2a...
+"""
+
+import os
+import sys
+import json
+import glob
+import argparse
+from collections import defaultdict
+
+
+def iter_trace_files(paths):
+    """Fichiers de traces (y compris ceux issus de la rotation : .jsonl.1, .jsonl.2 ...)."""
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(glob.glob(os.path.join(path, "*.jsonl*")))
+        elif os.path.isfile(path):
+            yield path
+
+
+def load_spans(paths):
+    spans = []
+    for path in iter_trace_files(paths):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    print(f"[ATTENTION] Ligne invalide ignorée dans {path}", file=sys.stderr)
+    return spans
+
+
+def node_kind(node):
+    """esclave_6001 -> esclave (pour agréger tous les esclaves ensemble)."""
+    return node.split("_", 1)[0]
+
+
+def percentile(sorted_values, p):
+    k = (len(sorted_values) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def aggregate(spans):
+    """Statistiques par (type de nœud, étape), triées par temps total décroissant."""
+    durations = defaultdict(list)
+    for span in spans:
+        if span["span"] != "job":
+            durations[(node_kind(span["node"]), span["span"])].append(span["dur"])
+
+    rows = []
+    for (kind, name), values in durations.items():
+        values.sort()
+        rows.append({
+            "node": kind, "span": name, "count": len(values),
+            "total": sum(values), "mean": sum(values) / len(values),
+            "p95": percentile(values, 95), "max": values[-1],
+        })
+    rows.sort(key=lambda r: r["total"], reverse=True)
+    return rows
+
+
+def group_by_trace(spans):
+    traces = defaultdict(list)
+    for span in spans:
+        traces[span["trace"]].append(span)
+    for items in traces.values():
+        items.sort(key=lambda s: s["start"])
+    return traces
+
+
+def trace_duration(items):
+    """Durée de bout en bout : span 'job' du maître si présent, sinon étendue des spans."""
+    for span in items:
+        if span["span"] == "job" and node_kind(span["node"]) == "maitre":
+            return span["dur"]
+    return max(s["start"] + s["dur"] for s in items) - min(s["start"] for s in items)
+
+
+def print_timeline(trace_id, items):
+    t0 = items[0]["start"]
+    print(f"\nTrace {trace_id} ({trace_duration(items):.3f} s)")
+    for span in items:
+        attrs = span.get("attrs") or {}
+        extra = " ".join(f"{k}={v}" for k, v in attrs.items())
+        print(f"  +{span['start'] - t0:8.3f}s  {span['node']:<16} {span['span']:<20} "
+              f"{span['dur']:8.3f}s  {extra}")
+
+
+def print_aggregate(rows):
+    print(f"{'nœud':<10} {'étape':<20} {'nb':>6} {'total(s)':>10} {'moy(s)':>9} {'p95(s)':>9} {'max(s)':>9}")
+    for r in rows:
+        print(f"{r['node']:<10} {r['span']:<20} {r['count']:>6} {r['total']:>10.3f} "
+              f"{r['mean']:>9.3f} {r['p95']:>9.3f} {r['max']:>9.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse des traces de jobs (maître/esclaves).")
+    parser.add_argument("paths", nargs="*", default=["traces"], help="fichiers ou répertoires de traces")
+    parser.add_argument("--top", type=int, default=10, help="nombre de jobs les plus lents à détailler")
+    parser.add_argument("--trace", help="afficher uniquement la chronologie de cette trace")
+    args = parser.parse_args(argv)
+
+    spans = load_spans(args.paths)
+    if not spans:
+        print("Aucune trace trouvée.")
+        return 1
+
+    traces = group_by_trace(spans)
+    if args.trace:
+        if args.trace not in traces:
+            print(f"Trace inconnue : {args.trace}")
+            return 1
+        print_timeline(args.trace, traces[args.trace])
+        return 0
+
+    print(f"{len(traces)} trace(s), {len(spans)} span(s)\n")
+    print_aggregate(aggregate(spans))
+
+    slowest = sorted(traces.items(), key=lambda kv: trace_duration(kv[1]), reverse=True)
+    for trace_id, items in slowest[:args.top]:
+        print_timeline(trace_id, items)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
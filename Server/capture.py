@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Capture du trafic reçu par le maître, pour le rejouer plus tard (client/rejeu.py).
+
+Fichier JSON Lines en ajout seul, une ligne par évènement :
+ - {"t": "src", "h": empreinte, "code": ...}        source, écrite une seule fois par empreinte
+ - {"t": "req", "ts": arrivée, "id": job, "lang": .., "file": .., "h": empreinte, "mode": "sync"|"async"|"projet"}
+ - {"t": "res", "ts": fin, "id": job, "lat": latence (s), "status": "ok"|"occupe"|"annule"|"erreur"}
+"""
+
+import os
+import json
+import time
+import threading
+
+from historique import source_digest
+
+CAPTURE_DIR = os.environ.get("CAPTURE_DIR", "captures")
+
+
+class TrafficCapture:
+    """Enregistreur de requêtes (thread-safe) ; sources dédupliquées par empreinte."""
+
+    def __init__(self, path):
+        self.path = path
+        self.requests = 0
+        self._seen = set()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path):
+            # Reprise d'une capture existante : ne pas réécrire les sources déjà présentes
+            for event in read_capture(path):
+                if event.get("t") == "src":
+                    self._seen.add(event["h"])
+        self._file = open(path, "a", encoding="utf-8")
+
+    @classmethod
+    def start_new(cls, directory=CAPTURE_DIR, suffix=""):
+        """Nouvelle capture horodatée ; `suffix` distingue les processus maîtres."""
+        name = time.strftime("capture_%Y%m%d_%H%M%S") + f"{suffix}.jsonl"
+        return cls(os.path.join(directory, name))
+
+    def _write(self, events):
+        lines = "".join(json.dumps(e, ensure_ascii=False, separators=(",", ":")) + "\n" for e in events)
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(lines)
+            self._file.flush()
+
+    def request(self, job_id, language, filename, code, mode="sync", arrival=None, digest=None):
+        digest = digest or source_digest(language, code)
+        events = []
+        with self._lock:
+            if digest not in self._seen:
+                self._seen.add(digest)
+                events.append({"t": "src", "h": digest, "code": code})
+            self.requests += 1
+        events.append({"t": "req", "ts": round(arrival or time.time(), 6), "id": job_id,
+                       "lang": language, "file": filename, "h": digest, "mode": mode})
+        self._write(events)
+
+    def result(self, job_id, latency, status):
+        self._write([{"t": "res", "ts": round(time.time(), 6), "id": job_id,
+                      "lat": round(latency, 6), "status": status}])
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_capture(path):
+    """Évènements d'un fichier de capture (les lignes incomplètes en fin de fichier sont ignorées)."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
@@ -0,0 +1,708 @@
+# -*- coding: utf-8 -*-
+"""
+Moteur d'exécution partagé par le serveur maître et les serveurs esclaves.
+
+Contient les helpers de sécurité (nom de fichier, répertoire de job, limites),
+la compilation/exécution annulable et le registre des jobs en cours.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import select
+import shutil
+import signal
+import socket
+import subprocess
+import threading
+from contextlib import suppress, contextmanager, ExitStack
+from concurrent.futures import ThreadPoolExecutor
+
+from traces import NO_TRACE
+
+##########################################
+# Helpers sécurité/ressources
+##########################################
+
+def safe_filename(filename: str, language: str) -> str:
+    """Nettoie et force l'extension selon le langage."""
+    base = os.path.basename(filename or "")
+    if not base:
+        base = f"main_{uuid.uuid4().hex}"
+    base = "".join(c for c in base if c.isalnum() or c in ("-","_","."))[:64]
+    lang = language.lower().lstrip(".")
+    ext_map = {"python": ".py", "py": ".py", "c": ".c", "cpp": ".cpp", "c++": ".cpp", "java": ".java"}
+    wanted = ext_map.get(lang, "")
+    root, cur = os.path.splitext(base)
+    if wanted and cur.lower() != wanted:
+        base = root + wanted
+    return base
+
+def make_job_dir(root="temp_codes") -> str:
+    d = os.path.join(root, "job_" + uuid.uuid4().hex)
+    os.makedirs(d, exist_ok=True)
+    return d
+
+# Taille maximale d'un fichier écrit par un programme, sorties comprises (RLIMIT_FSIZE)
+RUN_FILE_MAX_BYTES = 10*1024**2
+
+def _posix_limits():
+    """Limites (CPU/Mémoire/Fichier) pour Unix uniquement."""
+    if os.name != "nt":
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_CPU, (5, 5))            # 5s CPU
+            resource.setrlimit(resource.RLIMIT_AS, (256*1024**2,)*2)   # 256 MB
+            resource.setrlimit(resource.RLIMIT_FSIZE, (RUN_FILE_MAX_BYTES,)*2) # 10 MB
+        except Exception:
+            pass
+
+def _posix_compile_limits():
+    """Limites des compilateurs (Unix) : plus larges que celles des programmes."""
+    if os.name != "nt":
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_CPU, (30, 30))           # 30s CPU
+            resource.setrlimit(resource.RLIMIT_FSIZE, (64*1024**2,)*2)  # 64 MB
+            if COMPILE_MEMORY_MB > 0:
+                # Pas de plafond par défaut : la JVM de javac réserve beaucoup d'espace virtuel
+                resource.setrlimit(resource.RLIMIT_AS, (COMPILE_MEMORY_MB*1024**2,)*2)
+        except Exception:
+            pass
+
+##########################################
+# Étapes compilation / exécution
+##########################################
+COMPILE_SLOTS = int(os.environ.get("COMPILE_SLOTS", "2"))
+COMPILE_QUEUE = int(os.environ.get("COMPILE_QUEUE", "2"))
+RUN_SLOTS = int(os.environ.get("RUN_SLOTS", "4"))
+RUN_QUEUE = int(os.environ.get("RUN_QUEUE", "4"))
+COMPILE_MEMORY_MB = int(os.environ.get("COMPILE_MEMORY_MB", "0"))
+
+class StagePool:
+    """
+    Créneaux d'une étape du moteur (compilation ou exécution) : limite propre,
+    file d'attente propre et mesure de l'utilisation. Un job libère son créneau
+    de compilation avant de prendre un créneau d'exécution, donc la compilation
+    du job N+1 se recouvre avec l'exécution du job N.
+    `gate` (facultatif) : fabrique de context manager, appelée avec cancel_check
+    avant l'attente du créneau et gardée jusqu'à sa libération (le maître y prend
+    son créneau MAX_TASKS).
+    """
+
+    def __init__(self, name, limit, queue_max):
+        self.name = name
+        self.limit = limit
+        self.queue_max = queue_max
+        self.gate = None
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.wait_time = 0.0
+        self._busy_area = 0.0            # intégrale de `active` dans le temps
+        self._started = time.monotonic()
+        self._last_change = self._started
+        self._cond = threading.Condition()
+
+    def _account(self):
+        now = time.monotonic()
+        self._busy_area += self.active * (now - self._last_change)
+        self._last_change = now
+
+    def has_room(self):
+        """Vrai si un nouveau job peut entrer (créneau libre ou place dans la file)."""
+        with self._cond:
+            return self.active + self.waiting < self.limit + self.queue_max
+
+    def set_limit(self, limit):
+        with self._cond:
+            self._account()
+            self.limit = limit
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, cancel_check=None, trace=NO_TRACE):
+        wait_start = time.time()
+        t0 = time.monotonic()
+        with ExitStack() as stack:
+            with self._cond:
+                self.waiting += 1
+            try:
+                # Porte d'abord : son attente compte dans attente_<étape>, pas dans l'utilisation
+                if self.gate is not None:
+                    stack.enter_context(self.gate(cancel_check))
+                with self._cond:
+                    while self.active >= self.limit:
+                        self._cond.wait(0.5)
+                        if cancel_check is not None and cancel_check():
+                            raise JobCancelled()
+                    self._account()
+                    self.active += 1
+            finally:
+                with self._cond:
+                    self.waiting -= 1
+            waited = time.monotonic() - t0
+            with self._cond:
+                self.wait_time += waited
+            trace.record(f"attente_{self.name}", wait_start, waited)
+            try:
+                yield
+            finally:
+                with self._cond:
+                    self._account()
+                    self.active -= 1
+                    self.completed += 1
+                    self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            self._account()
+            elapsed = max(1e-9, self._last_change - self._started)
+            return {
+                "active": self.active, "limit": self.limit,
+                "waiting": self.waiting, "queue_max": self.queue_max,
+                "completed": self.completed,
+                "utilisation": round(self._busy_area / (elapsed * max(1, self.limit)), 4),
+                "mean_wait": round(self.wait_time / self.completed, 4) if self.completed else 0.0,
+            }
+
+COMPILE_POOL = StagePool("compilation", COMPILE_SLOTS, COMPILE_QUEUE)
+RUN_POOL = StagePool("execution", RUN_SLOTS, RUN_QUEUE)
+
+def first_stage(language):
+    """Première étape d'un job : compilation pour C/C++/Java, exécution pour Python."""
+    lang = language.lower().lstrip('.')
+    return RUN_POOL if lang in ("python", "py") else COMPILE_POOL
+
+def format_stage_stats(indent=" - "):
+    lines = []
+    for pool in (COMPILE_POOL, RUN_POOL):
+        st = pool.stats()
+        lines.append(
+            f"{indent}Étape {pool.name}: {st['active']}/{st['limit']} actifs, "
+            f"{st['waiting']}/{st['queue_max']} en file, utilisation {st['utilisation']:.0%}, "
+            f"attente moy. {st['mean_wait']:.3f}s, {st['completed']} terminés\n")
+    return "".join(lines)
+
+##########################################
+# Protocole
+##########################################
+
+def split_options(data: str):
+    """
+    Extrait les options préfixées d'une requête : JOB=xxx|TRACE=yyy|language|filename|code.
+    Retourne (dict des options en majuscules, reste de la requête).
+    """
+    options = {}
+    while True:
+        head, sep, rest = data.partition('|')
+        key, eq, value = head.partition('=')
+        if not sep or not eq or not key.isalnum():
+            return options, data
+        options[key.upper()] = value
+        data = rest
+
+# Les réponses d'un esclave commencent par une ligne d'en-tête :
+#   ESCLAVE {"status": "ok"|"plein", "running": .., "queued": .., "capacity": .., "queue_max": ..}
+SLAVE_HEADER_PREFIX = "ESCLAVE "
+
+def format_slave_header(status, load):
+    return SLAVE_HEADER_PREFIX + json.dumps(dict(load, status=status)) + "\n"
+
+def parse_slave_header(line):
+    """Décode une ligne d'en-tête esclave (sans saut de ligne) ; None si absente/invalide."""
+    if not line.startswith(SLAVE_HEADER_PREFIX):
+        return None
+    try:
+        return json.loads(line[len(SLAVE_HEADER_PREFIX):])
+    except ValueError:
+        return None
+
+# Dernière ligne de la sortie d'un job : ressources consommées, en JSON
+# (compilation_s, compilation_cpu_s, execution_s, execution_cpu_s, rss_max_ko)
+USAGE_PREFIX = "RESSOURCES "
+
+def format_usage_line(usage):
+    return (USAGE_PREFIX + json.dumps({k: round(v, 4) for k, v in usage.items()}) + "\n").encode('utf-8')
+
+##########################################
+# Jobs et annulation
+##########################################
+
+class JobCancelled(Exception):
+    """Levée quand un job est annulé (commande CANCEL ou client déconnecté)."""
+
+def peer_closed(sock) -> bool:
+    """
+    Vrai si la connexion avec le pair est rompue (reset, erreur). Une fin de lecture
+    (0 octet) n'en est pas une : le pair a pu fermer seulement son sens d'écriture
+    (shutdown(SHUT_WR)) et attendre la réponse.
+    """
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if readable:
+            sock.recv(1, socket.MSG_PEEK)
+        return False
+    except (OSError, ValueError):
+        return True
+
+class Job:
+    """Un job en cours : identifiant, évènement d'annulation et socket du demandeur."""
+
+    def __init__(self, job_id=None, client_socket=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.client_socket = client_socket
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        """Vérifie l'annulation explicite puis la déconnexion du demandeur."""
+        if self.cancel_event.is_set():
+            return True
+        if self.client_socket is not None and peer_closed(self.client_socket):
+            self.cancel_event.set()
+            return True
+        return False
+
+class JobRegistry:
+    """Jobs en cours indexés par identifiant, avec compteur d'annulations."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.cancelled_count = 0
+
+    def register(self, job):
+        with self._lock:
+            self._jobs[job.id] = job
+
+    def unregister(self, job):
+        with self._lock:
+            if self._jobs.get(job.id) is job:
+                del self._jobs[job.id]
+
+    def cancel(self, job_id) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        job.cancel()
+        return True
+
+    def record_cancelled(self):
+        with self._lock:
+            self.cancelled_count += 1
+
+    def __len__(self):
+        with self._lock:
+            return len(self._jobs)
+
+##########################################
+# Exécution de processus
+##########################################
+
+def kill_process_group(proc):
+    """Tue le processus et tous ses descendants (groupe de processus)."""
+    with suppress(Exception):
+        if os.name != "nt":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+
+# Suivi des processus de jobs en cours : objet avec track_job_process(pid) et
+# untrack_job_process(pid), branché par le maître (partage.SharedState) pour que
+# le superviseur tue les jobs d'un processus maître mort. None : pas de suivi.
+PROCESS_TRACKER = None
+
+def run_process(cmd, timeout, preexec=None, cancel_check=None, poll_interval=0.2,
+                stdout_path=None, stderr_path=None, usage=None, cwd=None):
+    """
+    Équivalent de subprocess.run(capture_output=True, text=True, timeout=...) mais
+    dans un groupe de processus dédié, tué en entier en cas de timeout ou d'annulation.
+    Avec stdout_path/stderr_path, les sorties vont directement dans ces fichiers
+    (pas de pipe ni de copie en mémoire) et stdout/stderr valent None.
+    Dans ce cas, sous POSIX, le processus est attendu par os.wait4 et `usage` (dict)
+    reçoit son temps CPU (utilisateur + système, descendants attendus compris)
+    et sa mémoire résidente maximale.
+    """
+    kwargs = {"cwd": cwd}
+    if os.name == "nt":
+        kwargs["creationflags"] = getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)
+    else:
+        kwargs["start_new_session"] = True
+        kwargs["preexec_fn"] = preexec
+
+    if stdout_path is None:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, **kwargs)
+        wait = proc.communicate
+    else:
+        with open(stdout_path, "wb") as out, open(stderr_path, "wb") as err:
+            proc = subprocess.Popen(cmd, stdout=out, stderr=err, **kwargs)
+
+        def wait(timeout):
+            if usage is None or not hasattr(os, "wait4"):
+                proc.wait(timeout)
+            else:
+                wait_with_usage(proc, timeout, usage)
+            return None, None
+
+    tracker = PROCESS_TRACKER
+    if tracker is not None:
+        tracker.track_job_process(proc.pid)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                stdout, stderr = wait(timeout=poll_interval)
+                return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+            except subprocess.TimeoutExpired:
+                cancelled = cancel_check is not None and cancel_check()
+                if cancelled or time.monotonic() >= deadline:
+                    kill_process_group(proc)
+                    with suppress(Exception):
+                        wait(timeout=2)
+                    if cancelled:
+                        raise JobCancelled()
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+    finally:
+        if tracker is not None:
+            tracker.untrack_job_process(proc.pid)
+
+def wait_with_usage(proc, timeout, usage):
+    """
+    Comme proc.wait(timeout), mais par os.wait4 pour récupérer le rusage du processus
+    (Popen.wait le perdrait). Attente par intervalles croissants, comme Popen.wait.
+    """
+    if proc.returncode is not None:
+        return proc.returncode
+    end = time.monotonic() + timeout
+    delay = 0.0005
+    while True:
+        pid, status, rusage = os.wait4(proc.pid, os.WNOHANG)
+        if pid:
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            rss = rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss
+            usage["cpu_s"] = rusage.ru_utime + rusage.ru_stime
+            usage["rss_max_ko"] = rss
+            return proc.returncode
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            raise subprocess.TimeoutExpired(proc.args, timeout)
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.05)
+
+##########################################
+# Sortie d'un job
+##########################################
+
+class JobOutput:
+    """
+    Sortie d'un job sans copie inutile : suite de morceaux envoyés dans l'ordre.
+     - bytes : texte produit par le serveur (en-têtes, messages d'erreur)
+     - str   : chemin d'un fichier du répertoire du job (envoyé par socket.sendfile)
+     - socket : réponse d'un esclave, relayée telle quelle jusqu'à sa fermeture
+    close() supprime le répertoire du job et ferme les sockets.
+    """
+
+    def __init__(self, parts=None, job_dir=None):
+        self.parts = list(parts or [])
+        self.job_dir = job_dir
+
+    @classmethod
+    def text(cls, text, job_dir=None):
+        return cls([text.encode('utf-8', errors='replace')], job_dir)
+
+    def send(self, sock):
+        for part in self.parts:
+            if isinstance(part, bytes):
+                sock.sendall(part)
+            elif isinstance(part, str):
+                with open(part, "rb") as f:
+                    sock.sendfile(f)
+            else:
+                relay_stream(part, sock)
+
+    def read_bytes(self):
+        chunks = []
+        for part in self.parts:
+            if isinstance(part, bytes):
+                chunks.append(part)
+            elif isinstance(part, str):
+                with open(part, "rb") as f:
+                    chunks.append(f.read())
+            else:
+                while True:
+                    chunk = part.recv(65536)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        for part in self.parts:
+            if isinstance(part, socket.socket):
+                with suppress(Exception):
+                    part.close()
+        if self.job_dir:
+            with suppress(Exception):
+                shutil.rmtree(self.job_dir)
+            self.job_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+RELAY_CHUNK = 1 << 20
+
+def relay_stream(src, dst, timeout=60):
+    """
+    Recopie src -> dst jusqu'à la fermeture de src, sans décoder. Sous Linux, les
+    octets passent par un pipe avec os.splice et ne remontent pas dans Python.
+    """
+    src.settimeout(timeout)
+    if hasattr(os, "splice") and dst.gettimeout() is None:
+        read_fd, write_fd = os.pipe()
+        try:
+            while True:
+                if not select.select([src], [], [], timeout)[0]:
+                    raise socket.timeout("esclave muet pendant l'envoi de la sortie")
+                try:
+                    n = os.splice(src.fileno(), write_fd, RELAY_CHUNK, flags=os.SPLICE_F_MOVE)
+                except BlockingIOError:
+                    continue
+                if n == 0:
+                    return
+                while n:
+                    n -= os.splice(read_fd, dst.fileno(), n, flags=os.SPLICE_F_MOVE)
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+
+    buffer = bytearray(RELAY_CHUNK)
+    view = memoryview(buffer)
+    while True:
+        n = src.recv_into(buffer)
+        if not n:
+            return
+        dst.sendall(view[:n])
+
+def _output_parts(exec_proc, stdout_path, stderr_path):
+    """En-têtes 'Sortie:'/'Erreurs:' autour des fichiers de sortie (même format qu'avant)."""
+    parts = [b"Sortie:\n", stdout_path, b"\n"]
+    stderr_size = os.path.getsize(stderr_path)
+    if stderr_size > 0:
+        parts += [b"Erreurs:\n", stderr_path, b"\n"]
+    # SIGXFSZ, ou fichier plein : Python et d'autres ignorent le signal et
+    # reçoivent EFBIG (OSError), la sortie est alors coupée sans signal
+    full = max(os.path.getsize(stdout_path), stderr_size) >= RUN_FILE_MAX_BYTES
+    if os.name != "nt" and (full or exec_proc.returncode == -signal.SIGXFSZ):
+        parts.append("Erreurs:\nSortie tronquée : taille maximale des fichiers atteinte.\n".encode('utf-8'))
+    return parts
+
+##########################################
+# Chaînes de compilation disponibles
+##########################################
+
+# Nom canonique de chaque langage accepté (alias compris)
+LANGUAGE_ALIASES = {"python": "python", "py": "python", "c": "c", "c++": "c++", "cpp": "c++",
+                    "java": "java"}
+LANGUAGE_LABELS = {"python": "Python", "c": "C", "c++": "C++", "java": "Java"}
+
+# Outils nécessaires par langage, et l'option qui affiche leur version
+TOOLCHAINS = {
+    "python": [(sys.executable, "--version")],
+    "c": [("gcc", "--version")],
+    "c++": [("g++", "--version")],
+    "java": [("javac", "-version"), ("java", "-version")],
+}
+
+_toolchains = None
+_tool_versions = {}
+_toolchains_lock = threading.Lock()
+
+def canonical_language(language):
+    """Nom canonique (python, c, c++, java) ou None si le langage est inconnu."""
+    return LANGUAGE_ALIASES.get(language.lower().lstrip('.'))
+
+def _probe_tool(tool, version_flag):
+    """Première ligne de la version de l'outil, ou None s'il est absent ou inutilisable."""
+    if shutil.which(tool) is None:
+        return None
+    try:
+        proc = subprocess.run([tool, version_flag], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if proc.returncode != 0:
+        return None
+    lines = (proc.stdout + "\n" + proc.stderr).strip().splitlines()
+    return lines[0].strip() if lines else tool
+
+def probe_toolchains(refresh=False):
+    """
+    Détecte une seule fois (en parallèle) les outils de chaque langage.
+    Retourne {langage canonique: version} pour les langages utilisables sur ce nœud.
+    """
+    global _toolchains, _tool_versions
+    with _toolchains_lock:
+        if _toolchains is not None and not refresh:
+            return _toolchains
+        tools = {tool for specs in TOOLCHAINS.values() for tool in specs}
+        with ThreadPoolExecutor(max_workers=len(tools)) as pool:
+            versions = dict(zip(tools, pool.map(lambda spec: _probe_tool(*spec), tools)))
+        _tool_versions = versions
+        _toolchains = {}
+        for lang, specs in TOOLCHAINS.items():
+            if all(versions[spec] for spec in specs):
+                _toolchains[lang] = versions[specs[0]]
+        return _toolchains
+
+def supported_languages():
+    return sorted(probe_toolchains())
+
+def missing_toolchain_message(language):
+    """Message d'erreur clair pour un langage inconnu ou sans outils sur ce nœud, sinon None."""
+    lang = canonical_language(language)
+    if lang is None:
+        return f"Erreur : langage non supporté : {language}.\n"
+    if lang not in probe_toolchains():
+        tools = ", ".join(tool for tool, flag in TOOLCHAINS[lang] if not _tool_versions.get((tool, flag)))
+        return f"Erreur : {LANGUAGE_LABELS[lang]} indisponible sur ce serveur ({tools} introuvable).\n"
+    return None
+
+def format_toolchains(indent=" - "):
+    available = probe_toolchains()
+    parts = [f"{LANGUAGE_LABELS[lang]} ({available[lang]})" if lang in available
+             else f"{LANGUAGE_LABELS[lang]} (absent)" for lang in TOOLCHAINS]
+    return f"{indent}Langages: {', '.join(parts)}\n"
+
+def build_commands(lang, filepath, job_dir):
+    """
+    Commandes d'un job : (commande de compilation ou None, timeout de compilation,
+    commande d'exécution, libellé du langage). None si le langage est inconnu.
+    """
+    exe = os.path.join(job_dir, "a.exe" if os.name == "nt" else "a.out")
+    if lang in ["python", "py"]:
+        return None, 0, [sys.executable, filepath], "Python"
+    elif lang in ["c"]:
+        return ["gcc", filepath, "-O2", "-s", "-o", exe], 15, [exe], "C"
+    elif lang in ["c++", "cpp"]:
+        return ["g++", filepath, "-O2", "-s", "-o", exe], 15, [exe], "C++"
+    elif lang in ["java"]:
+        class_name = os.path.splitext(os.path.basename(filepath))[0]
+        return ["javac", filepath, "-d", job_dir], 20, ["java", "-cp", job_dir, class_name], "Java"
+    return None
+
+def _with_usage(output, usage):
+    """Ajoute la ligne RESSOURCES en fin de sortie (si des mesures existent)."""
+    if usage:
+        output.parts.append(format_usage_line(usage))
+    return output
+
+def run_program(run_cmd, job_dir, lang, cancel_check=None, trace=NO_TRACE, timings=None, usage=None,
+                cwd=None):
+    """
+    Étape d'exécution d'un job déjà compilé (créneau RUN_POOL, limites, timeout 5 s).
+    Retourne les morceaux 'Sortie:'/'Erreurs:' du JobOutput ; durée et ressources
+    dans `timings` / `usage`.
+    """
+    if timings is None:
+        timings = {}
+    if usage is None:
+        usage = {}
+    preexec = _posix_limits if os.name != "nt" else None
+    stdout_path = os.path.join(job_dir, "stdout.txt")
+    stderr_path = os.path.join(job_dir, "stderr.txt")
+    run_usage = {}
+    with RUN_POOL.slot(cancel_check, trace):
+        t0 = time.perf_counter()
+        try:
+            with trace.span("execution", language=lang):
+                exec_proc = run_process(run_cmd, 5, preexec, cancel_check,
+                                        stdout_path=stdout_path, stderr_path=stderr_path,
+                                        usage=run_usage, cwd=cwd)
+        finally:
+            timings["execution"] = time.perf_counter() - t0
+            usage["execution_s"] = timings["execution"]
+            if "cpu_s" in run_usage:
+                usage["execution_cpu_s"] = run_usage["cpu_s"]
+                usage["rss_max_ko"] = run_usage["rss_max_ko"]
+    return _output_parts(exec_proc, stdout_path, stderr_path)
+
+def compile_and_run_to_files(language, filename, code, root="temp_codes", cancel_check=None,
+                             trace=NO_TRACE, timings=None, usage=None):
+    """
+    Compile/interprète le code selon le langage avec timeouts et limites.
+    Compilation et exécution passent chacune par leur propre pool (COMPILE_POOL, RUN_POOL).
+    La sortie du programme est écrite dans des fichiers du répertoire du job et
+    retournée sous forme de JobOutput, à envoyer puis fermer (suppression du répertoire).
+    Lève JobCancelled si `cancel_check()` devient vrai pendant l'exécution.
+    Les étapes compilation/exécution sont mesurées dans `trace`, et leurs durées
+    (hors attente de créneau) écrites dans `timings` s'il est fourni.
+    Les ressources consommées (durées, CPU, mémoire max) sont écrites dans `usage`
+    et ajoutées en dernière ligne de la sortie (voir USAGE_PREFIX).
+    """
+    if timings is None:
+        timings = {}
+    if usage is None:
+        usage = {}
+    timings.setdefault("compilation", 0.0)
+    timings.setdefault("execution", 0.0)
+    job_dir = make_job_dir(root)
+    filepath = os.path.join(job_dir, safe_filename(filename, language))
+
+    try:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(code)
+
+        lang = language.lower().lstrip('.')
+        missing = missing_toolchain_message(language)
+        if missing is not None:
+            return JobOutput.text(missing, job_dir)
+        commands = build_commands(lang, filepath, job_dir)
+        compile_cmd, compile_timeout, run_cmd, label = commands
+
+        if compile_cmd is not None:
+            compile_preexec = _posix_compile_limits if os.name != "nt" else None
+            compile_stderr = os.path.join(job_dir, "compilation_stderr.txt")
+            compile_usage = {}
+            with COMPILE_POOL.slot(cancel_check, trace):
+                t0 = time.perf_counter()
+                try:
+                    with trace.span("compilation", language=lang):
+                        comp = run_process(compile_cmd, compile_timeout, compile_preexec, cancel_check,
+                                           stdout_path=os.path.join(job_dir, "compilation_stdout.txt"),
+                                           stderr_path=compile_stderr, usage=compile_usage)
+                finally:
+                    timings["compilation"] = time.perf_counter() - t0
+                    usage["compilation_s"] = timings["compilation"]
+                    if "cpu_s" in compile_usage:
+                        usage["compilation_cpu_s"] = compile_usage["cpu_s"]
+            if comp.returncode != 0:
+                with open(compile_stderr, encoding="utf-8", errors="replace") as f:
+                    errors = f.read()
+                if not errors.endswith("\n"):
+                    errors += "\n"
+                return _with_usage(JobOutput.text(f"Erreur de compilation {label}:\n{errors}", job_dir), usage)
+
+        return _with_usage(JobOutput(run_program(run_cmd, job_dir, lang, cancel_check, trace,
+                                                 timings, usage), job_dir), usage)
+
+    except JobCancelled:
+        with suppress(Exception):
+            shutil.rmtree(job_dir)
+        raise
+    except subprocess.TimeoutExpired:
+        return _with_usage(JobOutput.text("Erreur : exécution dépassé le délai (timeout).\n", job_dir), usage)
+    except Exception as e:
+        return JobOutput.text(f"Erreur lors de l'execution : {str(e)}\n", job_dir)
+
+def compile_and_run(language, filename, code, root="temp_codes", cancel_check=None, trace=NO_TRACE):
+    """Comme compile_and_run_to_files, mais retourne la sortie complète sous forme de str."""
+    with compile_and_run_to_files(language, filename, code, root, cancel_check, trace) as output:
+        return output.read_bytes().decode('utf-8', errors='replace')
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Historique des durées de compilation et d'exécution, utilisé par l'ordonnanceur
+du maître (plus court job estimé d'abord).
+
+ - Par empreinte de source (langage + code) : moyennes glissantes des durées,
+   dans une table LRU de taille bornée
+ - Par langage : moyennes glissantes, utilisées pour un code jamais vu
+ - Suivi de la précision des estimations et des latences par mode d'ordonnancement
+ - Sauvegarde JSON (écriture atomique) rechargée au démarrage du maître
+ - Ressources consommées par langage (CPU, mémoire max, durées), non persistées
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Poids de la dernière mesure dans les moyennes glissantes
+EWMA_ALPHA = 0.3
+
+# Estimations (compilation, exécution) en secondes d'un langage jamais observé
+DEFAULT_ESTIMATES = {
+    "python": (0.0, 0.1), "py": (0.0, 0.1),
+    "c": (0.3, 0.05), "c++": (0.6, 0.05), "cpp": (0.6, 0.05),
+    "java": (1.0, 0.3),
+}
+UNKNOWN_ESTIMATE = (0.5, 0.5)
+
+
+def source_digest(language, code):
+    """Empreinte courte d'un code source (le langage fait partie de la clé)."""
+    h = hashlib.sha256(language.lower().encode('utf-8'))
+    h.update(b"\0")
+    h.update(code.encode('utf-8', errors='replace'))
+    return h.hexdigest()[:20]
+
+
+def _ewma(old, new):
+    return new if old is None else old + EWMA_ALPHA * (new - old)
+
+
+class RuntimeHistory:
+    """Durées observées par source et par langage, bornées en mémoire et persistées."""
+
+    def __init__(self, max_sources=5000, path=None):
+        self.max_sources = max_sources
+        self.path = path or None
+        self._sources = OrderedDict()   # empreinte -> [compilation, exécution, nombre]
+        self._languages = {}            # langage -> [compilation, exécution, nombre]
+        self._accuracy = {"count": 0, "abs_error": 0.0, "actual": 0.0, "within_50": 0,
+                          "by_origin": {}}
+        self._dirty = False
+        self._lock = threading.Lock()
+        if self.path:
+            self.load()
+
+    # ======================================================
+    #   Estimation / enregistrement
+    # ======================================================
+    def estimate(self, language, digest):
+        """
+        Retourne (compilation, exécution, origine) ; origine : "source" si ce code a
+        déjà été vu, "langage" si seul le langage est connu, sinon "defaut".
+        """
+        lang = language.lower().lstrip('.')
+        with self._lock:
+            entry = self._sources.get(digest)
+            if entry is not None:
+                self._sources.move_to_end(digest)
+                return entry[0], entry[1], "source"
+            entry = self._languages.get(lang)
+            if entry is not None:
+                return entry[0], entry[1], "langage"
+        compile_s, run_s = DEFAULT_ESTIMATES.get(lang, UNKNOWN_ESTIMATE)
+        return compile_s, run_s, "defaut"
+
+    def record(self, language, digest, compile_s, run_s, predicted=None, origin=None):
+        """Ajoute une mesure ; `predicted` (durée totale estimée) sert au suivi de précision."""
+        lang = language.lower().lstrip('.')
+        with self._lock:
+            entry = self._sources.get(digest)
+            if entry is None:
+                entry = self._sources[digest] = [None, None, 0]
+                while len(self._sources) > self.max_sources:
+                    self._sources.popitem(last=False)
+            else:
+                self._sources.move_to_end(digest)
+            for target in (entry, self._languages.setdefault(lang, [None, None, 0])):
+                target[0] = _ewma(target[0], compile_s)
+                target[1] = _ewma(target[1], run_s)
+                target[2] += 1
+
+            if predicted is not None:
+                actual = compile_s + run_s
+                acc = self._accuracy
+                acc["count"] += 1
+                acc["abs_error"] += abs(predicted - actual)
+                acc["actual"] += actual
+                if abs(predicted - actual) <= 0.5 * max(actual, 0.01):
+                    acc["within_50"] += 1
+                if origin:
+                    acc["by_origin"][origin] = acc["by_origin"].get(origin, 0) + 1
+            self._dirty = True
+
+    def stats(self):
+        with self._lock:
+            acc = dict(self._accuracy, by_origin=dict(self._accuracy["by_origin"]))
+            languages = {lang: {"compile_s": round(e[0], 4), "run_s": round(e[1], 4), "count": e[2]}
+                         for lang, e in self._languages.items()}
+            return {"sources": len(self._sources), "max_sources": self.max_sources,
+                    "languages": languages, "accuracy": acc}
+
+    # ======================================================
+    #   Persistance
+    # ======================================================
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"[ATTENTION] Historique illisible ({self.path}) : {e}")
+            return
+        with self._lock:
+            for digest, entry in data.get("sources", [])[-self.max_sources:]:
+                self._sources[digest] = list(entry)
+            self._languages = {lang: list(entry) for lang, entry in data.get("languages", {}).items()}
+
+    def save(self, force=False):
+        """Écrit l'historique si modifié (fichier temporaire puis renommage atomique)."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty and not force:
+                return
+            data = {"saved": time.time(),
+                    "sources": [[d, e] for d, e in self._sources.items()],
+                    "languages": self._languages}
+            self._dirty = False
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[ATTENTION] Sauvegarde de l'historique impossible : {e}")
+
+
+class LatencyStats:
+    """Latence moyenne des jobs (arrivée -> sortie prête) par mode d'ordonnancement."""
+
+    def __init__(self):
+        self._modes = {}
+        self._lock = threading.Lock()
+
+    def record(self, mode, latency, wait):
+        with self._lock:
+            st = self._modes.setdefault(mode, {"count": 0, "latency": 0.0, "wait": 0.0})
+            st["count"] += 1
+            st["latency"] += latency
+            st["wait"] += wait
+
+    def means(self):
+        with self._lock:
+            return {mode: {"count": st["count"],
+                           "latency": st["latency"] / st["count"],
+                           "wait": st["wait"] / st["count"]}
+                    for mode, st in self._modes.items() if st["count"]}
+
+
+def format_history_stats(history, latencies, scheduler, indent=" - "):
+    st = history.stats()
+    acc = st["accuracy"]
+    lines = [f"{indent}Ordonnancement: {scheduler}, historique {st['sources']}/{st['max_sources']} sources\n"]
+    if acc["count"]:
+        precision = max(0.0, 1 - acc["abs_error"] / acc["actual"]) if acc["actual"] else 0.0
+        origins = ", ".join(f"{k} {v}" for k, v in sorted(acc["by_origin"].items()))
+        lines.append(
+            f"{indent}Estimations: {acc['count']} jobs, erreur moy. {acc['abs_error'] / acc['count']:.3f}s, "
+            f"précision {precision:.0%}, {acc['within_50'] / acc['count']:.0%} à ±50% ({origins})\n")
+    means = latencies.means()
+    for mode, m in sorted(means.items()):
+        lines.append(f"{indent}Latence moyenne ({mode}): {m['latency']:.3f}s, "
+                     f"attente {m['wait']:.3f}s sur {m['count']} jobs\n")
+    if "fifo" in means and "sjf" in means and means["fifo"]["latency"] > 0:
+        gain = 1 - means["sjf"]["latency"] / means["fifo"]["latency"]
+        lines.append(f"{indent}Gain de latence moyenne sjf/fifo: {gain:.0%}\n")
+    return "".join(lines)
+
+
+class ResourceStats:
+    """Ressources consommées par les jobs (durées, CPU, mémoire max), agrégées par langage."""
+
+    def __init__(self):
+        self._languages = {}
+        self._lock = threading.Lock()
+
+    def record(self, language, usage, job_id=None):
+        if not usage:
+            return
+        lang = language.lower().lstrip('.')
+        with self._lock:
+            st = self._languages.setdefault(lang, {
+                "count": 0, "compilation_s": 0.0, "compilation_cpu_s": 0.0, "execution_s": 0.0,
+                "cpu_s": 0.0, "rss_ko": 0, "max_cpu": (0.0, None), "max_rss": (0, None)})
+            st["count"] += 1
+            st["compilation_s"] += usage.get("compilation_s", 0.0)
+            st["compilation_cpu_s"] += usage.get("compilation_cpu_s", 0.0)
+            st["execution_s"] += usage.get("execution_s", 0.0)
+            cpu = usage.get("execution_cpu_s", 0.0)
+            rss = usage.get("rss_max_ko", 0)
+            st["cpu_s"] += cpu
+            st["rss_ko"] += rss
+            # Jobs les plus gourmands : repérer les soumissions anormales
+            if cpu > st["max_cpu"][0]:
+                st["max_cpu"] = (cpu, job_id)
+            if rss > st["max_rss"][0]:
+                st["max_rss"] = (rss, job_id)
+
+    def stats(self):
+        with self._lock:
+            return {lang: dict(st) for lang, st in self._languages.items()}
+
+
+def format_resource_stats(resources, indent=" - "):
+    lines = []
+    for lang, st in sorted(resources.stats().items()):
+        n = st["count"]
+        max_cpu, cpu_job = st["max_cpu"]
+        max_rss, rss_job = st["max_rss"]
+        line = (f"{indent}Ressources ({lang}): {n} jobs, exécution moy. {st['execution_s'] / n:.3f}s, "
+                f"CPU moy. {st['cpu_s'] / n:.3f}s (max {max_cpu:.3f}s, job {cpu_job}), "
+                f"mémoire moy. {st['rss_ko'] / n / 1024:.1f} Mo (max {max_rss / 1024:.1f} Mo, job {rss_job})")
+        if st["compilation_s"]:
+            line += (f", compilation moy. {st['compilation_s'] / n:.3f}s "
+                     f"(CPU {st['compilation_cpu_s'] / n:.3f}s)")
+        lines.append(line + "\n")
+    return "".join(lines)
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Limites par client (adresse IP) à l'entrée du maître.
+
+ - Désactivées par défaut (0 = pas de limite) : à activer pour un maître exposé
+ - Connexions simultanées : au plus MAX_CLIENT_CONNECTIONS par adresse, vérifié
+   dans la boucle d'acceptation, avant tout thread, lecture ou écriture disque
+ - Débit : seau à jetons (RATE_LIMIT soumissions/s, rafale de RATE_BURST). Seules
+   les soumissions de jobs consomment un jeton : STATUS / FETCH / CANCEL / ADMIN
+   restent libres, un client asynchrone peut toujours suivre ses jobs
+ - Réglages, seaux et connexions dans des tableaux de taille fixe (adressage
+   ouvert par empreinte de l'adresse). Avec plusieurs processus maîtres, ils
+   sont en mémoire partagée (partage.SharedState) : la limite est globale.
+   Les connexions sont comptées par processus, celles d'un processus mort sont rendues
+ - Compteurs de refus par client, pour GET_INFO
+"""
+
+import time
+import hashlib
+import threading
+
+# Au-delà, les clients inactifs (seau plein, aucune connexion) sont oubliés
+MAX_TRACKED_CLIENTS = 10000
+# Emplacements de la table (marge pour l'adressage ouvert)
+TABLE_SIZE = 16384
+# Adresse IPv6 la plus longue
+ADDRESS_BYTES = 46
+
+RATE = "debit"
+CONNECTIONS = "connexions"
+
+
+def _client_key(client):
+    """Empreinte non nulle de l'adresse (la même dans tous les processus, contrairement à hash())."""
+    digest = hashlib.blake2b(client.encode('utf-8'), digest_size=8).digest()
+    return (int.from_bytes(digest, "big") >> 1) or 1
+
+
+def _local_array(typecode, size):
+    if typecode == 'c':
+        return bytearray(size)
+    return [0.0 if typecode == 'd' else 0] * size
+
+
+class ClientLimiter:
+    """
+    Seau à jetons et compteur de connexions par client (thread-safe). 0 = pas de limite.
+    Avec `state` (partage.SharedState), l'état est commun aux processus maîtres.
+    """
+
+    def __init__(self, rate, burst, max_connections, state=None, size=TABLE_SIZE):
+        array = state.array if state is not None else _local_array
+        self._state = state
+        self.workers = state.workers if state is not None else 1
+        self.size = size
+        self._settings = array('d', 3)        # débit, rafale, connexions max
+        self._totals = array('q', 4)          # acceptées, refus débit, refus connexions, clients suivis
+        self._keys = array('q', size)         # empreinte de l'adresse (0 : libre)
+        self._tokens = array('d', size)
+        self._last = array('d', size)         # dernière mise à jour du seau
+        self._rejects = array('i', 2 * size)  # refus débit, refus connexions
+        self._conns = array('i', size * self.workers)   # connexions ouvertes, par processus
+        self._addresses = array('c', size * ADDRESS_BYTES)
+        self._lock = state.new_lock() if state is not None else threading.Lock()
+        if state is not None:
+            state.reap_hooks.append(self._reap_worker)
+        self.configure(rate, burst, max_connections)
+
+    @property
+    def rate(self):
+        return self._settings[0]
+
+    @property
+    def burst(self):
+        return self._settings[1]
+
+    @property
+    def max_connections(self):
+        return int(self._settings[2])
+
+    @property
+    def admitted(self):
+        return self._totals[0]
+
+    @property
+    def rejected(self):
+        return {RATE: self._totals[1], CONNECTIONS: self._totals[2]}
+
+    def configure(self, rate=None, burst=None, max_connections=None):
+        with self._lock:
+            if rate is not None:
+                self._settings[0] = rate
+            if burst is not None:
+                self._settings[1] = burst
+            if max_connections is not None:
+                self._settings[2] = max_connections
+
+    # ======================================================
+    #   Table des clients (à appeler sous self._lock)
+    # ======================================================
+    def _worker(self):
+        return self._state.worker_index if self._state is not None else 0
+
+    def _connections(self, slot):
+        start = slot * self.workers
+        return sum(self._conns[start:start + self.workers])
+
+    def _address(self, slot):
+        raw = bytes(self._addresses[slot * ADDRESS_BYTES:(slot + 1) * ADDRESS_BYTES])
+        return raw.rstrip(b"\0").decode('utf-8', errors='replace')
+
+    def _find(self, client, now, create=True):
+        """Emplacement du client (créé au besoin, seau plein) ; None si absent ou table pleine."""
+        key = _client_key(client)
+        for attempt in range(2):
+            slot = key % self.size
+            for _ in range(self.size):
+                if self._keys[slot] == key:
+                    return slot
+                if not self._keys[slot]:
+                    break
+                slot = (slot + 1) % self.size
+            else:
+                slot = None
+            if not create:
+                return None
+            if slot is not None and self._totals[3] < MAX_TRACKED_CLIENTS:
+                self._keys[slot] = key
+                self._tokens[slot] = self.burst
+                self._last[slot] = now
+                self._rejects[2 * slot] = self._rejects[2 * slot + 1] = 0
+                encoded = client.encode('utf-8')[:ADDRESS_BYTES]
+                self._addresses[slot * ADDRESS_BYTES:(slot + 1) * ADDRESS_BYTES] = \
+                    encoded + b"\0" * (ADDRESS_BYTES - len(encoded))
+                self._totals[3] += 1
+                return slot
+            if attempt == 0:
+                self._prune(now)
+        return None
+
+    def _prune(self, now):
+        """Oublie les clients sans connexion dont le seau est de nouveau plein (reconstruit la table)."""
+        kept = []
+        for slot in range(self.size):
+            if not self._keys[slot]:
+                continue
+            refilled = not self.rate or self._tokens[slot] + (now - self._last[slot]) * self.rate >= self.burst
+            if self._connections(slot) or not refilled:
+                start = slot * self.workers
+                kept.append((self._keys[slot], self._tokens[slot], self._last[slot],
+                             self._rejects[2 * slot], self._rejects[2 * slot + 1],
+                             list(self._conns[start:start + self.workers]),
+                             bytes(self._addresses[slot * ADDRESS_BYTES:(slot + 1) * ADDRESS_BYTES])))
+            self._keys[slot] = 0
+        for slot in range(self.size * self.workers):
+            self._conns[slot] = 0
+        for key, tokens, last, rate_rejects, conn_rejects, conns, address in kept:
+            slot = key % self.size
+            while self._keys[slot]:
+                slot = (slot + 1) % self.size
+            self._keys[slot] = key
+            self._tokens[slot] = tokens
+            self._last[slot] = last
+            self._rejects[2 * slot], self._rejects[2 * slot + 1] = rate_rejects, conn_rejects
+            self._conns[slot * self.workers:(slot + 1) * self.workers] = conns
+            self._addresses[slot * ADDRESS_BYTES:(slot + 1) * ADDRESS_BYTES] = address
+        self._totals[3] = len(kept)
+
+    def _reap_worker(self, index):
+        """Rend les connexions d'un processus maître mort (appelé par SharedState.reap_worker)."""
+        with self._lock:
+            for slot in range(self.size):
+                self._conns[slot * self.workers + index] = 0
+
+    # ======================================================
+    #   Contrôles
+    # ======================================================
+    def admit(self, client):
+        """Compte une nouvelle connexion. None si acceptée, sinon CONNECTIONS."""
+        with self._lock:
+            slot = self._find(client, time.monotonic())
+            self._totals[0] += 1
+            if slot is None:
+                return None       # table pleine de clients actifs : accepté sans suivi
+            if self.max_connections and self._connections(slot) >= self.max_connections:
+                self._totals[0] -= 1
+                self._rejects[2 * slot + 1] += 1
+                self._totals[2] += 1
+                return CONNECTIONS
+            self._conns[slot * self.workers + self._worker()] += 1
+            return None
+
+    def charge(self, client):
+        """Prélève un jeton pour une soumission de job. None si accepté, sinon RATE."""
+        if not self.rate:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            slot = self._find(client, now)
+            if slot is None:
+                return None
+            tokens = min(self.burst, self._tokens[slot] + (now - self._last[slot]) * self.rate)
+            self._last[slot] = now
+            if tokens < 1.0:
+                self._tokens[slot] = tokens
+                self._rejects[2 * slot] += 1
+                self._totals[1] += 1
+                return RATE
+            self._tokens[slot] = tokens - 1.0
+            return None
+
+    def release(self, client):
+        """Fin d'une connexion acceptée."""
+        with self._lock:
+            slot = self._find(client, time.monotonic(), create=False)
+            if slot is None:
+                return
+            own = slot * self.workers + self._worker()
+            if self._conns[own] > 0:
+                self._conns[own] -= 1
+
+    def stats(self, top=3):
+        with self._lock:
+            entries = [slot for slot in range(self.size) if self._keys[slot]]
+            throttled = sorted(((self._rejects[2 * s] + self._rejects[2 * s + 1], self._address(s),
+                                 self._rejects[2 * s], self._rejects[2 * s + 1])
+                                for s in entries if self._rejects[2 * s] or self._rejects[2 * s + 1]),
+                               reverse=True)
+            return {
+                "rate": self.rate, "burst": self.burst, "max_connections": self.max_connections,
+                "admitted": self.admitted, "rejected": self.rejected,
+                "clients": len(entries),
+                "connections": sum(self._connections(s) for s in entries),
+                "throttled_clients": len(throttled),
+                "top": [{"client": c, RATE: r, CONNECTIONS: n} for _, c, r, n in throttled[:top]],
+            }
+
+
+def format_limiter_stats(limiter, indent=" - "):
+    st = limiter.stats()
+    rate = f"{st['rate']:g} soumissions/s (rafale {st['burst']:g})" if st["rate"] else "débit illimité"
+    conns = f"{st['max_connections']} connexions" if st["max_connections"] else "connexions illimitées"
+    line = (f"{indent}Limites par client: {rate}, {conns} ; {st['connections']} connexion(s) ouverte(s), "
+            f"{st['admitted']} acceptée(s), refusées : {st['rejected'][RATE]} (débit), "
+            f"{st['rejected'][CONNECTIONS]} (connexions), {st['throttled_clients']} client(s) limité(s)\n")
+    for entry in st["top"]:
+        line += (f"   * {entry['client']} : {entry[RATE]} refus (débit), "
+                 f"{entry[CONNECTIONS]} refus (connexions)\n")
+    return line
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+État du maître partagé entre ses processus (mode MASTER_WORKERS > 1).
+
+Compteurs de tâches, limites MAX_TASKS / MAX_SLAVES, registre des esclaves
+(pid par port) et histogramme des latences des jobs (voir series.py). En mode multi-processus, ils sont en mémoire partagée, créés
+avant le fork et protégés par un verrou inter-processus. En mode simple, ce
+sont des entiers protégés par un verrou de thread. Le code du maître est le
+même dans les deux cas.
+
+Un processus maître peut mourir à tout moment (relancé par le superviseur) :
+ - les compteurs de tâches sont tenus par processus (la lecture donne le total),
+   la part d'un processus mort est remise à zéro par reap_worker
+ - les verrous notent le pid de leur détenteur : reap_worker rend ceux qu'il tenait
+ - la condition n'a pas de compteur de dormeurs (voir _PollingCondition)
+ - les groupes de processus de ses jobs en cours sont notés, puis tués
+"""
+
+import os
+import time
+import signal
+import threading
+import multiprocessing
+from contextlib import suppress
+
+# Processus de jobs suivis au plus par processus maître (au-delà, non suivis)
+MAX_JOB_PROCESSES = 256
+# Compteurs tenus par processus maître (voir _worker_field)
+WORKER_FIELDS = 3
+# Verrous inter-processus dont le détenteur est noté (voir new_lock)
+MAX_OWNED_LOCKS = 8
+
+
+def _field(index):
+    def getter(self):
+        return self._values[index]
+
+    def setter(self, value):
+        self._values[index] = value
+    return property(getter, setter)
+
+
+def _worker_field(index):
+    """
+    Compteur tenu par processus maître : la lecture donne le total, l'écriture
+    (x += 1, x -= 1) ne modifie que la part du processus courant.
+    """
+    def getter(self):
+        return sum(self._counts[w * WORKER_FIELDS + index] for w in range(self.workers))
+
+    def setter(self, value):
+        self._counts[self.worker_index * WORKER_FIELDS + index] += value - getter(self)
+    return property(getter, setter)
+
+
+class _OwnedLock:
+    """Verrou inter-processus qui note le pid de son détenteur (rendu par reap_worker s'il meurt)."""
+
+    def __init__(self, lock, owners, slot):
+        self._lock = lock
+        self._owners = owners
+        self._slot = slot
+
+    def acquire(self, block=True, timeout=None):
+        acquired = self._lock.acquire(block, timeout)
+        if acquired:
+            self._owners[self._slot] = os.getpid()
+        return acquired
+
+    def release(self):
+        self._owners[self._slot] = 0
+        self._lock.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *args):
+        self.release()
+
+    def release_if_owned_by(self, pid):
+        """Rend le verrou si le processus `pid` (mort) le tenait."""
+        if pid and self._owners[self._slot] == pid:
+            self._owners[self._slot] = 0
+            with suppress(ValueError):
+                self._lock.release()
+            return True
+        return False
+
+
+class _PollingCondition:
+    """
+    Condition inter-processus : wait() relâche le verrou et surveille un numéro de
+    génération incrémenté par notify_all(). multiprocessing.Condition compte ses
+    dormeurs, et attendrait indéfiniment le réveil d'un processus tué pendant wait().
+    """
+    POLL_INTERVAL = 0.01
+
+    def __init__(self, lock, generation):
+        self._lock = lock
+        self._generation = generation
+
+    def __enter__(self):
+        return self._lock.acquire()
+
+    def __exit__(self, *args):
+        self._lock.release()
+
+    def wait(self, timeout=None):
+        """À appeler sous le verrou ; vrai si réveillé par notify avant `timeout`."""
+        generation = self._generation.value
+        end = None if timeout is None else time.monotonic() + timeout
+        self._lock.release()
+        try:
+            while self._generation.value == generation:
+                if end is not None and time.monotonic() >= end:
+                    return False
+                time.sleep(self.POLL_INTERVAL)
+            return True
+        finally:
+            self._lock.acquire()
+
+    def notify_all(self):
+        """À appeler sous le verrou."""
+        self._generation.value = (self._generation.value + 1) % (2 ** 31)
+
+    notify = notify_all
+
+
+class SharedState:
+    """Compteurs et registre d'esclaves communs à tous les processus maîtres."""
+
+    max_tasks = _field(1)
+    max_slaves = _field(2)
+    current_tasks = _worker_field(0)    # jobs exécutés localement (tous processus confondus)
+    central_waiting = _worker_field(1)  # jobs en attente dans la file centrale
+    local_claims = _worker_field(2)     # jobs admis en local, pas encore à l'étape d'exécution
+
+    def __init__(self, max_tasks, max_slaves, slave_ports, shared=False, latency_buckets=0, workers=1):
+        self.slave_ports = list(slave_ports)
+        self.shared = shared
+        self.workers = max(1, workers) if shared else 1
+        self.worker_index = 0          # fixé par chaque processus maître après le fork
+        initial = [0, max_tasks, max_slaves]
+        self._pids_lock = threading.Lock()
+        self._owned_locks = []
+        # Appelés par reap_worker avec le n° du processus mort (état d'autres modules)
+        self.reap_hooks = []
+        if shared:
+            ctx = multiprocessing.get_context("fork")
+            self._ctx = ctx
+            self._owners = ctx.Array('i', MAX_OWNED_LOCKS, lock=False)
+            self.lock = self.new_lock()
+            self.cond = _PollingCondition(self.lock, ctx.Value('i', 0, lock=False))
+            self.launch_lock = self.new_lock()
+            # lock=False : les accès sont déjà protégés par self.lock
+            self._values = ctx.Array('i', initial, lock=False)
+            self._counts = ctx.Array('i', self.workers * WORKER_FIELDS, lock=False)
+            self._job_pids = ctx.Array('i', self.workers * MAX_JOB_PROCESSES, lock=False)
+            self._slave_pids = ctx.Array('i', len(self.slave_ports), lock=False)
+            self.latency_counts = ctx.Array('i', latency_buckets, lock=False)
+        else:
+            self.lock = threading.Lock()
+            self.cond = threading.Condition(self.lock)
+            self.launch_lock = threading.Lock()
+            self._values = initial
+            self._counts = [0] * WORKER_FIELDS
+            self._job_pids = [0] * MAX_JOB_PROCESSES
+            self._slave_pids = [0] * len(self.slave_ports)
+            self.latency_counts = [0] * latency_buckets
+
+    # ======================================================
+    #   Mémoire et verrous pour d'autres modules (à créer avant le fork)
+    # ======================================================
+    def array(self, typecode, size):
+        """Tableau de `size` zéros : partagé entre processus maîtres, sinon local ('c' : octets)."""
+        if self.shared:
+            return self._ctx.Array(typecode, size, lock=False)
+        if typecode == 'c':
+            return bytearray(size)
+        return [0.0 if typecode == 'd' else 0] * size
+
+    def new_lock(self):
+        """Verrou commun aux processus maîtres, rendu par reap_worker si son détenteur meurt."""
+        if not self.shared:
+            return threading.Lock()
+        if len(self._owned_locks) >= MAX_OWNED_LOCKS:
+            raise RuntimeError("trop de verrous partagés (MAX_OWNED_LOCKS)")
+        lock = _OwnedLock(self._ctx.Lock(), self._owners, len(self._owned_locks))
+        self._owned_locks.append(lock)
+        return lock
+
+    # ======================================================
+    #   Registre des esclaves (à appeler sous self.lock)
+    # ======================================================
+    def slave_addresses(self, host="127.0.0.1"):
+        return [(host, port) for port, pid in zip(self.slave_ports, self._slave_pids) if pid]
+
+    def slave_pid(self, port):
+        return self._slave_pids[self.slave_ports.index(port)]
+
+    def set_slave(self, port, pid):
+        """Enregistre l'esclave lancé sur `port` (pid 0 : port libéré)."""
+        self._slave_pids[self.slave_ports.index(port)] = pid
+
+    def free_ports(self):
+        return [port for port, pid in zip(self.slave_ports, self._slave_pids) if not pid]
+
+    # ======================================================
+    #   Processus des jobs en cours (voir executeur.PROCESS_TRACKER)
+    # ======================================================
+    def _job_pid_slots(self, index):
+        return range(index * MAX_JOB_PROCESSES, (index + 1) * MAX_JOB_PROCESSES)
+
+    def track_job_process(self, pid):
+        """Note le processus (chef de groupe) d'un job lancé par ce processus maître."""
+        with self._pids_lock:
+            for i in self._job_pid_slots(self.worker_index):
+                if not self._job_pids[i]:
+                    self._job_pids[i] = pid
+                    return
+
+    def untrack_job_process(self, pid):
+        with self._pids_lock:
+            for i in self._job_pid_slots(self.worker_index):
+                if self._job_pids[i] == pid:
+                    self._job_pids[i] = 0
+                    return
+
+    # ======================================================
+    #   Processus maître mort (appelé par le superviseur)
+    # ======================================================
+    def reap_worker(self, index, pid):
+        """
+        Rend ce que tenait le processus maître n°index (pid `pid`, mort) : verrous,
+        tâches en cours, réservations et attentes ; tue les groupes de processus de
+        ses jobs, et appelle reap_hooks. Retourne le nombre de jobs tués.
+        """
+        for lock in self._owned_locks:
+            lock.release_if_owned_by(pid)
+        for hook in self.reap_hooks:
+            hook(index)
+        with self.lock:
+            for field in range(WORKER_FIELDS):
+                self._counts[index * WORKER_FIELDS + field] = 0
+            pids = []
+            for i in self._job_pid_slots(index):
+                if self._job_pids[i]:
+                    pids.append(self._job_pids[i])
+                    self._job_pids[i] = 0
+            self.cond.notify_all()
+        for job_pid in pids:
+            with suppress(OSError):
+                os.killpg(job_pid, signal.SIGKILL)
+        return len(pids)
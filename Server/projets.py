@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+"""
+Projets multi-fichiers avec reconstruction incrémentale.
+
+ - Requête : PROJECT|SIZE=<n>|[JOB=<id>|]langage|fichier principal|manifeste, où n est
+   la taille en octets de ce qui suit SIZE=<n>| (le serveur lit tout le projet)
+ - Manifeste JSON : {"files": {"chemin": {"content": "..."} | {"hash": "<sha256>"}}}.
+   Un fichier déjà envoyé est désigné par son empreinte (sha256 du contenu) ; le
+   serveur le reprend dans son magasin de fichiers. S'il ne l'a pas (ou plus), il
+   répond MANQUANT: <empreintes> et le client renvoie ces fichiers en entier
+ - C/C++ : chaque unité de traduction est compilée à part (-c) et son objet gardé
+   en cache, sous une clé couvrant le compilateur, les options, le source et les
+   en-têtes du projet qu'il inclut (#include "..." suivis transitivement) : seuls
+   les fichiers modifiés sont recompilés, puis les objets sont reliés
+ - Java : javac doit voir toutes les classes, le projet est recompilé en entier
+   dès qu'un fichier change ; les classes compilées sont en cache sinon
+ - Python : pas de compilation, le fichier principal est lancé dans le projet
+ - La sortie commence par 'Construction:' (état de chaque fichier compilé),
+   puis 'Sortie:'/'Erreurs:' et la ligne RESSOURCES comme un job simple
+ - Magasin de fichiers et objets sur disque (PROJECT_CACHE_DIR), partagés par les
+   processus d'une même machine ; les plus anciens sont supprimés au-delà de
+   PROJECT_CACHE_MB
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import posixpath
+import threading
+import subprocess
+from contextlib import suppress
+
+from executeur import (
+    make_job_dir, run_process, run_program, format_usage_line, _posix_compile_limits,
+    COMPILE_POOL, JobOutput, JobCancelled,
+    canonical_language, missing_toolchain_message, probe_toolchains, LANGUAGE_LABELS,
+)
+from traces import NO_TRACE
+
+PROJECT_PREFIX = "PROJECT|"
+MISSING_PREFIX = "MANQUANT:"
+
+PROJECT_CACHE_DIR = os.environ.get("PROJECT_CACHE_DIR", "cache_projets")
+PROJECT_CACHE_MB = int(os.environ.get("PROJECT_CACHE_MB", "256"))
+MAX_PROJECT_FILES = 200
+MAX_PROJECT_BYTES = 10_000_000
+PRUNE_INTERVAL = 60
+
+UNIT_EXTENSIONS = {"c": (".c",), "c++": (".cpp", ".cc", ".cxx")}
+COMPILERS = {"c": "gcc", "c++": "g++"}
+COMPILE_FLAGS = ["-O2"]
+UNIT_TIMEOUT = 15
+
+PATH_RE = re.compile(r"[A-Za-z0-9_.\-]+(/[A-Za-z0-9_.\-]+)*")
+HASH_RE = re.compile(r"[0-9a-f]{64}")
+INCLUDE_RE = re.compile(r'^[ \t]*#[ \t]*include[ \t]*"([^"]+)"', re.M)
+PACKAGE_RE = re.compile(r"^\s*package\s+([\w.]+)\s*;", re.M)
+
+##########################################
+# Protocole
+##########################################
+
+def content_hash(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def format_project_request(language, main, manifest, options=""):
+    """Requête PROJECT complète (bytes) ; `options` : préfixe JOB=..|TRACE=..| éventuel."""
+    body = f"{options}{language}|{main}|{manifest}".encode('utf-8')
+    return f"{PROJECT_PREFIX}SIZE={len(body)}|".encode('utf-8') + body
+
+def read_project_request(sock, data):
+    """
+    Complète une requête PROJECT dont `data` est le début (déjà reçu) et retourne son
+    corps (bytes) : [JOB=..|]langage|principal|manifeste.
+    """
+    head, sep, body = data[len(PROJECT_PREFIX):].partition(b"|")
+    key, _, value = head.partition(b"=")
+    if not sep or key != b"SIZE" or not value.isdigit():
+        raise ValueError("requête de projet invalide (SIZE=<octets> attendu)")
+    size = int(value)
+    if size > MAX_PROJECT_BYTES:
+        raise ValueError(f"projet trop volumineux ({size} octets, max {MAX_PROJECT_BYTES})")
+    chunks = [body]
+    received = len(body)
+    while received < size:
+        chunk = sock.recv(min(1 << 20, size - received))
+        if not chunk:
+            raise ValueError("projet incomplet (connexion fermée)")
+        chunks.append(chunk)
+        received += len(chunk)
+    return b"".join(chunks)
+
+def safe_project_path(path):
+    """Chemin relatif du projet (a/b.c), ou None s'il sort du projet ou contient des caractères refusés."""
+    if not isinstance(path, str) or len(path) > 200 or not PATH_RE.fullmatch(path):
+        return None
+    if any(part in (".", "..") for part in path.split("/")):
+        return None
+    return path
+
+def resolve_project(manifest_text, store=None):
+    """
+    Décode le manifeste et remplace les empreintes par les contenus du magasin
+    (les contenus reçus y sont ajoutés). Retourne ({chemin: contenu}, empreintes
+    manquantes triées). Lève ValueError si le manifeste est invalide.
+    """
+    try:
+        manifest = json.loads(manifest_text)
+    except ValueError:
+        raise ValueError("manifeste de projet invalide (JSON attendu)")
+    entries = manifest.get("files") if isinstance(manifest, dict) else None
+    if not isinstance(entries, dict) or not entries:
+        raise ValueError("manifeste de projet sans fichiers")
+    if len(entries) > MAX_PROJECT_FILES:
+        raise ValueError(f"trop de fichiers dans le projet ({len(entries)}, max {MAX_PROJECT_FILES})")
+    files, missing = {}, set()
+    for path, entry in entries.items():
+        if safe_project_path(path) is None:
+            raise ValueError(f"chemin refusé dans le projet : {path}")
+        if not isinstance(entry, dict):
+            raise ValueError(f"entrée invalide dans le manifeste : {path}")
+        if isinstance(entry.get("content"), str):
+            files[path] = entry["content"]
+            if store is not None:
+                store.put(entry["content"])
+            continue
+        digest = str(entry.get("hash", "")).lower()
+        if not HASH_RE.fullmatch(digest):
+            raise ValueError(f"empreinte invalide dans le manifeste : {path}")
+        content = store.get(digest) if store is not None else None
+        if content is None:
+            missing.add(digest)
+        else:
+            files[path] = content
+    return files, sorted(missing)
+
+def project_manifest(files):
+    """Manifeste avec tous les contenus (transmis aux esclaves, rejoué depuis une capture)."""
+    return json.dumps({"files": {path: {"content": files[path]} for path in sorted(files)}},
+                      ensure_ascii=False)
+
+# Pourquoi pas l'empreinte des sources (langage + contenus) : en C/C++, le cache
+# d'un esclave est par unité de traduction (voir object_key). Après une
+# modification, seules les unités touchées changent ; sur l'esclave attitré, toutes
+# les autres sont des succès de cache. Avec une clé sur les contenus, chaque version
+# partirait ailleurs et tout serait recompilé.
+# Les fichiers seuls n'ont pas de clé : aucun esclave ne garde leur compilation,
+# l'esclave le moins chargé les sert aussi bien (voir execute_job).
+def project_affinity_key(language, main, manifest_text):
+    """
+    Clé de routage d'un projet : langage, fichier principal et liste des chemins,
+    sans les contenus. Les versions successives d'un projet vont au même esclave,
+    qui a leurs objets en cache.
+    """
+    try:
+        paths = sorted(json.loads(manifest_text).get("files", {}))
+    except (ValueError, AttributeError):
+        paths = []
+    return hashlib.sha256("\0".join([language.lower(), main] + paths).encode('utf-8')).hexdigest()
+
+##########################################
+# Caches sur disque
+##########################################
+
+class ContentStore:
+    """
+    Fichiers rangés par clé (empreinte sha256) sous `root`. Écriture dans un fichier
+    temporaire puis renommage : plusieurs processus peuvent écrire la même clé.
+    Chaque lecture rafraîchit la date du fichier (éviction des plus anciens).
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, key):
+        """Contenu texte de la clé, ou None."""
+        try:
+            with open(self.path(key), encoding='utf-8', newline="") as f:
+                content = f.read()
+        except (OSError, ValueError):
+            return None
+        with suppress(OSError):
+            os.utime(self.path(key))
+        return content
+
+    def put(self, content):
+        """Ajoute un contenu texte ; retourne son empreinte."""
+        key = content_hash(content)
+        path = self.path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, "w", encoding='utf-8', newline="") as f:
+                f.write(content)
+            os.replace(tmp, path)
+        else:
+            with suppress(OSError):
+                os.utime(path)
+        return key
+
+    def fetch_file(self, key, dest):
+        """Copie (lien physique si possible) le fichier de la clé vers `dest`. False si absent."""
+        path = self.path(key)
+        try:
+            try:
+                os.link(path, dest)
+            except OSError:
+                shutil.copyfile(path, dest)
+        except FileNotFoundError:
+            return False
+        with suppress(OSError):
+            os.utime(path)
+        return True
+
+    def put_file(self, key, src):
+        """Range une copie de `src` sous la clé."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, path)
+
+    def prune(self, max_bytes):
+        """Supprime les entrées les moins récemment utilisées au-delà de `max_bytes`."""
+        entries = []
+        for dirpath, dirnames, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                with suppress(OSError):
+                    st = os.stat(path)
+                    entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            with suppress(OSError):
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            total -= size
+
+SOURCES = ContentStore(os.path.join(PROJECT_CACHE_DIR, "sources"))
+OBJECTS = ContentStore(os.path.join(PROJECT_CACHE_DIR, "objets"))
+CLASSES_DIR = os.path.join(PROJECT_CACHE_DIR, "classes")
+
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+def maybe_prune_caches():
+    """Éviction (au plus une fois par PRUNE_INTERVAL) : moitié sources, moitié objets."""
+    global _last_prune
+    if PROJECT_CACHE_MB <= 0:
+        return
+    with _prune_lock:
+        if time.monotonic() - _last_prune < PRUNE_INTERVAL:
+            return
+        _last_prune = time.monotonic()
+    budget = PROJECT_CACHE_MB * 1024 * 1024 // 2
+    SOURCES.prune(budget)
+    OBJECTS.prune(budget)
+    with suppress(OSError):
+        classes = sorted(os.scandir(CLASSES_DIR), key=lambda e: e.stat().st_mtime)
+        for entry in classes[:-64]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+##########################################
+# Construction
+##########################################
+
+def included_headers(path, files):
+    """En-têtes du projet inclus par `path` (#include "..." suivis transitivement)."""
+    seen = set()
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        for name in INCLUDE_RE.findall(files[current]):
+            # Comme le compilateur : dossier du fichier qui inclut, puis racine du projet (-I .)
+            for candidate in (posixpath.normpath(posixpath.join(posixpath.dirname(current), name)),
+                              posixpath.normpath(name)):
+                if candidate in files:
+                    if candidate not in seen:
+                        seen.add(candidate)
+                        stack.append(candidate)
+                    break
+    return seen
+
+def object_key(lang, path, files):
+    """Clé de l'objet d'une unité : compilateur, options, chemin, source et en-têtes inclus."""
+    h = hashlib.sha256()
+    parts = [probe_toolchains().get(lang, ""), " ".join(COMPILE_FLAGS), path, content_hash(files[path])]
+    parts += [f"{header}:{content_hash(files[header])}" for header in sorted(included_headers(path, files))]
+    for part in parts:
+        h.update(part.encode('utf-8'))
+        h.update(b"\0")
+    return h.hexdigest()
+
+def _read_text(path):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        errors = f.read()
+    return errors if errors.endswith("\n") or not errors else errors + "\n"
+
+def _add_cpu(usage, step_usage):
+    if "cpu_s" in step_usage:
+        usage["compilation_cpu_s"] = usage.get("compilation_cpu_s", 0.0) + step_usage["cpu_s"]
+
+def _build_native(lang, files, job_dir, cancel_check, usage):
+    """
+    Compile les unités modifiées (objets en cache pour les autres) et relie.
+    Retourne (lignes d'état, erreurs de compilation ou "", commande d'exécution).
+    """
+    compiler = COMPILERS[lang]
+    units = sorted(p for p in files if p.endswith(UNIT_EXTENSIONS[lang]))
+    if not units:
+        raise ValueError(f"aucun fichier {'/'.join(UNIT_EXTENSIONS[lang])} dans le projet")
+    preexec = _posix_compile_limits if os.name != "nt" else None
+    os.makedirs(os.path.join(job_dir, "_objets"), exist_ok=True)
+    lines, errors, objects = [], [], []
+    rebuilt = cached = 0
+    for unit in units:
+        key = object_key(lang, unit, files)
+        obj = os.path.join("_objets", unit.replace("/", "__") + ".o")
+        objects.append(obj)
+        if OBJECTS.fetch_file(key, os.path.join(job_dir, obj)):
+            cached += 1
+            lines.append(f"  {unit} : en cache\n")
+            continue
+        stderr_path = os.path.join(job_dir, "_objets", "compilation_stderr.txt")
+        step_usage = {}
+        t0 = time.perf_counter()
+        try:
+            comp = run_process([compiler, "-c", unit, *COMPILE_FLAGS, "-I", ".", "-o", obj],
+                               UNIT_TIMEOUT, preexec, cancel_check,
+                               stdout_path=os.path.join(job_dir, "_objets", "compilation_stdout.txt"),
+                               stderr_path=stderr_path, usage=step_usage, cwd=job_dir)
+        except subprocess.TimeoutExpired:
+            lines.append(f"  {unit} : erreur (délai de compilation dépassé)\n")
+            errors.append(f"{unit} : délai de compilation dépassé ({UNIT_TIMEOUT}s)\n")
+            continue
+        finally:
+            _add_cpu(usage, step_usage)
+        elapsed = time.perf_counter() - t0
+        if comp.returncode != 0:
+            lines.append(f"  {unit} : erreur\n")
+            errors.append(_read_text(stderr_path))
+            continue
+        rebuilt += 1
+        lines.append(f"  {unit} : recompilé ({elapsed:.3f}s)\n")
+        OBJECTS.put_file(key, os.path.join(job_dir, obj))
+    usage["unites_recompilees"] = rebuilt
+    usage["unites_en_cache"] = cached
+    if errors:
+        return lines, "".join(errors), None
+
+    exe = "a.exe" if os.name == "nt" else "a.out"
+    stderr_path = os.path.join(job_dir, "_objets", "edition_liens_stderr.txt")
+    step_usage = {}
+    t0 = time.perf_counter()
+    try:
+        link = run_process([compiler, *objects, "-s", "-o", exe], UNIT_TIMEOUT, preexec, cancel_check,
+                           stdout_path=os.path.join(job_dir, "_objets", "edition_liens_stdout.txt"),
+                           stderr_path=stderr_path, usage=step_usage, cwd=job_dir)
+    finally:
+        _add_cpu(usage, step_usage)
+    lines.append(f"  (édition de liens : {time.perf_counter() - t0:.3f}s)\n")
+    if link.returncode != 0:
+        return lines, _read_text(stderr_path), None
+    return lines, "", [os.path.abspath(os.path.join(job_dir, exe))]
+
+def _build_java(main, files, job_dir, cancel_check, usage):
+    """Recompile tout le projet si un fichier .java a changé, sinon reprend les classes en cache."""
+    sources = sorted(p for p in files if p.endswith(".java"))
+    if not sources:
+        raise ValueError("aucun fichier .java dans le projet")
+    h = hashlib.sha256(probe_toolchains().get("java", "").encode('utf-8'))
+    for path in sources:
+        h.update(f"\0{path}:{content_hash(files[path])}".encode('utf-8'))
+    classes = os.path.abspath(os.path.join(CLASSES_DIR, h.hexdigest()))
+    package = PACKAGE_RE.search(files[main])
+    main_class = posixpath.splitext(posixpath.basename(main))[0]
+    if package:
+        main_class = f"{package.group(1)}.{main_class}"
+    run_cmd = ["java", "-cp", classes, main_class]
+    if os.path.isdir(classes):
+        with suppress(OSError):
+            os.utime(classes)
+        usage["unites_recompilees"], usage["unites_en_cache"] = 0, len(sources)
+        return [f"  {path} : en cache\n" for path in sources], "", run_cmd
+
+    os.makedirs(CLASSES_DIR, exist_ok=True)
+    tmp = f"{classes}.{uuid.uuid4().hex}.tmp"
+    stderr_path = os.path.join(job_dir, "compilation_stderr.txt")
+    step_usage = {}
+    preexec = _posix_compile_limits if os.name != "nt" else None
+    t0 = time.perf_counter()
+    try:
+        comp = run_process(["javac", "-d", tmp, *sources], 20 + len(sources), preexec, cancel_check,
+                           stdout_path=os.path.join(job_dir, "compilation_stdout.txt"),
+                           stderr_path=stderr_path, usage=step_usage, cwd=job_dir)
+    finally:
+        _add_cpu(usage, step_usage)
+    elapsed = time.perf_counter() - t0
+    if comp.returncode != 0:
+        shutil.rmtree(tmp, ignore_errors=True)
+        usage["unites_recompilees"], usage["unites_en_cache"] = 0, 0
+        return [f"  {path} : erreur\n" for path in sources], _read_text(stderr_path), None
+    try:
+        os.replace(tmp, classes)
+    except OSError:
+        # Même version compilée en parallèle par un autre job : la sienne suffit
+        shutil.rmtree(tmp, ignore_errors=True)
+    usage["unites_recompilees"], usage["unites_en_cache"] = len(sources), 0
+    lines = [f"  {path} : recompilé\n" for path in sources]
+    lines.append(f"  (projet entier : {elapsed:.3f}s)\n")
+    return lines, "", run_cmd
+
+def build_and_run_project(language, main, manifest_text, root="temp_codes", cancel_check=None,
+                          trace=NO_TRACE, timings=None, usage=None):
+    """
+    Construit puis exécute un projet (manifeste avec tous les contenus, voir
+    resolve_project). Même contrat que compile_and_run_to_files : JobOutput à
+    envoyer puis fermer, JobCancelled en cas d'annulation, durées dans `timings`
+    et ressources dans `usage` (avec le nombre d'unités recompilées / en cache).
+    """
+    if timings is None:
+        timings = {}
+    if usage is None:
+        usage = {}
+    timings.setdefault("compilation", 0.0)
+    timings.setdefault("execution", 0.0)
+    job_dir = make_job_dir(root)
+
+    def finish(parts):
+        if usage:
+            parts.append(format_usage_line(usage))
+        return JobOutput(parts, job_dir)
+
+    try:
+        missing = missing_toolchain_message(language)
+        if missing is not None:
+            return JobOutput.text(missing, job_dir)
+        lang = canonical_language(language)
+        files, _ = resolve_project(manifest_text)
+        if main not in files:
+            return JobOutput.text(f"Erreur : fichier principal absent du projet : {main}\n", job_dir)
+        for path, content in files.items():
+            full = os.path.join(job_dir, *path.split("/"))
+            os.makedirs(os.path.dirname(full), exist_ok=True)
+            with open(full, "w", encoding='utf-8', newline="") as f:
+                f.write(content)
+
+        parts = []
+        if lang == "python":
+            run_cmd = [sys.executable, main]
+        else:
+            lines = []
+            with COMPILE_POOL.slot(cancel_check, trace):
+                t0 = time.perf_counter()
+                try:
+                    with trace.span("compilation", language=lang, fichiers=len(files)):
+                        if lang == "java":
+                            lines, errors, run_cmd = _build_java(main, files, job_dir, cancel_check, usage)
+                        else:
+                            lines, errors, run_cmd = _build_native(lang, files, job_dir, cancel_check, usage)
+                finally:
+                    timings["compilation"] = time.perf_counter() - t0
+                    usage["compilation_s"] = timings["compilation"]
+            summary = (f"Construction: {usage.get('unites_recompilees', 0)} recompilé(s), "
+                       f"{usage.get('unites_en_cache', 0)} en cache\n")
+            parts.append((summary + "".join(lines)).encode('utf-8'))
+            if run_cmd is None:
+                parts.append(f"Erreur de compilation {LANGUAGE_LABELS[lang]}:\n{errors}".encode('utf-8'))
+                return finish(parts)
+
+        parts += run_program(run_cmd, job_dir, lang, cancel_check, trace, timings, usage, cwd=job_dir)
+        return finish(parts)
+
+    except JobCancelled:
+        with suppress(Exception):
+            shutil.rmtree(job_dir)
+        raise
+    except subprocess.TimeoutExpired:
+        return finish(["Erreur : exécution dépassé le délai (timeout).\n".encode('utf-8')])
+    except Exception as e:
+        return JobOutput.text(f"Erreur lors de l'execution : {str(e)}\n", job_dir)
+    finally:
+        maybe_prune_caches()
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Stockage des résultats des jobs asynchrones (SUBMIT / STATUS / FETCH).
+
+ - Chaque job soumis a une entrée : état, dates, taille de la sortie
+ - Les sorties terminées sont gardées en mémoire dans une limite d'octets ;
+   au-delà, les plus anciennes sont écrites sur disque (si un répertoire de
+   débordement est configuré) ou oubliées
+ - Les jobs terminés expirent après un délai (TTL), qu'ils aient été lus ou non
+"""
+
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from contextlib import suppress
+
+# États d'un job asynchrone
+PENDING = "en_file"
+RUNNING = "en_cours"
+DONE = "termine"
+CANCELLED = "annule"
+EXPIRED = "expire"       # sortie évincée de la mémoire sans débordement disque
+FINISHED_STATES = (DONE, CANCELLED, EXPIRED)
+
+
+class ResultStore:
+    """Entrées des jobs asynchrones, sorties bornées en mémoire, expiration par TTL."""
+
+    def __init__(self, max_bytes, ttl, spill_dir=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.spill_dir = spill_dir or None
+        self.memory_bytes = 0
+        self.spilled = 0
+        self.evicted = 0
+        self.expired = 0
+        self._entries = {}                # job_id -> entrée
+        self._finished = OrderedDict()    # job_id -> date de fin (ordre d'expiration)
+        self._in_memory = OrderedDict()   # job_id -> taille (ordre d'éviction)
+        self._lock = threading.Lock()
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+
+    # ======================================================
+    #   Cycle de vie d'un job
+    # ======================================================
+    def create(self, job_id) -> bool:
+        """Nouvelle entrée en file. False si l'identifiant est déjà utilisé."""
+        with self._lock:
+            self._purge()
+            if job_id in self._entries:
+                return False
+            self._entries[job_id] = {
+                "status": PENDING, "submitted": time.time(),
+                "started": None, "finished": None,
+                "output": None, "path": None, "size": 0,
+            }
+            return True
+
+    def start(self, job_id):
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is not None and entry["status"] == PENDING:
+                entry["status"] = RUNNING
+                entry["started"] = time.time()
+
+    def complete(self, job_id, output: bytes, status=DONE):
+        """Enregistre la sortie d'un job terminé (ou annulé) et applique la limite mémoire."""
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return
+            entry.update(status=status, finished=time.time(), output=output, size=len(output))
+            self._finished[job_id] = entry["finished"]
+            self._in_memory[job_id] = len(output)
+            self.memory_bytes += len(output)
+            self._evict()
+
+    def forget(self, job_id):
+        """Supprime une entrée (soumission refusée après création)."""
+        with self._lock:
+            self._drop(job_id)
+
+    # ======================================================
+    #   Consultation
+    # ======================================================
+    def status(self, job_id):
+        """Copie de l'entrée (sans la sortie), ou None si inconnue/expirée."""
+        with self._lock:
+            self._purge()
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return None
+            return {k: v for k, v in entry.items() if k != "output"}
+
+    def fetch(self, job_id):
+        """
+        Retourne (état, sortie en octets). La sortie vaut None tant que le job
+        n'est pas terminé, ou si elle a été évincée sans débordement disque.
+        """
+        with self._lock:
+            self._purge()
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return None, None
+            if entry["output"] is not None:
+                self._in_memory.move_to_end(job_id)
+                return entry["status"], entry["output"]
+            path = entry["path"]
+            status = entry["status"]
+        if path is None:
+            return status, None
+        try:
+            with open(path, "rb") as f:
+                return status, f.read()
+        except OSError:
+            return EXPIRED, None
+
+    def stats(self):
+        with self._lock:
+            self._purge()
+            counts = {}
+            for entry in self._entries.values():
+                counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+            return {
+                "entries": len(self._entries), "by_status": counts,
+                "memory_bytes": self.memory_bytes, "max_bytes": self.max_bytes,
+                "in_memory": len(self._in_memory), "spilled": self.spilled,
+                "evicted": self.evicted, "expired": self.expired,
+            }
+
+    # ======================================================
+    #   Mémoire et expiration (sous self._lock)
+    # ======================================================
+    def _evict(self):
+        """Libère la mémoire en commençant par les sorties les moins récemment utilisées."""
+        while self.memory_bytes > self.max_bytes and self._in_memory:
+            job_id, size = self._in_memory.popitem(last=False)
+            entry = self._entries[job_id]
+            self.memory_bytes -= size
+            if self.spill_dir:
+                # Nom généré : l'identifiant du job vient du client
+                path = os.path.join(self.spill_dir, f"resultat_{uuid.uuid4().hex}.out")
+                try:
+                    with open(path, "wb") as f:
+                        f.write(entry["output"])
+                    entry["path"] = path
+                    self.spilled += 1
+                except OSError:
+                    entry["status"] = EXPIRED
+                    self.evicted += 1
+            else:
+                entry["status"] = EXPIRED
+                self.evicted += 1
+            entry["output"] = None
+
+    def _purge(self):
+        """Supprime les jobs terminés depuis plus de `ttl` secondes."""
+        limit = time.time() - self.ttl
+        while self._finished:
+            job_id, finished = next(iter(self._finished.items()))
+            if finished > limit:
+                break
+            self._drop(job_id)
+            self.expired += 1
+
+    def _drop(self, job_id):
+        entry = self._entries.pop(job_id, None)
+        self._finished.pop(job_id, None)
+        size = self._in_memory.pop(job_id, None)
+        if size is not None:
+            self.memory_bytes -= size
+        if entry is not None and entry["path"]:
+            with suppress(OSError):
+                os.remove(entry["path"])
+
+
+def format_store_stats(store, indent=" - "):
+    st = store.stats()
+    by_status = ", ".join(f"{k} {v}" for k, v in sorted(st["by_status"].items())) or "aucun"
+    return (
+        f"{indent}Jobs asynchrones: {st['entries']} ({by_status})\n"
+        f"{indent}Résultats en mémoire: {st['in_memory']} ({st['memory_bytes']}/{st['max_bytes']} octets), "
+        f"{st['spilled']} sur disque, {st['evicted']} évincés, {st['expired']} expirés\n"
+    )
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Séries temporelles de charge du maître, lues par le tableau de bord du client.
+
+ - Un échantillon toutes les SERIES_INTERVAL secondes, gardé dans un tampon
+   circulaire de SERIES_SIZE échantillons (le plus ancien est écrasé)
+ - Échantillon : tâches en cours et en attente (maître + esclaves), nombre
+   d'esclaves, MAX_TASKS / MAX_SLAVES, jobs terminés par seconde, latences
+   p50/p90/p99 et utilisation CPU de la machine
+ - Latences : histogramme à classes logarithmiques (compteurs entiers, en mémoire
+   partagée entre processus maîtres, voir partage.py). Les percentiles d'un
+   intervalle sont calculés sur la différence de deux relevés (précision ~10 %)
+ - ADMIN GET_SERIES|<ts> : échantillons postérieurs à ts, en colonnes (JSON compact),
+   pour une interrogation incrémentale
+"""
+
+import os
+import math
+import json
+import time
+import threading
+from collections import deque
+
+SERIES_INTERVAL = float(os.environ.get("SERIES_INTERVAL", "1"))
+SERIES_SIZE = int(os.environ.get("SERIES_SIZE", "3600"))
+
+# Colonnes d'un échantillon (ordre des valeurs dans la réponse GET_SERIES)
+FIELDS = ("ts", "running", "queued", "slaves", "max_tasks", "max_slaves",
+          "jobs_s", "p50", "p90", "p99", "cpu")
+
+# Classes de latence : <= 1 ms, puis bornes multipliées par 2^(1/4) (jusqu'à ~17 min)
+LATENCY_MIN = 0.001
+LATENCY_GROWTH = 2 ** 0.25
+LATENCY_BUCKETS = 80
+
+
+def latency_bucket(seconds):
+    """Classe de l'histogramme pour une latence en secondes."""
+    if seconds <= LATENCY_MIN:
+        return 0
+    return min(LATENCY_BUCKETS - 1, int(math.log(seconds / LATENCY_MIN, LATENCY_GROWTH)) + 1)
+
+
+def histogram_percentile(counts, p):
+    """Percentile (secondes) d'un histogramme de latences : milieu géométrique de la classe, ou None."""
+    total = sum(counts)
+    if not total:
+        return None
+    rank = p / 100.0 * total
+    seen = 0
+    for bucket, count in enumerate(counts):
+        seen += count
+        if count and seen >= rank:
+            return LATENCY_MIN if bucket == 0 else LATENCY_MIN * LATENCY_GROWTH ** (bucket - 0.5)
+    return LATENCY_MIN * LATENCY_GROWTH ** (LATENCY_BUCKETS - 1)
+
+
+class CpuMeter:
+    """Utilisation CPU de la machine entre deux appels (/proc/stat) ; None si indisponible."""
+
+    def __init__(self):
+        self._last = self._read()
+
+    @staticmethod
+    def _read():
+        try:
+            with open("/proc/stat") as f:
+                values = [int(v) for v in f.readline().split()[1:]]
+        except (OSError, ValueError):
+            return None
+        idle = values[3] + (values[4] if len(values) > 4 else 0)   # idle + iowait
+        return sum(values), idle
+
+    def usage(self):
+        current = self._read()
+        previous, self._last = self._last, current
+        if current is None or previous is None or current[0] <= previous[0]:
+            return None
+        total = current[0] - previous[0]
+        return round(1.0 - (current[1] - previous[1]) / total, 4)
+
+
+class TimeSeries:
+    """Tampon circulaire d'échantillons (dict avec au moins "ts"), thread-safe."""
+
+    def __init__(self, size=SERIES_SIZE, interval=SERIES_INTERVAL):
+        self.size = size
+        self.interval = interval
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._samples)
+
+    def add(self, sample):
+        with self._lock:
+            self._samples.append(sample)
+
+    def since(self, ts):
+        """Échantillons strictement postérieurs à `ts` (les derniers sont les plus récents)."""
+        with self._lock:
+            samples = list(self._samples)
+        # Tampon trié par date : on remonte depuis la fin
+        start = len(samples)
+        while start > 0 and samples[start - 1]["ts"] > ts:
+            start -= 1
+        return samples[start:]
+
+    def to_json(self, since=0.0):
+        """Réponse GET_SERIES : {"interval", "size", "now", "fields", "samples": [[...], ...]}."""
+        return json.dumps({
+            "interval": self.interval, "size": self.size, "now": round(time.time(), 3),
+            "fields": FIELDS,
+            "samples": [[sample.get(field) for field in FIELDS] for sample in self.since(since)],
+        }, separators=(",", ":"))
+
+
+def format_series_stats(series, indent=" - "):
+    return (f"{indent}Séries de charge: {len(series)}/{series.size} échantillons, "
+            f"un toutes les {series.interval:g}s (ADMIN GET_SERIES|<ts>)\n")
@@ -1,117 +1,99 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
 import socket
 import threading
-import subprocess
-import os
 import sys
-import uuid
-import shutil
+import time
 from contextlib import suppress
 
-##########################################
-# Helpers sécurité/ressources (identiques maître)
-##########################################
+from executeur import (
+    compile_and_run_to_files, split_options, format_slave_header, COMPILE_POOL, RUN_POOL,
+    Job, JobCancelled, JobRegistry, JobOutput, probe_toolchains, supported_languages,
+)
+from traces import Tracer, NO_TRACE
+from projets import PROJECT_PREFIX, read_project_request, build_and_run_project
 
-def safe_filename(filename: str, language: str) -> str:
-    base = os.path.basename(filename or "")
-    if not base:
-        base = f"main_{uuid.uuid4().hex}"
-    base = "".join(c for c in base if c.isalnum() or c in ("-","_","."))[:64]
-    lang = language.lower().lstrip(".")
-    ext_map = {"python": ".py", "py": ".py", "c": ".c", "cpp": ".cpp", "c++": ".cpp", "java": ".java"}
-    wanted = ext_map.get(lang, "")
-    root, cur = os.path.splitext(base)
-    if wanted and cur.lower() != wanted:
-        base = root + wanted
-    return base
-
-def make_job_dir(root="temp_codes_slave") -> str:
-    d = os.path.join(root, "job_" + uuid.uuid4().hex)
-    os.makedirs(d, exist_ok=True)
-    return d
-
-def _posix_limits():
-    if os.name != "nt":
-        try:
-            import resource
-            resource.setrlimit(resource.RLIMIT_CPU, (5, 5))
-            resource.setrlimit(resource.RLIMIT_AS, (256*1024**2,)*2)
-            resource.setrlimit(resource.RLIMIT_FSIZE, (10*1024**2,)*2)
-        except Exception:
-            pass
+# Jobs en cours (annulables par CANCEL|<job_id> ou déconnexion du maître)
+JOBS = JobRegistry()
+
+# Traces : l'esclave trace les jobs pour lesquels le maître a propagé TRACE=<id>
+TRACER = None
 
 ##########################################
-# Exécution code
+# Contrôle d'admission
 ##########################################
-
-def compile_and_run(language, filename, code):
-    job_dir = make_job_dir("temp_codes_slave")
-    filepath = os.path.join(job_dir, safe_filename(filename, language))
-
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(code)
-
-    try:
-        lang = language.lower().lstrip('.')
-        preexec = _posix_limits if os.name != "nt" else None
-
-        if lang in ["python", "py"]:
-            cmd = [sys.executable, filepath]
-            exec_proc = subprocess.run(cmd, capture_output=True, text=True, timeout=5, preexec_fn=preexec)
-            out = f"Sortie:\n{exec_proc.stdout}\n"
-            if exec_proc.stderr:
-                out += f"Erreurs:\n{exec_proc.stderr}\n"
-            return out
-
-        elif lang in ["c"]:
-            exe = os.path.join(job_dir, "a.exe" if os.name == "nt" else "a.out")
-            comp = subprocess.run(["gcc", filepath, "-O2", "-s", "-o", exe],
-                                  capture_output=True, text=True, timeout=15)
-            if comp.returncode != 0:
-                return f"Erreur de compilation C:\n{comp.stderr}"
-            exec_proc = subprocess.run([exe], capture_output=True, text=True, timeout=5, preexec_fn=preexec)
-            out = f"Sortie:\n{exec_proc.stdout}\n"
-            if exec_proc.stderr:
-                out += f"Erreurs:\n{exec_proc.stderr}\n"
-            return out
-
-        elif lang in ["c++", "cpp"]:
-            exe = os.path.join(job_dir, "a.exe" if os.name == "nt" else "a.out")
-            comp = subprocess.run(["g++", filepath, "-O2", "-s", "-o", exe],
-                                  capture_output=True, text=True, timeout=15)
-            if comp.returncode != 0:
-                return f"Erreur de compilation C++:\n{comp.stderr}"
-            exec_proc = subprocess.run([exe], capture_output=True, text=True, timeout=5, preexec_fn=preexec)
-            out = f"Sortie:\n{exec_proc.stdout}\n"
-            if exec_proc.stderr:
-                out += f"Erreurs:\n{exec_proc.stderr}\n"
-            return out
-
-        elif lang in ["java"]:
-            comp = subprocess.run(["javac", filepath, "-d", job_dir],
-                                  capture_output=True, text=True, timeout=20)
-            if comp.returncode != 0:
-                return f"Erreur de compilation Java:\n{comp.stderr}"
-            class_name = os.path.splitext(os.path.basename(filepath))[0]
-            exec_proc = subprocess.run(["java", "-cp", job_dir, class_name],
-                                       capture_output=True, text=True, timeout=5, preexec_fn=preexec)
-            out = f"Sortie:\n{exec_proc.stdout}\n"
-            if exec_proc.stderr:
-                out += f"Erreurs:\n{exec_proc.stderr}\n"
-            return out
-
-        else:
-            return "Langage non supporté ou inconnu.\n"
-
-    except subprocess.TimeoutExpired:
-        return "Erreur : exécution dépassé le délai (timeout).\n"
-    except Exception as e:
-        return f"Erreur lors de l'execution : {str(e)}\n"
-    finally:
-        with suppress(Exception):
-            shutil.rmtree(job_dir)
+# Jobs exécutés simultanément, et jobs pouvant attendre dans la file locale
+SLAVE_MAX_TASKS = int(os.environ.get("SLAVE_MAX_TASKS", "4"))
+SLAVE_QUEUE_SIZE = int(os.environ.get("SLAVE_QUEUE_SIZE", "2"))
+
+class Admission:
+    """Limite de jobs simultanés avec une petite file d'attente ; refuse au-delà."""
+
+    def __init__(self, capacity, queue_max):
+        self.capacity = capacity
+        self.queue_max = queue_max
+        self.running = 0
+        self.queued = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def load(self):
+        with self._cond:
+            load = {"running": self.running, "queued": self.queued,
+                    "capacity": self.capacity, "queue_max": self.queue_max}
+        # Utilisation moyenne des étapes compilation / exécution
+        load["stages"] = {pool.name: pool.stats()["utilisation"] for pool in (COMPILE_POOL, RUN_POOL)}
+        # Langages exécutables ici : le maître ne route que ceux-là vers cet esclave
+        load["languages"] = supported_languages()
+        return load
+
+    def enter(self, cancel_check):
+        """Réserve un créneau (en attendant dans la file si besoin). False si plein."""
+        with self._cond:
+            if self.running < self.capacity and self.queued == 0:
+                self.running += 1
+                return True
+            if self.queued >= self.queue_max:
+                self.rejected += 1
+                return False
+            self.queued += 1
+            try:
+                while self.running >= self.capacity:
+                    self._cond.wait(0.5)
+                    if cancel_check():
+                        raise JobCancelled()
+                self.running += 1
+                return True
+            finally:
+                self.queued -= 1
+
+    def leave(self):
+        with self._cond:
+            self.running -= 1
+            self._cond.notify()
+
+ADMISSION = None
+
+def send_response(client_socket, output, status="ok", timings=None, usage=None):
+    """
+    Envoie l'en-tête de charge (lu par le maître) suivi de la sortie : texte, ou
+    JobOutput dont les fichiers partent par sendfile. `timings` (durées de
+    compilation/exécution) alimente l'historique du maître, `usage` (ressources
+    consommées) ses statistiques par langage.
+    """
+    load = ADMISSION.load()
+    if timings is not None:
+        load["timings"] = {k: round(v, 4) for k, v in timings.items()}
+    if usage:
+        load["ressources"] = {k: round(v, 4) for k, v in usage.items()}
+    header = format_slave_header(status, load)
+    if isinstance(output, JobOutput):
+        client_socket.sendall(header.encode('utf-8'))
+        output.send(client_socket)
+    else:
+        client_socket.sendall((header + output).encode('utf-8', errors='replace'))
 
 ##########################################
 # Réseau
@@ -120,9 +102,17 @@ def compile_and_run(language, filename, code):
 def handle_slave_client(client_socket, client_address):
     """
     Gère la requête (code) envoyée par le serveur maître :
-     - language|filename|code
+     - [JOB=<id>|][TRACE=<id>|]language|filename|code
+     - PROJECT|SIZE=<n>|[JOB=<id>|]language|principal|manifeste : projet multi-fichiers
      - Compile/exécute et renvoie le résultat
+     - CANCEL|<job_id> : annule un job en cours
+     - PING : battement de cœur, renvoie uniquement l'en-tête de charge
+    Chaque réponse (sauf CANCEL) commence par l'en-tête de charge de l'esclave.
     """
+    job = None
+    trace = NO_TRACE
+    job_start = time.time()
+    job_t0 = time.perf_counter()
     try:
         data = client_socket.recv(10_000_000)
         if not data:
@@ -130,9 +120,28 @@ def handle_slave_client(client_socket, client_address):
             return
 
         decoded_data = data.decode('utf-8', errors='replace')
+
+        if decoded_data.startswith("PING"):
+            send_response(client_socket, "")
+            return
+
+        if decoded_data.startswith("CANCEL|"):
+            job_id = decoded_data.split('|', 1)[1].strip()
+            if JOBS.cancel(job_id):
+                client_socket.sendall(f"OK: annulation du job {job_id} demandée.".encode('utf-8'))
+            else:
+                client_socket.sendall(f"Erreur : job inconnu ou déjà terminé : {job_id}".encode('utf-8'))
+            return
+
+        project = decoded_data.startswith(PROJECT_PREFIX)
+        if project:
+            data = read_project_request(client_socket, data)
+            decoded_data = data.decode('utf-8', errors='replace')
+
+        options, decoded_data = split_options(decoded_data)
         split_data = decoded_data.split('|', 2)
         if len(split_data) < 3:
-            client_socket.sendall(b"Erreur : Donnees invalides.\n")
+            send_response(client_socket, "Erreur : Donnees invalides.\n")
             client_socket.close()
             return
 
@@ -140,24 +149,61 @@ def handle_slave_client(client_socket, client_address):
         filename = split_data[1]
         code_source = split_data[2]
 
-        output = compile_and_run(language, filename, code_source)
-        client_socket.sendall(output.encode('utf-8', errors='replace'))
+        job = Job(options.get("JOB"), client_socket)
+        JOBS.register(job)
 
+        if options.get("TRACE") and TRACER is not None:
+            trace = TRACER.trace(options["TRACE"], job.id)
+        trace.record("reception", job_start, time.perf_counter() - job_t0, bytes=len(data))
+
+        # Plein : réponse immédiate, le maître route ailleurs ou met en file
+        with trace.span("attente"):
+            admitted = ADMISSION.enter(job.is_cancelled)
+        if not admitted:
+            send_response(client_socket, "Erreur : esclave plein.\n", status="plein")
+            return
+
+        timings, usage = {}, {}
+        run = build_and_run_project if project else compile_and_run_to_files
+        try:
+            output = run(language, filename, code_source, "temp_codes_slave",
+                         job.is_cancelled, trace, timings, usage)
+        finally:
+            ADMISSION.leave()
+        with output, trace.span("envoi"):
+            send_response(client_socket, output, timings=timings, usage=usage)
+
+    except JobCancelled:
+        JOBS.record_cancelled()
+        print(f"[ANNULATION] Job {job.id} annulé ({JOBS.cancelled_count} au total).")
+        with suppress(Exception):
+            send_response(client_socket, f"Erreur : tâche {job.id} annulée.\n")
     except Exception as e:
         error_msg = f"Erreur (serveur esclave) : {str(e)}\n"
         with suppress(Exception):
-            client_socket.sendall(error_msg.encode('utf-8', errors='replace'))
+            send_response(client_socket, error_msg)
     finally:
+        if job is not None:
+            JOBS.unregister(job)
+        trace.record("job", job_start, time.perf_counter() - job_t0)
         with suppress(Exception):
             client_socket.close()
 
 def start_slave_server(host="0.0.0.0", port=6001):
     """Lance le serveur esclave sur le port spécifié."""
+    global TRACER, ADMISSION
+    TRACER = Tracer(f"esclave_{port}")
+    ADMISSION = Admission(SLAVE_MAX_TASKS, SLAVE_QUEUE_SIZE)
+    # Détection des compilateurs avant d'accepter des jobs (résultat gardé en cache)
+    toolchains = probe_toolchains()
+
     server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     server.bind((host, port))
     server.listen(5)
-    print(f"[SERVEUR ESCLAVE] En écoute sur {host}:{port} ...")
+    print(f"[SERVEUR ESCLAVE] En écoute sur {host}:{port} "
+          f"({SLAVE_MAX_TASKS} tâches max, file de {SLAVE_QUEUE_SIZE}, "
+          f"langages : {', '.join(sorted(toolchains)) or 'aucun'}) ...")
 
     while True:
         client_socket, client_address = server.accept()
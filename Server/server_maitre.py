@@ -3,10 +3,39 @@ import threading
 import subprocess
 import os
 import sys
+import math
 import time
-import uuid
+import queue
+import signal
 import shutil
-from contextlib import suppress
+import tempfile
+import itertools
+from contextlib import suppress, contextmanager
+
+import executeur
+from executeur import (
+    safe_filename, compile_and_run_to_files, split_options, parse_slave_header,
+    first_stage, format_stage_stats, COMPILE_POOL, RUN_POOL,
+    Job, JobCancelled, JobRegistry, JobOutput,
+    canonical_language, probe_toolchains, missing_toolchain_message, format_toolchains,
+)
+from traces import Tracer, NO_TRACE
+from resultats import ResultStore, format_store_stats, CANCELLED, FINISHED_STATES
+from historique import (
+    RuntimeHistory, LatencyStats, ResourceStats, source_digest, format_history_stats,
+    format_resource_stats,
+)
+from capture import TrafficCapture
+from partage import SharedState
+from affinite import HashRing, AffinityStats, bounded_order, format_affinity
+from limites import ClientLimiter, format_limiter_stats
+from series import (
+    TimeSeries, CpuMeter, LATENCY_BUCKETS, latency_bucket, histogram_percentile, format_series_stats,
+)
+from projets import (
+    PROJECT_PREFIX, MISSING_PREFIX, SOURCES, read_project_request, resolve_project, project_manifest,
+    project_affinity_key, format_project_request, build_and_run_project,
+)
 
 ##########################################
 # Paramètres de charge et de scaling
@@ -17,13 +46,105 @@ MAX_SLAVES = 5
 # Ports disponibles pour lancer des esclaves (adapter si conflit)
 SLAVE_PORTS = [6001, 6002, 6003, 6004, 6005]
 
-# Listes dynamiques
+# Processus maîtres partageant le port d'écoute (SO_REUSEPORT, sinon socket
+# ouverte avant le fork). 1 = un seul processus, comme avant.
+MASTER_WORKERS = int(os.environ.get("MASTER_WORKERS", "1"))
+if MASTER_WORKERS > 1 and not hasattr(os, "fork"):
+    print("[ATTENTION] MASTER_WORKERS > 1 nécessite fork() : un seul processus maître.")
+    MASTER_WORKERS = 1
+WORKER_INDEX = 0
+CONTROL_PATHS = []     # sockets Unix de contrôle de chaque processus maître (relais entre eux)
+
+# Compteur de tâches locales, limites et registre des esclaves : communs à tous les
+# processus maîtres (mémoire partagée, voir partage.py)
+STATE = SharedState(MAX_TASKS, MAX_SLAVES, SLAVE_PORTS, shared=MASTER_WORKERS > 1,
+                    latency_buckets=LATENCY_BUCKETS, workers=MASTER_WORKERS)
+# Processus des jobs locaux notés dans STATE : tués si leur processus maître meurt
+executeur.PROCESS_TRACKER = STATE
+tasks_lock = STATE.lock
+
+# Listes dynamiques (vue locale du registre, resynchronisée par sync_slave_servers)
 SLAVE_SERVERS = []     # (ip, port) des esclaves
-SLAVE_PROCESSES = []   # Objet subprocess.Popen pour chaque esclave lancé
+SLAVE_PROCESSES = {}   # port -> subprocess.Popen des esclaves lancés par ce processus
+
+# Charge des esclaves : annoncée dans chaque réponse/PING, et jobs envoyés par ce maître
+SLAVE_LOAD = {}       # (ip, port) -> {"running", "queued", "capacity", "queue_max", "status"}
+SLAVE_INFLIGHT = {}   # (ip, port) -> nombre de jobs délégués en cours
+HEARTBEAT_INTERVAL = 2
+
+# Choix de l'esclave : "charge" (le moins chargé) ou "affinite" (même projet ->
+# même esclave, par hachage cohérent, tant que sa charge reste sous AFFINITY_BALANCE
+# fois la moyenne ; voir affinite.py). Les fichiers seuls suivent toujours la charge.
+ROUTING = os.environ.get("ROUTING", "charge").lower()
+AFFINITY_BALANCE = float(os.environ.get("AFFINITY_BALANCE", "1.25"))
+RING = HashRing()
+AFFINITY = AffinityStats()
+slaves_lock = STATE.launch_lock   # un seul lancement d'esclave à la fois (tous processus)
+
+# File centrale : jobs en attente d'un créneau local ou d'un esclave non saturé
+slot_available = STATE.cond
+CENTRAL_QUEUE_TIMEOUT = 30
+BUSY_MESSAGE = "Erreur : serveur occupé, réessayez plus tard.\n"
+
+# Limites par adresse client, désactivées par défaut (0 = pas de limite) ; modifiables
+# via ADMIN SET_RATE_LIMIT / SET_CLIENT_CONNECTIONS. Connexions vérifiées à l'acceptation,
+# débit compté sur les seules soumissions de jobs. Seaux, connexions et réglages sont dans
+# STATE : communs à tous les processus maîtres. Le refus commence comme BUSY_MESSAGE :
+# les clients réessaient plus tard.
+LIMITER = ClientLimiter(
+    rate=float(os.environ.get("RATE_LIMIT", "0")),
+    burst=float(os.environ.get("RATE_BURST", "50")),
+    max_connections=int(os.environ.get("MAX_CLIENT_CONNECTIONS", "0")),
+    state=STATE,
+)
+THROTTLED_MESSAGES = {
+    "debit": "Erreur : serveur occupé (trop de requêtes depuis votre adresse), réessayez plus tard.\n".encode('utf-8'),
+    "connexions": "Erreur : serveur occupé (trop de connexions depuis votre adresse), réessayez plus tard.\n".encode('utf-8'),
+}
 
-# Compteur de tâches locales
-current_tasks = 0
-tasks_lock = threading.Lock()
+# Jobs en cours (annulables par CANCEL|<job_id> ou déconnexion du client)
+JOBS = JobRegistry()
+
+# Jobs asynchrones (SUBMIT / STATUS / FETCH) : file bornée traitée par un nombre fixe
+# de workers, résultats gardés RESULT_TTL secondes dans RESULT_STORE_MB Mo de mémoire
+# (puis sur disque dans RESULT_SPILL_DIR si défini)
+ASYNC_WORKERS = int(os.environ.get("ASYNC_WORKERS", "8"))
+ASYNC_QUEUE_MAX = int(os.environ.get("ASYNC_QUEUE_MAX", "100"))
+ASYNC_QUEUE = queue.PriorityQueue(maxsize=ASYNC_QUEUE_MAX)   # (priorité, n°, job...)
+ASYNC_SEQ = itertools.count()
+RESULTS = ResultStore(
+    max_bytes=int(os.environ.get("RESULT_STORE_MB", "64")) * 1024**2,
+    ttl=int(os.environ.get("RESULT_TTL", "600")),
+    spill_dir=os.environ.get("RESULT_SPILL_DIR", ""),
+)
+
+# Ordonnancement des jobs en attente : "sjf" (plus court job estimé d'abord, d'après
+# l'historique des durées, avec vieillissement) ou "fifo" (ordre d'arrivée)
+SCHEDULER = os.environ.get("SCHEDULER", "sjf").lower()
+SJF_AGING = float(os.environ.get("SJF_AGING", "0.5"))          # s d'estimation retirées par s d'attente
+LONG_JOB_S = float(os.environ.get("SJF_LONG_JOB_S", "1.0"))    # au-delà : esclave libre préféré au local
+WAITING = {}   # job_id -> {"key", "language"} : jobs en attente d'un créneau (sous tasks_lock)
+HISTORY = RuntimeHistory(
+    max_sources=int(os.environ.get("HISTORY_MAX_SOURCES", "5000")),
+    path=os.environ.get("HISTORY_FILE", "historique_jobs.json"),
+)
+HISTORY_SAVE_INTERVAL = 30
+LATENCIES = LatencyStats()
+RESOURCES = ResourceStats()   # CPU, mémoire max et durées des jobs, par langage
+
+# Séries de charge (tampon circulaire, un échantillon par SERIES_INTERVAL secondes) pour
+# le tableau de bord du client : ADMIN GET_SERIES|<ts> renvoie les échantillons récents
+SERIES = TimeSeries()
+
+# Capture du trafic pour rejeu (client/rejeu.py) : CAPTURE=1 ou ADMIN SET_CAPTURE|on
+# (ouverte au démarrage du serveur : un fichier par processus maître)
+CAPTURE = None
+
+# Délai max d'attente de la réponse d'un esclave (compilation + exécution)
+SLAVE_TIMEOUT = 60
+
+# Traces des jobs (fraction échantillonnée modifiable via ADMIN SET_TRACE_SAMPLING)
+TRACER = Tracer("maitre", sample_rate=float(os.environ.get("TRACE_SAMPLING", "0.1")))
 
 ##########################################
 # Paramètres pour le kill d'esclaves
@@ -35,40 +156,6 @@ last_time_low_load = None
 # Sécurisation ADMIN (optionnel) : définir ADMIN_TOKEN dans l'environnement
 ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
 
-##########################################
-# Helpers sécurité/ressources
-##########################################
-
-def safe_filename(filename: str, language: str) -> str:
-    """Nettoie et force l'extension selon le langage."""
-    base = os.path.basename(filename or "")
-    if not base:
-        base = f"main_{uuid.uuid4().hex}"
-    base = "".join(c for c in base if c.isalnum() or c in ("-","_","."))[:64]
-    lang = language.lower().lstrip(".")
-    ext_map = {"python": ".py", "py": ".py", "c": ".c", "cpp": ".cpp", "c++": ".cpp", "java": ".java"}
-    wanted = ext_map.get(lang, "")
-    root, cur = os.path.splitext(base)
-    if wanted and cur.lower() != wanted:
-        base = root + wanted
-    return base
-
-def make_job_dir(root="temp_codes") -> str:
-    d = os.path.join(root, "job_" + uuid.uuid4().hex)
-    os.makedirs(d, exist_ok=True)
-    return d
-
-def _posix_limits():
-    """Limites (CPU/Mémoire/Fichier) pour Unix uniquement."""
-    if os.name != "nt":
-        try:
-            import resource
-            resource.setrlimit(resource.RLIMIT_CPU, (5, 5))            # 5s CPU
-            resource.setrlimit(resource.RLIMIT_AS, (256*1024**2,)*2)   # 256 MB
-            resource.setrlimit(resource.RLIMIT_FSIZE, (10*1024**2,)*2) # 10 MB
-        except Exception:
-            pass
-
 ##########################################
 # Réseau utilitaires
 ##########################################
@@ -86,7 +173,11 @@ def is_port_active(port, host="127.0.0.1"):
 ##########################################
 
 def handle_client(client_socket, client_address):
-    global current_tasks
+    job = None
+    trace = NO_TRACE
+    job_start = time.time()
+    job_t0 = time.perf_counter()
+    job_attrs = {}
     try:
         data = client_socket.recv(10_000_000)
         if not data:
@@ -102,7 +193,38 @@ def handle_client(client_socket, client_address):
             client_socket.close()
             return
 
-        # Sinon, exécution de code
+        # Annulation explicite d'un job : CANCEL|<job_id>
+        if decoded_data.startswith("CANCEL|"):
+            response = handle_cancel_command(decoded_data)
+            client_socket.sendall(response.encode('utf-8', errors='replace'))
+            client_socket.close()
+            return
+
+        # Débit par client : seules les soumissions consomment un jeton (pas STATUS / FETCH)
+        if not decoded_data.startswith(("STATUS|", "FETCH|")):
+            reason = LIMITER.charge(client_address[0])
+            if reason is not None:
+                client_socket.sendall(THROTTLED_MESSAGES[reason])
+                client_socket.close()
+                return
+
+        # Mode asynchrone : réponse immédiate, la connexion n'attend pas le job
+        if decoded_data.startswith(("SUBMIT|", "STATUS|", "FETCH|")):
+            response = handle_async_command(decoded_data)
+            if isinstance(response, str):
+                response = response.encode('utf-8', errors='replace')
+            client_socket.sendall(response)
+            client_socket.close()
+            return
+
+        # Projet multi-fichiers : PROJECT|SIZE=<n>|... (lu en entier, voir projets.py)
+        project = decoded_data.startswith(PROJECT_PREFIX)
+        if project:
+            data = read_project_request(client_socket, data)
+            decoded_data = data.decode('utf-8', errors='replace')
+
+        # Sinon, exécution de code (options facultatives : JOB=<id>|...)
+        options, decoded_data = split_options(decoded_data)
         split_data = decoded_data.split('|', 2)
         if len(split_data) < 3:
             client_socket.sendall(b"Erreur : Donnees invalides.\n")
@@ -113,43 +235,413 @@ def handle_client(client_socket, client_address):
         filename = split_data[1]
         code_source = split_data[2]
 
-        with tasks_lock:
-            if current_tasks >= MAX_TASKS:
-                # Tenter de lancer un nouvel esclave si pas au max
-                maybe_launch_new_slave()
-
-                # Déléguer à un esclave s’il y en a de dispo
-                if SLAVE_SERVERS:
-                    result = delegate_to_slave(language, filename, code_source)
-                    client_socket.sendall(result.encode('utf-8', errors='replace'))
-                    client_socket.close()
-                    return
-                else:
-                    # Sinon, exécution locale par dépit
-                    current_tasks += 1
-            else:
-                current_tasks += 1
+        if project:
+            # Fichiers désignés par empreinte : repris du magasin, sinon redemandés au client
+            files, missing = resolve_project(code_source, SOURCES)
+            if missing:
+                client_socket.sendall(f"{MISSING_PREFIX} {' '.join(missing)}\n".encode('utf-8'))
+                return
+            code_source = project_manifest(files)
+
+        job = Job(options.get("JOB"), client_socket)
+        JOBS.register(job)
 
-        # Exécution locale
-        output = compile_and_run(language, filename, code_source)
-        client_socket.sendall(output.encode('utf-8', errors='replace'))
+        # Trace : identifiant fourni par le client (TRACE=) ou identifiant du job
+        if TRACER.should_sample():
+            trace = TRACER.trace(options.get("TRACE") or job.id, job.id)
+        trace.record("reception", job_start, time.perf_counter() - job_t0, bytes=len(data))
+        job_attrs["language"] = language
+        estimate = estimate_job(language, code_source)
+        capture = CAPTURE
+        if capture is not None:
+            capture.request(job.id, language, filename, code_source, "projet" if project else "sync",
+                            job_start, estimate["digest"])
+
+        # Sortie envoyée par sendfile (fichiers du job) ou relayée depuis l'esclave
+        with execute_job(language, filename, code_source, job, trace, job_attrs, estimate,
+                         project=project) as output:
+            with trace.span("envoi"):
+                output.send(client_socket)
+
+    except JobCancelled:
+        job_attrs["cancelled"] = True
+        JOBS.record_cancelled()
+        print(f"[ANNULATION] Job {job.id} annulé ({client_address}).")
+        with suppress(Exception):
+            client_socket.sendall(f"Erreur : tâche {job.id} annulée.\n".encode('utf-8'))
 
     except Exception as e:
+        job_attrs["error"] = True
         error_msg = f"Erreur (serveur maître) : {str(e)}\n"
         with suppress(Exception):
             client_socket.sendall(error_msg.encode('utf-8', errors='replace'))
 
     finally:
-        with tasks_lock:
-            if current_tasks > 0:
-                current_tasks -= 1
+        if job is not None:
+            JOBS.unregister(job)
+            capture_result(job.id, job_t0, job_attrs)
+            record_latency(time.perf_counter() - job_t0)
+        trace.record("job", job_start, time.perf_counter() - job_t0, **job_attrs)
         with suppress(Exception):
             client_socket.close()
 
-def handle_admin_command(decoded_data, client_address):
-    """Gère les commandes ADMIN (GET_INFO, SET_MAX_TASKS, SET_MAX_SLAVES) avec contrôle d'accès."""
-    global current_tasks, MAX_TASKS, MAX_SLAVES
+def estimate_job(language, code_source):
+    """Durées estimées d'un job d'après l'historique (source déjà vue, sinon langage)."""
+    digest = source_digest(language, code_source)
+    compile_s, run_s, origin = HISTORY.estimate(language, digest)
+    return {"digest": digest, "total": compile_s + run_s, "origin": origin}
+
+def toolchain_error(language):
+    """
+    Message d'erreur si aucun nœud ne peut exécuter ce langage (ni le maître, ni un
+    esclave qui l'annonce), sinon None : le job échoue tout de suite au lieu
+    d'attendre un créneau.
+    """
+    lang = canonical_language(language)
+    if lang in probe_toolchains():
+        return None
+    if lang is not None:
+        with tasks_lock:
+            if any(lang in (SLAVE_LOAD.get(addr) or {}).get("languages", ()) for addr in SLAVE_SERVERS):
+                return None
+    return missing_toolchain_message(language)
+
+def priority_key(estimate, since):
+    """
+    Clé de priorité (la plus petite passe d'abord). En sjf, l'estimation diminue de
+    SJF_AGING par seconde d'attente : estimation - a*(maintenant - since) ordonne les
+    jobs comme estimation + a*since, clé fixe utilisable dans une file de priorité.
+    """
+    if SCHEDULER == "fifo":
+        return since
+    return estimate + SJF_AGING * since
+
+def record_job_timings(language, estimate, timings, arrival, waited, usage=None, job_id=None):
+    """
+    Alimente l'historique des durées, les latences du mode d'ordonnancement courant
+    et les ressources consommées par langage.
+    """
+    if timings:
+        HISTORY.record(language, estimate["digest"], timings.get("compilation", 0.0),
+                       timings.get("execution", 0.0), estimate["total"], estimate["origin"])
+    LATENCIES.record(SCHEDULER, time.monotonic() - arrival, waited)
+    RESOURCES.record(language, usage, job_id)
+
+def execute_job(language, filename, code_source, job, trace=NO_TRACE, job_attrs=None,
+                estimate=None, since=None, project=False):
+    """
+    Route un job : créneau local libre -> exécution locale ; sinon esclave non saturé
+    (d'après sa charge annoncée) ; sinon lancement d'un esclave ou attente dans la
+    file centrale, jusqu'à CENTRAL_QUEUE_TIMEOUT (réponse "serveur occupé").
+    Seuls les nœuds qui ont les outils du langage sont utilisés ; s'il n'y en a
+    aucun, le job échoue immédiatement avec un message clair.
+    Les jobs en attente sont servis par priorité (voir priority_key) et un job long
+    part de préférence sur un esclave libre pour laisser les créneaux locaux aux courts.
+    Avec `project`, code_source est le manifeste complet d'un projet (voir projets.py).
+    Retourne un JobOutput, à fermer après envoi.
+    """
+    if job_attrs is None:
+        job_attrs = {}
+    error = toolchain_error(language)
+    if error is not None:
+        job_attrs.update(mode="refuse", error=True)
+        return JobOutput.text(error)
+    if estimate is None:
+        estimate = estimate_job(language, code_source)
+    arrival = time.monotonic() if since is None else since
+    job_attrs["estimation"] = round(estimate["total"], 3)
+    # Exécution locale seulement si le maître a les outils du langage
+    local_capable = canonical_language(language) in probe_toolchains()
+    waiter = {"key": priority_key(estimate["total"], arrival), "language": language,
+              "local": local_capable}
+    prefer_slave = SCHEDULER == "sjf" and estimate["total"] >= LONG_JOB_S
+    affinity_key = None
+    if ROUTING == "affinite" and project:
+        # Un projet garde son esclave d'une version à l'autre : clé sans les contenus, pour
+        # les succès du cache par unité (voir project_affinity_key). Un fichier seul est
+        # recompilé partout : l'affinité ne lui ferait rien gagner
+        affinity_key = project_affinity_key(language, filename, code_source)
+
+    wait_start = time.time()
+    wait_t0 = time.perf_counter()
+    deadline = time.monotonic() + CENTRAL_QUEUE_TIMEOUT
+    launch_attempted = False
+    wait_recorded = False
+
+    try:
+        while True:
+            with tasks_lock:
+                WAITING[job.id] = waiter
+                # Jobs prioritaires en attente : ils passent avant celui-ci
+                ahead = [w for w in WAITING.values() if w["key"] < waiter["key"]]
+                # Créneau local : limite globale ET place dans la première étape du job
+                # (un Python n'attend pas derrière des compilations Java). Les jobs admis
+                # en local pas encore exécutés comptent aussi (réservations, voir local_task_slot)
+                local = (local_capable and STATE.current_tasks + STATE.local_claims < STATE.max_tasks
+                         and first_stage(language).has_room()
+                         and not any(w["local"] and first_stage(w["language"]).has_room() for w in ahead))
+                candidates = [] if ahead else pick_slaves(affinity_key, language)
+                if local and prefer_slave and candidates and slave_idle_slots(candidates[0]) > 0:
+                    local = False
+                if local:
+                    claim_local_slot()
+                    candidates = []
+                if local or candidates:
+                    del WAITING[job.id]
+
+            if (local or candidates) and not wait_recorded:
+                waited = time.perf_counter() - wait_t0
+                trace.record("attente", wait_start, waited)
+                wait_recorded = True
+
+            if local:
+                job_attrs["mode"] = "local"
+                timings, usage = {}, {}
+                run = build_and_run_project if project else compile_and_run_to_files
+                try:
+                    output = run(language, filename, code_source, "temp_codes",
+                                 job.is_cancelled, trace, timings, usage)
+                finally:
+                    drop_local_claim()
+                record_job_timings(language, estimate, timings, arrival, waited, usage, job.id)
+                return output
+
+            if candidates:
+                timings, usage = {}, {}
+                result = delegate_to_slave(language, filename, code_source, job, trace, candidates, timings,
+                                           affinity_key, usage, project)
+                if result is not None:
+                    job_attrs["mode"] = "esclave"
+                    record_job_timings(language, estimate, timings, arrival, waited, usage, job.id)
+                    return result
+            elif not launch_attempted and not ahead:
+                # Tous les esclaves sont saturés (ou aucun) : en lancer un nouveau si possible
+                launch_attempted = True
+                with trace.span("lancement_esclave"):
+                    if maybe_launch_new_slave():
+                        continue
+
+            # File centrale : attendre qu'un créneau local ou esclave se libère
+            with tasks_lock:
+                STATE.central_waiting += 1
+                try:
+                    slot_available.wait(0.5)
+                finally:
+                    STATE.central_waiting -= 1
+            if job.is_cancelled():
+                raise JobCancelled()
+            if time.monotonic() >= deadline:
+                job_attrs["mode"] = "occupe"
+                return JobOutput.text(BUSY_MESSAGE)
+    finally:
+        with tasks_lock:
+            WAITING.pop(job.id, None)
+
+# Réservation MAX_TASKS du job local traité par ce thread (prise à la décision locale)
+_local_claim = threading.local()
+
+def claim_local_slot():
+    """Réserve un créneau MAX_TASKS pour le job local de ce thread (sous tasks_lock)."""
+    STATE.local_claims += 1
+    _local_claim.held = True
+
+def drop_local_claim():
+    """Rend la réservation d'un job qui n'a pas atteint l'exécution (erreur de compilation, annulation)."""
+    if not getattr(_local_claim, "held", False):
+        return
+    _local_claim.held = False
+    with tasks_lock:
+        if STATE.local_claims > 0:
+            STATE.local_claims -= 1
+        slot_available.notify_all()
+
+@contextmanager
+def local_task_slot(cancel_check=None):
+    """
+    Créneau MAX_TASKS d'un job local à l'étape d'exécution (RUN_POOL.gate). La
+    réservation prise à la décision locale devient une tâche en cours : les jobs
+    admis ensemble ne s'empilent donc pas derrière ce créneau. Sans réservation,
+    on attend qu'un créneau se libère.
+    """
+    with tasks_lock:
+        if getattr(_local_claim, "held", False):
+            _local_claim.held = False
+            if STATE.local_claims > 0:
+                STATE.local_claims -= 1
+        else:
+            while STATE.current_tasks + STATE.local_claims >= STATE.max_tasks:
+                slot_available.wait(0.5)
+                if cancel_check is not None and cancel_check():
+                    raise JobCancelled()
+        STATE.current_tasks += 1
+    try:
+        yield
+    finally:
+        release_local_slot()
+
+RUN_POOL.gate = local_task_slot
+
+def release_local_slot():
+    with tasks_lock:
+        if STATE.current_tasks > 0:
+            STATE.current_tasks -= 1
+        # Tous les jobs en attente sont réveillés : seul le prioritaire prend le créneau
+        slot_available.notify_all()
+
+def handle_cancel_command(decoded_data, forwarded=False):
+    """
+    Annule le job CANCEL|<job_id> (local ou délégué à un esclave). Un job inconnu
+    de ce processus est cherché chez les autres processus maîtres.
+    """
+    job_id = decoded_data.split('|', 1)[1].strip()
+    if not job_id:
+        return "Erreur : identifiant de job manquant."
+    if JOBS.cancel(job_id):
+        return f"OK: annulation du job {job_id} demandée."
+    if not forwarded:
+        for response in forward_to_workers(decoded_data):
+            if response.startswith(b"OK"):
+                return response.decode('utf-8', errors='replace')
+    return f"Erreur : job inconnu ou déjà terminé : {job_id}"
+
+##########################################
+# Jobs asynchrones
+##########################################
+
+def handle_async_command(decoded_data, forwarded=False):
+    """
+    SUBMIT|[JOB=id|]language|filename|code, STATUS|<job_id>, FETCH|<job_id>.
+    Le résultat est gardé par le processus maître qui a reçu le SUBMIT : STATUS et
+    FETCH d'un job inconnu ici sont relayés aux autres processus.
+    """
+    command, _, rest = decoded_data.partition('|')
+    if command == "SUBMIT":
+        return submit_async_job(rest)
+
+    job_id = rest.strip()
+    if not job_id:
+        return "Erreur : identifiant de job manquant.\n"
+
+    if command == "STATUS":
+        entry = RESULTS.status(job_id)
+        if entry is None and not forwarded:
+            for response in forward_to_workers(decoded_data):
+                if response and not response.startswith(b"STATUT: inconnu"):
+                    return response
+        return f"STATUT: {entry['status'] if entry else 'inconnu'}\n"
+
+    # FETCH : la sortie est renvoyée telle quelle (octets déjà encodés)
+    status, output = RESULTS.fetch(job_id)
+    if status is None:
+        if not forwarded:
+            for response in forward_to_workers(decoded_data):
+                if response and not response.startswith("Erreur : job inconnu".encode('utf-8')):
+                    return response
+        return f"Erreur : job inconnu ou expiré : {job_id}\n"
+    if status not in FINISHED_STATES:
+        return f"Erreur : job {job_id} pas encore terminé ({status}).\n"
+    if output is None:
+        return f"Erreur : résultat du job {job_id} évincé (mémoire pleine).\n"
+    return output
+
+def submit_async_job(data):
+    """Met le job dans la file asynchrone et retourne immédiatement son identifiant."""
+    options, data = split_options(data)
+    split_data = data.split('|', 2)
+    if len(split_data) < 3:
+        return "Erreur : Donnees invalides.\n"
+    language, filename, code_source = split_data
+    error = toolchain_error(language)
+    if error is not None:
+        return error
+
+    job = Job(options.get("JOB"))
+    if not RESULTS.create(job.id):
+        return f"Erreur : identifiant de job déjà utilisé : {job.id}\n"
+    trace = NO_TRACE
+    if TRACER.should_sample():
+        trace = TRACER.trace(options.get("TRACE") or job.id, job.id)
+
+    # File de priorité : même ordre que la file centrale (voir priority_key)
+    estimate = estimate_job(language, code_source)
+    since = time.monotonic()
+    job_start, job_t0 = time.time(), time.perf_counter()
+    capture = CAPTURE
+    if capture is not None:
+        capture.request(job.id, language, filename, code_source, "async", job_start, estimate["digest"])
+    JOBS.register(job)
+    try:
+        ASYNC_QUEUE.put_nowait((priority_key(estimate["total"], since), next(ASYNC_SEQ),
+                                job, language, filename, code_source, trace, estimate, since,
+                                job_start, job_t0))
+    except queue.Full:
+        JOBS.unregister(job)
+        RESULTS.forget(job.id)
+        capture_result(job.id, job_t0, {"mode": "occupe"})
+        return BUSY_MESSAGE
+    return f"OK: {job.id}\n"
+
+def capture_result(job_id, job_t0, job_attrs):
+    """Enregistre la fin d'un job dans la capture de trafic en cours (s'il y en a une)."""
+    capture = CAPTURE
+    if capture is None:
+        return
+    if job_attrs.get("cancelled"):
+        status = "annule"
+    elif job_attrs.get("error"):
+        status = "erreur"
+    elif job_attrs.get("mode") == "occupe":
+        status = "occupe"
+    else:
+        status = "ok"
+    capture.result(job_id, time.perf_counter() - job_t0, status)
+
+def record_latency(seconds):
+    """Compte un job terminé dans l'histogramme partagé des latences (séries de charge)."""
+    bucket = latency_bucket(seconds)
+    with tasks_lock:
+        STATE.latency_counts[bucket] += 1
+
+def async_worker_thread():
+    """Exécute les jobs asynchrones ; en file, un job n'occupe ni thread ni connexion."""
+    while True:
+        (_, _, job, language, filename, code_source, trace, estimate, since,
+         job_start, job_t0) = ASYNC_QUEUE.get()
+        job_attrs = {"language": language, "async": True}
+        try:
+            if job.is_cancelled():
+                raise JobCancelled()
+            RESULTS.start(job.id)
+            trace.record("file_async", job_start, time.perf_counter() - job_t0)
+            with execute_job(language, filename, code_source, job, trace, job_attrs,
+                             estimate, since) as output:
+                RESULTS.complete(job.id, output.read_bytes())
+        except JobCancelled:
+            job_attrs["cancelled"] = True
+            JOBS.record_cancelled()
+            print(f"[ANNULATION] Job asynchrone {job.id} annulé.")
+            RESULTS.complete(job.id, f"Erreur : tâche {job.id} annulée.\n".encode('utf-8'), CANCELLED)
+        except Exception as e:
+            job_attrs["error"] = True
+            RESULTS.complete(job.id, f"Erreur (serveur maître) : {str(e)}\n".encode('utf-8', errors='replace'))
+        finally:
+            JOBS.unregister(job)
+            capture_result(job.id, job_t0, job_attrs)
+            record_latency(time.perf_counter() - job_t0)
+            trace.record("job", job_start, time.perf_counter() - job_t0, **job_attrs)
+
+# Réglages propres à chaque processus maître : appliqués puis relayés aux autres
+# (MAX_TASKS et MAX_SLAVES sont déjà en mémoire partagée)
+BROADCAST_ADMIN = ("SET_COMPILE_SLOTS", "SET_RUN_SLOTS", "SET_SCHEDULER", "SET_ROUTING",
+                   "SET_CAPTURE", "SET_TRACE_SAMPLING")
 
+def handle_admin_command(decoded_data, client_address, forwarded=False):
+    """
+    Gère les commandes ADMIN (GET_INFO, GET_SERIES, SET_MAX_TASKS, SET_MAX_SLAVES,
+    SET_COMPILE_SLOTS, SET_RUN_SLOTS, SET_SCHEDULER, SET_ROUTING, SET_CAPTURE,
+    SET_TRACE_SAMPLING, SET_RATE_LIMIT, SET_CLIENT_CONNECTIONS) avec contrôle d'accès.
+    `forwarded` : commande relayée par un autre processus maître (déjà autorisée).
+    """
     parts = decoded_data.split('|')
     if len(parts) < 2:
         return "Erreur : commande ADMIN invalide."
@@ -163,22 +655,77 @@ def handle_admin_command(decoded_data, client_address):
 
     # Autorisation : local OU token valide si défini
     is_local = client_address[0] in ("127.0.0.1", "::1")
-    if not is_local and (not ADMIN_TOKEN or token != ADMIN_TOKEN):
+    if not forwarded and not is_local and (not ADMIN_TOKEN or token != ADMIN_TOKEN):
         return "Erreur : ADMIN non autorisée."
 
     if len(parts) <= idx:
         return "Erreur : sous-commande ADMIN manquante."
     subcommand = parts[idx].upper()
 
+    response = run_admin_subcommand(subcommand, parts, idx)
+    if subcommand in BROADCAST_ADMIN and not forwarded and response.startswith("OK"):
+        forward_to_workers(decoded_data)
+    return response
+
+def run_admin_subcommand(subcommand, parts, idx):
+    global SCHEDULER, ROUTING, CAPTURE
+
     if subcommand == "GET_INFO":
+        with tasks_lock:
+            slave_lines = "".join(
+                f"   * {ip}:{port} : {load.get('running', '?')}/{load.get('capacity', '?')} en cours, "
+                f"{load.get('queued', '?')}/{load.get('queue_max', '?')} en file, "
+                f"{SLAVE_INFLIGHT.get((ip, port), 0)} délégué(s) ({load.get('status', 'inconnu')})"
+                + "".join(f", {name} {util:.0%}" for name, util in load.get("stages", {}).items())
+                + format_affinity(AFFINITY.get((ip, port)))
+                + (f", langages {', '.join(load['languages'])}" if "languages" in load else "")
+                + "\n"
+                for (ip, port), load in ((addr, SLAVE_LOAD.get(addr, {})) for addr in SLAVE_SERVERS)
+            )
+            running, max_tasks, max_slaves = STATE.current_tasks, STATE.max_tasks, STATE.max_slaves
+            waiting, claims = STATE.central_waiting, STATE.local_claims
+        capture = CAPTURE
+        capture_line = (f" - Capture du trafic: {capture.path} ({capture.requests} requêtes)\n"
+                        if capture is not None else "")
+        home, hits = AFFINITY.totals()
+        routing_line = f" - Routage des esclaves: {ROUTING}"
+        if ROUTING == "affinite" or home:
+            routing_line += (f" (charge bornée à {AFFINITY_BALANCE:g}x la moyenne, "
+                             f"succès d'affinité des projets {hits}/{home}, anneau recalculé {RING.changes} fois)")
+        workers_line = (f" - Processus maîtres: {MASTER_WORKERS} (réponse du n°{WORKER_INDEX}, "
+                        f"files et statistiques ci-dessous propres à ce processus)\n"
+                        if MASTER_WORKERS > 1 else "")
         return (
             "INFO:\n"
-            f" - Tâches en cours: {current_tasks}\n"
-            f" - MAX_TASKS: {MAX_TASKS}\n"
-            f" - MAX_SLAVES: {MAX_SLAVES}\n"
+            f"{workers_line}"
+            f" - Tâches en cours: {running} (+{claims} admise(s) en local, en compilation ou en attente)\n"
+            f" - MAX_TASKS: {max_tasks}\n"
+            f" - MAX_SLAVES: {max_slaves}\n"
+            f"{format_toolchains()}"
             f" - Nombre d'esclaves actifs: {len(SLAVE_SERVERS)}\n"
+            f"{slave_lines}"
+            f"{routing_line}\n"
+            f" - Jobs en file centrale: {waiting}\n"
+            f"{format_stage_stats()}"
+            f" - File asynchrone: {ASYNC_QUEUE.qsize()}/{ASYNC_QUEUE_MAX} ({ASYNC_WORKERS} workers)\n"
+            f"{format_store_stats(RESULTS)}"
+            f"{format_history_stats(HISTORY, LATENCIES, SCHEDULER)}"
+            f"{format_resource_stats(RESOURCES)}"
+            f"{format_series_stats(SERIES)}"
+            f" - Tâches annulées: {JOBS.cancelled_count}\n"
+            f"{format_limiter_stats(LIMITER)}"
+            f"{capture_line}"
+            f" - Échantillonnage des traces: {TRACER.sample_rate:g}\n"
         )
 
+    elif subcommand == "GET_SERIES":
+        # Échantillons postérieurs à <ts> (secondes epoch ; absent ou 0 : tout le tampon)
+        try:
+            since = float(parts[idx + 1]) if len(parts) > idx + 1 and parts[idx + 1] else 0.0
+        except ValueError:
+            return "Erreur : valeur GET_SERIES invalide (horodatage en secondes attendu)."
+        return "OK: " + SERIES.to_json(since)
+
     elif subcommand == "SET_MAX_TASKS":
         if len(parts) <= idx + 1:
             return "Erreur : valeur SET_MAX_TASKS manquante."
@@ -186,8 +733,10 @@ def handle_admin_command(decoded_data, client_address):
             new_max = int(parts[idx + 1])
             if new_max < 1:
                 return "Erreur : la valeur de MAX_TASKS doit être >= 1."
-            MAX_TASKS = new_max
-            return f"OK: MAX_TASKS est maintenant {MAX_TASKS}."
+            with tasks_lock:
+                STATE.max_tasks = new_max
+                slot_available.notify_all()
+            return f"OK: MAX_TASKS est maintenant {new_max}."
         except ValueError:
             return "Erreur : valeur SET_MAX_TASKS invalide (entier attendu)."
 
@@ -198,26 +747,128 @@ def handle_admin_command(decoded_data, client_address):
             new_max_slaves = int(parts[idx + 1])
             if new_max_slaves < 0:
                 return "Erreur : la valeur de MAX_SLAVES doit être >= 0."
-            MAX_SLAVES = new_max_slaves
-            return f"OK: MAX_SLAVES est maintenant {MAX_SLAVES}."
+            with tasks_lock:
+                STATE.max_slaves = new_max_slaves
+            return f"OK: MAX_SLAVES est maintenant {new_max_slaves}."
         except ValueError:
             return "Erreur : valeur SET_MAX_SLAVES invalide (entier attendu)."
 
+    elif subcommand in ("SET_COMPILE_SLOTS", "SET_RUN_SLOTS"):
+        pool = COMPILE_POOL if subcommand == "SET_COMPILE_SLOTS" else RUN_POOL
+        if len(parts) <= idx + 1:
+            return f"Erreur : valeur {subcommand} manquante."
+        try:
+            new_limit = int(parts[idx + 1])
+            if new_limit < 1:
+                return f"Erreur : la valeur de {subcommand} doit être >= 1."
+            pool.set_limit(new_limit)
+            return f"OK: {pool.limit} créneau(x) pour l'étape {pool.name}."
+        except ValueError:
+            return f"Erreur : valeur {subcommand} invalide (entier attendu)."
+
+    elif subcommand == "SET_SCHEDULER":
+        if len(parts) <= idx + 1:
+            return "Erreur : valeur SET_SCHEDULER manquante."
+        mode = parts[idx + 1].strip().lower()
+        if mode not in ("sjf", "fifo"):
+            return "Erreur : ordonnancement inconnu (sjf ou fifo)."
+        SCHEDULER = mode
+        return f"OK: ordonnancement {SCHEDULER}."
+
+    elif subcommand == "SET_ROUTING":
+        if len(parts) <= idx + 1:
+            return "Erreur : valeur SET_ROUTING manquante."
+        mode = parts[idx + 1].strip().lower()
+        if mode not in ("charge", "affinite"):
+            return "Erreur : routage inconnu (charge ou affinite)."
+        ROUTING = mode
+        return f"OK: routage des esclaves {ROUTING}."
+
+    elif subcommand == "SET_RATE_LIMIT":
+        # SET_RATE_LIMIT|<soumissions/s>[|<rafale>] ; 0 = pas de limite de débit
+        if len(parts) <= idx + 1:
+            return "Erreur : valeur SET_RATE_LIMIT manquante."
+        try:
+            rate = float(parts[idx + 1])
+            burst = float(parts[idx + 2]) if len(parts) > idx + 2 else max(LIMITER.burst, rate)
+            if not (math.isfinite(rate) and math.isfinite(burst)):
+                # nan / inf passeraient les comparaisons et casseraient le seau à jetons
+                raise ValueError(parts[idx + 1])
+            if rate < 0 or (rate and burst < 1):
+                return "Erreur : débit >= 0 et rafale >= 1 attendus."
+            LIMITER.configure(rate=rate, burst=burst)
+            if not rate:
+                return "OK: débit par client illimité."
+            return f"OK: {rate:g} soumissions/s par client (rafale {burst:g})."
+        except ValueError:
+            return "Erreur : valeur SET_RATE_LIMIT invalide (réels attendus)."
+
+    elif subcommand == "SET_CLIENT_CONNECTIONS":
+        if len(parts) <= idx + 1:
+            return "Erreur : valeur SET_CLIENT_CONNECTIONS manquante."
+        try:
+            new_max = int(parts[idx + 1])
+            if new_max < 0:
+                return "Erreur : la valeur de SET_CLIENT_CONNECTIONS doit être >= 0."
+            LIMITER.configure(max_connections=new_max)
+            if not new_max:
+                return "OK: connexions par client illimitées."
+            return f"OK: {new_max} connexion(s) simultanée(s) par client."
+        except ValueError:
+            return "Erreur : valeur SET_CLIENT_CONNECTIONS invalide (entier attendu)."
+
+    elif subcommand == "SET_CAPTURE":
+        if len(parts) <= idx + 1:
+            return "Erreur : valeur SET_CAPTURE manquante (on ou off)."
+        value = parts[idx + 1].strip().lower()
+        if value == "on":
+            if CAPTURE is None:
+                CAPTURE = start_capture()
+            return f"OK: capture du trafic dans {CAPTURE.path}."
+        if value == "off":
+            capture, CAPTURE = CAPTURE, None
+            if capture is None:
+                return "OK: aucune capture en cours."
+            capture.close()
+            return f"OK: capture arrêtée ({capture.requests} requêtes dans {capture.path})."
+        return "Erreur : valeur SET_CAPTURE invalide (on ou off)."
+
+    elif subcommand == "SET_TRACE_SAMPLING":
+        if len(parts) <= idx + 1:
+            return "Erreur : valeur SET_TRACE_SAMPLING manquante."
+        try:
+            rate = float(parts[idx + 1])
+            if not 0.0 <= rate <= 1.0:
+                return "Erreur : le taux d'échantillonnage doit être entre 0 et 1."
+            TRACER.set_sample_rate(rate)
+            return f"OK: échantillonnage des traces à {TRACER.sample_rate:g}."
+        except ValueError:
+            return "Erreur : valeur SET_TRACE_SAMPLING invalide (réel attendu)."
+
     else:
         return f"Erreur : sous-commande ADMIN inconnue : {subcommand}"
 
 def maybe_launch_new_slave():
-    global MAX_SLAVES
+    """Lance un esclave si la limite le permet. Retourne True si un esclave a été ajouté."""
+    # Un seul lancement à la fois : les autres jobs attendent dans la file centrale
+    if not slaves_lock.acquire(False):
+        return False
+    try:
+        return _launch_new_slave()
+    finally:
+        slaves_lock.release()
 
-    if len(SLAVE_PROCESSES) >= MAX_SLAVES:
+def _launch_new_slave():
+    with tasks_lock:
+        active = len(STATE.slave_addresses())
+        free_ports = STATE.free_ports()
+        max_slaves = STATE.max_slaves
+    if active >= max_slaves:
         print("[INFO] Nombre max d'esclaves déjà atteint.")
-        return
-
-    used_ports = {p for (_, p) in SLAVE_SERVERS}
-    free_ports = [p for p in SLAVE_PORTS if p not in used_ports]
+        return False
     if not free_ports:
         print("[INFO] Plus de ports esclaves disponibles.")
-        return
+        return False
 
     new_port = free_ports[0]
 
@@ -236,11 +887,18 @@ def maybe_launch_new_slave():
     )
     time.sleep(2)  # Laisser l'esclave démarrer
 
-    # Vérifier si le port est actif
-    if is_port_active(new_port, "127.0.0.1"):
-        SLAVE_PROCESSES.append(proc)
-        SLAVE_SERVERS.append(("127.0.0.1", new_port))
-        print(f"[LANCEMENT ESCLAVE] Nouveau serveur esclave lancé sur le port {new_port}.")
+    # Vérifier si le port est actif (et récupérer sa capacité)
+    load = ping_slave("127.0.0.1", new_port)
+    if load is not None:
+        with tasks_lock:
+            SLAVE_PROCESSES[new_port] = proc
+            STATE.set_slave(new_port, proc.pid)
+            sync_slave_servers()
+            SLAVE_LOAD[("127.0.0.1", new_port)] = load
+            slot_available.notify_all()
+        print(f"[LANCEMENT ESCLAVE] Nouveau serveur esclave lancé sur le port {new_port} "
+              f"(capacité {load.get('capacity')}).")
+        return True
     else:
         print(f"[ERREUR ESCLAVE] Le port {new_port} n'est pas actif après démarrage.")
         with suppress(Exception):
@@ -248,104 +906,244 @@ def maybe_launch_new_slave():
             time.sleep(1)
             if proc.poll() is None:
                 proc.kill()
+        return False
 
-def delegate_to_slave(language, filename, code_source):
-    """Essaye de déléguer la tâche au premier esclave actif avec timeout réseau."""
-    if not SLAVE_SERVERS:
-        return "Erreur : aucun serveur esclave disponible.\n"
+##########################################
+# Charge des esclaves
+##########################################
+
+def ping_slave(ip, port):
+    """Battement de cœur : retourne la charge annoncée par l'esclave, ou None."""
+    try:
+        with socket.create_connection((ip, port), timeout=2) as s:
+            s.sendall(b"PING")
+            data = b""
+            while b"\n" not in data:
+                chunk = s.recv(1024)
+                if not chunk:
+                    break
+                data += chunk
+        return parse_slave_header(data.split(b"\n", 1)[0].decode('utf-8', errors='replace'))
+    except Exception:
+        return None
+
+def update_slave_load(addr, load):
+    """Enregistre la charge annoncée (à appeler sous tasks_lock)."""
+    if load is None:
+        SLAVE_LOAD[addr] = {"status": "injoignable"}
+        return
+    SLAVE_LOAD[addr] = load
+    if slave_free_slots(addr) > 0:
+        slot_available.notify_all()
+
+def slave_used_slots(addr):
+    """Jobs en cours ou en file : le plus pessimiste entre charge annoncée et jobs envoyés."""
+    load = SLAVE_LOAD.get(addr) or {}
+    return max(load.get("running", 0) + load.get("queued", 0), SLAVE_INFLIGHT.get(addr, 0))
+
+def slave_free_slots(addr):
+    """Créneaux libres (exécution + file)."""
+    load = SLAVE_LOAD.get(addr)
+    if not load or "capacity" not in load:
+        return 0 if load else 1 - SLAVE_INFLIGHT.get(addr, 0)
+    return load["capacity"] + load["queue_max"] - slave_used_slots(addr)
+
+def slave_idle_slots(addr):
+    """Créneaux d'exécution immédiatement libres sur un esclave (hors file)."""
+    load = SLAVE_LOAD.get(addr) or {}
+    used = max(load.get("running", 0), SLAVE_INFLIGHT.get(addr, 0))
+    return load.get("capacity", 1) - used
+
+def slave_supports(addr, language):
+    """Vrai si l'esclave annonce ce langage (ou n'a encore rien annoncé)."""
+    languages = (SLAVE_LOAD.get(addr) or {}).get("languages")
+    return languages is None or canonical_language(language) in languages
+
+def pick_slaves(affinity_key=None, language=None):
+    """
+    Esclaves non saturés, ceux qui peuvent exécuter tout de suite en premier (sous tasks_lock).
+    Avec un langage : seulement les esclaves qui l'annoncent.
+    Avec une clé d'affinité : ordre de l'anneau de hachage, esclaves trop chargés en dernier.
+    """
+    candidates = [addr for addr in SLAVE_SERVERS if slave_free_slots(addr) > 0
+                  and (language is None or slave_supports(addr, language))]
+    if affinity_key is not None:
+        if RING.update(SLAVE_SERVERS):
+            print(f"[AFFINITE] Anneau recalculé ({len(SLAVE_SERVERS)} esclave(s)).")
+        loads = {addr: slave_used_slots(addr) for addr in SLAVE_SERVERS}
+        order = bounded_order(RING.preference(affinity_key), loads, AFFINITY_BALANCE)
+        return [addr for addr in order if addr in candidates]
+    candidates.sort(key=lambda addr: (-slave_idle_slots(addr), -slave_free_slots(addr)))
+    return candidates
+
+def sync_slave_servers():
+    """
+    Aligne SLAVE_SERVERS sur le registre partagé : esclaves lancés ou arrêtés par un
+    autre processus maître (à appeler sous tasks_lock).
+    """
+    registered = STATE.slave_addresses()
+    for addr in [a for a in SLAVE_SERVERS if a not in registered]:
+        SLAVE_SERVERS.remove(addr)
+        SLAVE_LOAD.pop(addr, None)
+    SLAVE_SERVERS.extend(a for a in registered if a not in SLAVE_SERVERS)
 
-    payload = f"{language}|{safe_filename(filename, language)}|{code_source}"
+def reap_slave_processes():
+    """Récupère le code de sortie des esclaves lancés ici et arrêtés depuis (pas de zombies)."""
+    for port, proc in list(SLAVE_PROCESSES.items()):
+        if proc.poll() is not None:
+            del SLAVE_PROCESSES[port]
 
-    for i, (slave_ip, slave_port) in enumerate(SLAVE_SERVERS):
+def slave_heartbeat_thread():
+    """Interroge périodiquement chaque esclave (PING) pour connaître sa charge."""
+    while True:
+        time.sleep(HEARTBEAT_INTERVAL)
+        with tasks_lock:
+            sync_slave_servers()
+        reap_slave_processes()
+        for addr in list(SLAVE_SERVERS):
+            load = ping_slave(*addr)
+            with tasks_lock:
+                if addr in SLAVE_SERVERS:
+                    update_slave_load(addr, load)
+
+def send_cancel_to_slave(slave_ip, slave_port, job_id):
+    """Propage une annulation à l'esclave qui exécute le job."""
+    with suppress(Exception):
+        with socket.create_connection((slave_ip, slave_port), timeout=2) as s:
+            s.sendall(f"CANCEL|{job_id}".encode('utf-8'))
+            s.recv(1024)
+
+def delegate_to_slave(language, filename, code_source, job, trace=NO_TRACE, candidates=None,
+                      timings=None, affinity_key=None, usage=None, project=False):
+    """
+    Délègue la tâche au premier esclave de `candidates` qui l'accepte.
+    Retourne la sortie (JobOutput lisant la socket de l'esclave), ou None si tous
+    sont pleins ou injoignables. Les durées annoncées par l'esclave sont copiées
+    dans `timings`, les ressources consommées dans `usage`. Avec `affinity_key`,
+    l'esclave qui a servi est comparé à l'esclave attitré de la clé (statistiques
+    d'affinité). Avec `project`, le manifeste complet part en requête PROJECT.
+    """
+    if candidates is None:
+        with tasks_lock:
+            candidates = pick_slaves(affinity_key)
+
+    # L'identifiant de trace n'est propagé que si le job est échantillonné
+    trace_opt = f"TRACE={trace.trace_id}|" if trace.enabled else ""
+    if project:
+        payload = format_project_request(language, filename, code_source, f"JOB={job.id}|{trace_opt}")
+    else:
+        payload = f"JOB={job.id}|{trace_opt}{language}|{safe_filename(filename, language)}|{code_source}"
+        payload = payload.encode('utf-8')
+
+    for addr in candidates:
+        slave_ip, slave_port = addr
+        with tasks_lock:
+            SLAVE_INFLIGHT[addr] = SLAVE_INFLIGHT.get(addr, 0) + 1
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        keep_socket = False
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(10)
+            s.settimeout(10)
+            with trace.span("connexion_esclave", slave=f"{slave_ip}:{slave_port}"):
                 s.connect((slave_ip, slave_port))
-                s.sendall(payload.encode('utf-8'))
+                s.sendall(payload)
 
-                result = []
-                while True:
-                    chunk = s.recv(4096)
+            # Lecture par petites attentes pour pouvoir réagir à une annulation.
+            # L'esclave n'envoie l'en-tête qu'une fois le job fini : seul l'en-tête
+            # est lu ici, la sortie sera relayée au client sans être décodée.
+            s.settimeout(0.5)
+            deadline = time.monotonic() + SLAVE_TIMEOUT
+            data = b""
+            with trace.span("esclave", slave=f"{slave_ip}:{slave_port}") as span_attrs:
+                while b"\n" not in data:
+                    try:
+                        chunk = s.recv(65536)
+                    except socket.timeout:
+                        if job.is_cancelled():
+                            send_cancel_to_slave(slave_ip, slave_port, job.id)
+                            raise JobCancelled()
+                        if time.monotonic() >= deadline:
+                            raise
+                        continue
                     if not chunk:
                         break
-                    result.append(chunk.decode('utf-8', errors='replace'))
-                return "".join(result)
+                    data += chunk
 
+                # En-tête de charge, puis sortie du job
+                header, _, body = data.partition(b"\n")
+                load = parse_slave_header(header.decode('utf-8', errors='replace'))
+                if load is None:
+                    # Esclave sans en-tête : toute la réponse est la sortie
+                    body = data
+                else:
+                    span_attrs["status"] = load.get("status")
+                    with tasks_lock:
+                        update_slave_load(addr, load)
+                    if load.get("status") == "plein":
+                        continue
+                    if timings is not None:
+                        timings.update(load.get("timings") or {})
+                    if usage is not None:
+                        usage.update(load.get("ressources") or {})
+            if affinity_key is not None:
+                with tasks_lock:
+                    preference = RING.preference(affinity_key)
+                if preference:
+                    AFFINITY.record(preference[0], addr)
+            keep_socket = True
+            return JobOutput([body, s])
+
+        except JobCancelled:
+            raise
         except Exception as e:
             print(f"[ERREUR] Impossible de contacter l'esclave {slave_ip}:{slave_port}. {e}")
-            # On pourrait retirer l'esclave défectueux ici si nécessaire
-            pass
-
-    return "Erreur : aucun esclave actif disponible.\n"
+            with tasks_lock:
+                update_slave_load(addr, None)
+        finally:
+            if not keep_socket:
+                s.close()
+            with tasks_lock:
+                SLAVE_INFLIGHT[addr] = max(0, SLAVE_INFLIGHT.get(addr, 0) - 1)
+                slot_available.notify_all()
 
-def compile_and_run(language, filename, code):
-    """Exécution locale : compile/interprète le code selon le langage avec timeouts et limites."""
-    job_dir = make_job_dir("temp_codes")
-    filepath = os.path.join(job_dir, safe_filename(filename, language))
+    return None
 
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(code)
-
-    try:
-        lang = language.lower().lstrip('.')
-        preexec = _posix_limits if os.name != "nt" else None
-
-        if lang in ["python", "py"]:
-            cmd = [sys.executable, filepath]
-            exec_proc = subprocess.run(cmd, capture_output=True, text=True, timeout=5, preexec_fn=preexec)
-            out = f"Sortie:\n{exec_proc.stdout}\n"
-            if exec_proc.stderr:
-                out += f"Erreurs:\n{exec_proc.stderr}\n"
-            return out
-
-        elif lang in ["c"]:
-            exe = os.path.join(job_dir, "a.exe" if os.name == "nt" else "a.out")
-            comp = subprocess.run(["gcc", filepath, "-O2", "-s", "-o", exe],
-                                  capture_output=True, text=True, timeout=15)
-            if comp.returncode != 0:
-                return f"Erreur de compilation C:\n{comp.stderr}"
-            exec_proc = subprocess.run([exe], capture_output=True, text=True, timeout=5, preexec_fn=preexec)
-            out = f"Sortie:\n{exec_proc.stdout}\n"
-            if exec_proc.stderr:
-                out += f"Erreurs:\n{exec_proc.stderr}\n"
-            return out
-
-        elif lang in ["c++", "cpp"]:
-            exe = os.path.join(job_dir, "a.exe" if os.name == "nt" else "a.out")
-            comp = subprocess.run(["g++", filepath, "-O2", "-s", "-o", exe],
-                                  capture_output=True, text=True, timeout=15)
-            if comp.returncode != 0:
-                return f"Erreur de compilation C++:\n{comp.stderr}"
-            exec_proc = subprocess.run([exe], capture_output=True, text=True, timeout=5, preexec_fn=preexec)
-            out = f"Sortie:\n{exec_proc.stdout}\n"
-            if exec_proc.stderr:
-                out += f"Erreurs:\n{exec_proc.stderr}\n"
-            return out
-
-        elif lang in ["java"]:
-            comp = subprocess.run(["javac", filepath, "-d", job_dir],
-                                  capture_output=True, text=True, timeout=20)
-            if comp.returncode != 0:
-                return f"Erreur de compilation Java:\n{comp.stderr}"
-            class_name = os.path.splitext(os.path.basename(filepath))[0]
-            exec_proc = subprocess.run(["java", "-cp", job_dir, class_name],
-                                       capture_output=True, text=True, timeout=5, preexec_fn=preexec)
-            out = f"Sortie:\n{exec_proc.stdout}\n"
-            if exec_proc.stderr:
-                out += f"Erreurs:\n{exec_proc.stderr}\n"
-            return out
-
-        else:
-            return "Langage non supporté ou inconnu.\n"
+def history_saver_thread():
+    """Sauvegarde périodique de l'historique des durées (rechargé au redémarrage)."""
+    while True:
+        time.sleep(HISTORY_SAVE_INTERVAL)
+        HISTORY.save()
 
-    except subprocess.TimeoutExpired:
-        return "Erreur : exécution dépassé le délai (timeout).\n"
-    except Exception as e:
-        return f"Erreur lors de l'execution : {str(e)}\n"
-    finally:
-        # Nettoyage (best-effort)
-        with suppress(Exception):
-            shutil.rmtree(job_dir)
+def series_sampler_thread():
+    """
+    Échantillon de charge toutes les SERIES.interval secondes. Jobs/s et latences
+    viennent de la différence entre deux relevés de l'histogramme partagé : les
+    jobs de tous les processus maîtres sont comptés.
+    """
+    cpu = CpuMeter()
+    with tasks_lock:
+        previous = list(STATE.latency_counts)
+    last = time.monotonic()
+    while True:
+        time.sleep(SERIES.interval)
+        with tasks_lock:
+            counts = list(STATE.latency_counts)
+            loads = [SLAVE_LOAD.get(addr, {}) for addr in SLAVE_SERVERS]
+            running = STATE.current_tasks + sum(load.get("running", 0) for load in loads)
+            queued = STATE.central_waiting + sum(load.get("queued", 0) for load in loads)
+            max_tasks, max_slaves = STATE.max_tasks, STATE.max_slaves
+        now = time.monotonic()
+        delta = [c - p for c, p in zip(counts, previous)]
+        elapsed = max(1e-9, now - last)
+        previous, last = counts, now
+        sample = {
+            "ts": round(time.time(), 3), "running": running, "queued": queued + ASYNC_QUEUE.qsize(),
+            "slaves": len(loads), "max_tasks": max_tasks, "max_slaves": max_slaves,
+            "jobs_s": round(sum(delta) / elapsed, 3), "cpu": cpu.usage(),
+        }
+        for p in (50, 90, 99):
+            value = histogram_percentile(delta, p)
+            sample[f"p{p}"] = round(value, 4) if value is not None else None
+        SERIES.add(sample)
 
 def load_monitor_thread():
     """Thread de monitoring de la charge : tue 1 esclave si charge basse prolongée."""
@@ -353,7 +1151,7 @@ def load_monitor_thread():
     while True:
         time.sleep(5)
         with tasks_lock:
-            if current_tasks <= KILL_THRESHOLD:
+            if STATE.current_tasks <= KILL_THRESHOLD:
                 if last_time_low_load is None:
                     last_time_low_load = time.time()
                 else:
@@ -365,47 +1163,292 @@ def load_monitor_thread():
                 last_time_low_load = None
 
 def maybe_kill_one_slave():
-    """Tue le dernier esclave de la liste (libération de ressources)."""
-    if not SLAVE_PROCESSES or not SLAVE_SERVERS:
+    """Tue le dernier esclave inoccupé de la liste (libération de ressources, sous tasks_lock)."""
+    sync_slave_servers()
+    if not SLAVE_SERVERS:
+        return
+
+    idle = [addr for addr in SLAVE_SERVERS
+            if SLAVE_INFLIGHT.get(addr, 0) == 0 and SLAVE_LOAD.get(addr, {}).get("running", 0) == 0
+            and SLAVE_LOAD.get(addr, {}).get("queued", 0) == 0]
+    if not idle:
         return
 
-    proc = SLAVE_PROCESSES.pop()
-    ip, port = SLAVE_SERVERS.pop()
+    ip, port = idle[-1]
+    pid = STATE.slave_pid(port)
+    STATE.set_slave(port, 0)
+    SLAVE_SERVERS.remove((ip, port))
+    SLAVE_LOAD.pop((ip, port), None)
+    SLAVE_INFLIGHT.pop((ip, port), None)
+    AFFINITY.forget((ip, port))
 
     try:
+        stop_slave(pid, SLAVE_PROCESSES.pop(port, None))
+        print(f"[KILL ESCLAVE] Esclave sur port {port} tué pour libérer des ressources.")
+    except Exception as e:
+        print(f"[ERREUR KILL ESCLAVE] Impossible de tuer l'esclave port {port}. {e}")
+
+def stop_slave(pid, proc=None):
+    """Arrête un esclave : par son Popen s'il a été lancé ici, sinon par son pid."""
+    if proc is not None:
         proc.terminate()
         time.sleep(1)
         if proc.poll() is None:
             proc.kill()
-        print(f"[KILL ESCLAVE] Esclave sur port {port} tué pour libérer des ressources.")
-    except Exception as e:
-        print(f"[ERREUR KILL ESCLAVE] Impossible de tuer l'esclave port {port}. {e}")
+            proc.wait()
+        return
+    os.kill(pid, signal.SIGTERM)
+    time.sleep(1)
+    with suppress(ProcessLookupError):
+        os.kill(pid, signal.SIGKILL)
 
-def start_server(host="0.0.0.0", port=5000):
+##########################################
+# Processus maîtres (MASTER_WORKERS > 1)
+##########################################
+
+def forward_to_workers(payload):
+    """
+    Envoie une commande aux autres processus maîtres (socket de contrôle) et retourne
+    leurs réponses brutes. Liste vide en mode un seul processus.
+    """
+    responses = []
+    for index, path in enumerate(CONTROL_PATHS):
+        if index == WORKER_INDEX:
+            continue
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                s.settimeout(5)
+                s.connect(path)
+                s.sendall(payload.encode('utf-8', errors='replace'))
+                s.shutdown(socket.SHUT_WR)
+                chunks = []
+                while True:
+                    chunk = s.recv(65536)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+            responses.append(b"".join(chunks))
+        except OSError as e:
+            print(f"[ERREUR] Processus maître n°{index} injoignable : {e}")
+    return responses
+
+def handle_control(conn):
+    """Commande relayée par un autre processus maître (CANCEL, STATUS, FETCH, ADMIN)."""
+    try:
+        chunks = []
+        while True:
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        decoded_data = b"".join(chunks).decode('utf-8', errors='replace')
+        if decoded_data.startswith("CANCEL|"):
+            response = handle_cancel_command(decoded_data, forwarded=True)
+        elif decoded_data.startswith(("STATUS|", "FETCH|")):
+            response = handle_async_command(decoded_data, forwarded=True)
+        elif decoded_data.startswith("ADMIN|"):
+            response = handle_admin_command(decoded_data, ("127.0.0.1", 0), forwarded=True)
+        else:
+            response = "Erreur : commande de contrôle inconnue.\n"
+        if isinstance(response, str):
+            response = response.encode('utf-8', errors='replace')
+        conn.sendall(response)
+    except OSError:
+        pass
+    finally:
+        conn.close()
+
+def control_server_thread(path):
+    """Écoute les commandes relayées par les autres processus maîtres."""
+    with suppress(FileNotFoundError):
+        os.remove(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(16)
+    while True:
+        conn, _ = listener.accept()
+        threading.Thread(target=handle_control, args=(conn,), daemon=True).start()
+
+def start_capture():
+    """Nouveau fichier de capture (suffixé par le n° de processus en mode multi-processus)."""
+    return TrafficCapture.start_new(suffix=f"_{WORKER_INDEX}" if MASTER_WORKERS > 1 else "")
+
+def make_listener(host, port, reuse_port=False):
     server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        # Chaque processus a sa propre file d'acceptation, le noyau répartit les connexions
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
     server.bind((host, port))
-    server.listen(5)
-    print(f"[SERVEUR MAÎTRE] En écoute sur {host}:{port} ...")
+    server.listen(128 if reuse_port else 5)
+    return server
+
+def serve(server, monitor=True):
+    """Boucle d'acceptation d'un processus maître et ses threads de fond."""
+    global CAPTURE
+    if os.environ.get("CAPTURE", "") in ("1", "on"):
+        CAPTURE = start_capture()
 
-    # Thread de monitoring
-    monitor_thread = threading.Thread(target=load_monitor_thread, daemon=True)
-    monitor_thread.start()
+    # Thread de monitoring (un seul processus arrête les esclaves inoccupés)
+    if monitor:
+        monitor_thread = threading.Thread(target=load_monitor_thread, daemon=True)
+        monitor_thread.start()
+
+    # Battements de cœur des esclaves (charge annoncée)
+    heartbeat_thread = threading.Thread(target=slave_heartbeat_thread, daemon=True)
+    heartbeat_thread.start()
+
+    # Historique des durées (ordonnancement)
+    threading.Thread(target=history_saver_thread, daemon=True).start()
+
+    # Séries de charge (tableau de bord du client)
+    threading.Thread(target=series_sampler_thread, daemon=True).start()
+
+    # Workers des jobs asynchrones (SUBMIT)
+    for _ in range(ASYNC_WORKERS):
+        threading.Thread(target=async_worker_thread, daemon=True).start()
+
+    # Commandes relayées par les autres processus maîtres
+    if CONTROL_PATHS:
+        threading.Thread(target=control_server_thread, args=(CONTROL_PATHS[WORKER_INDEX],),
+                         daemon=True).start()
 
     while True:
         client_socket, client_address = server.accept()
+        # Connexions par client : refus immédiat, sans thread ni lecture de la requête
+        reason = LIMITER.admit(client_address[0])
+        if reason is not None:
+            reject_client(client_socket, reason)
+            continue
         print(f"[CONNEXION] Client connecté: {client_address}")
         client_thread = threading.Thread(
-            target=handle_client,
+            target=serve_client,
             args=(client_socket, client_address),
             daemon=True
         )
         client_thread.start()
 
+def serve_client(client_socket, client_address):
+    try:
+        handle_client(client_socket, client_address)
+    finally:
+        LIMITER.release(client_address[0])
+
+def reject_client(client_socket, reason):
+    """Réponse courte à un client limité, sans bloquer la boucle d'acceptation."""
+    with suppress(OSError):
+        client_socket.setblocking(False)
+        # Vider ce qui est déjà arrivé : fermer avec des données non lues enverrait un RST
+        # au lieu du message
+        with suppress(BlockingIOError):
+            client_socket.recv(65536)
+        client_socket.send(THROTTLED_MESSAGES[reason])
+        client_socket.shutdown(socket.SHUT_WR)
+    client_socket.close()
+
+def run_worker(index, host, port, server=None):
+    """Processus maître n°index (après fork) ; seul le n°0 sauvegarde l'historique."""
+    global WORKER_INDEX
+    WORKER_INDEX = index
+    STATE.worker_index = index
+    TRACER.node = f"maitre_{index}"
+    if index != 0:
+        HISTORY.path = None
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        if server is None:
+            server = make_listener(host, port, reuse_port=True)
+        serve(server, monitor=index == 0)
+    finally:
+        HISTORY.save()
+
+def start_workers(host, port, count):
+    """
+    Lance `count` processus maîtres sur le même port et les surveille : un processus
+    mort est relancé. À l'arrêt, les processus maîtres puis les esclaves sont arrêtés.
+    """
+    global CONTROL_PATHS
+    server = None
+    if not hasattr(socket, "SO_REUSEPORT"):
+        # Pré-fork : une seule socket d'écoute, héritée par tous les processus
+        server = make_listener(host, port)
+    control_dir = tempfile.mkdtemp(prefix="maitre_controle_")
+    CONTROL_PATHS = [os.path.join(control_dir, f"maitre_{i}.sock") for i in range(count)]
+    print(f"[SERVEUR MAÎTRE] {count} processus en écoute sur {host}:{port} "
+          f"({'socket partagée' if server else 'SO_REUSEPORT'}) ...")
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(index, host, port, server)
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else 0
+            except BaseException as e:
+                print(f"[ERREUR] Processus maître n°{index} : {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        return pid
+
+    workers = {spawn(i): i for i in range(count)}
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        while True:
+            pid, status = os.wait()
+            index = workers.pop(pid, None)
+            if index is None or stopping:
+                continue
+            # Ses tâches, réservations et verrous sont rendus, ses jobs en cours tués
+            killed = STATE.reap_worker(index, pid)
+            print(f"[ATTENTION] Processus maître n°{index} arrêté (statut {status}), "
+                  f"{killed} job(s) en cours tué(s), relance.")
+            time.sleep(1)
+            workers[spawn(index)] = index
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stopping = True
+        for pid in workers:
+            with suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGTERM)
+        for pid in workers:
+            with suppress(ChildProcessError):
+                os.waitpid(pid, 0)
+        # Esclaves encore enregistrés (lancés par n'importe quel processus maître)
+        for port in STATE.slave_ports:
+            pid = STATE.slave_pid(port)
+            if pid:
+                with suppress(ProcessLookupError):
+                    os.kill(pid, signal.SIGTERM)
+        shutil.rmtree(control_dir, ignore_errors=True)
+
+def start_server(host="0.0.0.0", port=5000):
+    # Compilateurs détectés une fois (avant le fork : les processus maîtres en héritent)
+    toolchains = probe_toolchains()
+    print(f"[SERVEUR MAÎTRE] Langages disponibles : {', '.join(sorted(toolchains)) or 'aucun'}")
+    if MASTER_WORKERS > 1:
+        start_workers(host, port, MASTER_WORKERS)
+        return
+    server = make_listener(host, port)
+    print(f"[SERVEUR MAÎTRE] En écoute sur {host}:{port} ...")
+    serve(server)
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         port = int(sys.argv[1])
     else:
         port = 5000
 
-    start_server("0.0.0.0", port)
+    try:
+        start_server("0.0.0.0", port)
+    finally:
+        HISTORY.save()
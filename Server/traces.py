@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Traçage des jobs entre nœuds (client → maître → esclave).
+
+Chaque job échantillonné porte un identifiant de trace (option TRACE=<id> du
+protocole). Chaque étape mesurée (« span ») est écrite comme une ligne JSON dans
+un fichier à rotation, exploité ensuite par analyse_traces.py.
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+from logging.handlers import RotatingFileHandler
+
+# Répertoire des fichiers de traces (relatif au répertoire courant du serveur)
+TRACE_DIR = os.environ.get("TRACE_DIR", "traces")
+TRACE_MAX_BYTES = 5 * 1024**2   # 5 Mo par fichier
+TRACE_BACKUP_COUNT = 3          # traces.jsonl.1 ... .3
+
+
+class Trace:
+    """Contexte de traçage d'un job sur un nœud."""
+
+    def __init__(self, tracer, trace_id, job_id):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.job_id = job_id
+
+    @property
+    def enabled(self):
+        return self.tracer is not None
+
+    def record(self, name, start, duration, **attrs):
+        """Enregistre une étape déjà mesurée (start : horodatage epoch en secondes)."""
+        if self.tracer is not None:
+            self.tracer.write(self.trace_id, self.job_id, name, start, duration, attrs)
+
+    @contextmanager
+    def _span(self, name, attrs):
+        start = time.time()
+        t0 = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self.record(name, start, time.perf_counter() - t0, **attrs)
+
+    def span(self, name, **attrs):
+        """Mesure le bloc `with` ; les attributs peuvent être complétés via le dict rendu."""
+        if self.tracer is None:
+            return nullcontext(attrs)
+        return self._span(name, attrs)
+
+
+# Trace inactive (job non échantillonné)
+NO_TRACE = Trace(None, None, None)
+
+
+class Tracer:
+    """Écrit les spans d'un nœud dans <TRACE_DIR>/<node>.jsonl avec rotation."""
+
+    def __init__(self, node, sample_rate=1.0, directory=TRACE_DIR):
+        self.node = node
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self._directory = directory
+        self._logger = None
+
+    def _get_logger(self):
+        # Ouverture paresseuse : aucun fichier créé tant que rien n'est tracé
+        with self._lock:
+            if self._logger is None:
+                os.makedirs(self._directory, exist_ok=True)
+                logger = logging.getLogger(f"traces.{self.node}")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                handler = RotatingFileHandler(
+                    os.path.join(self._directory, f"{self.node}.jsonl"),
+                    maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUP_COUNT, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+                self._logger = logger
+            return self._logger
+
+    def set_sample_rate(self, rate):
+        self.sample_rate = min(1.0, max(0.0, float(rate)))
+
+    def should_sample(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def trace(self, trace_id, job_id):
+        return Trace(self, trace_id, job_id)
+
+    def write(self, trace_id, job_id, name, start, duration, attrs):
+        span = {
+            "trace": trace_id,
+            "job": job_id,
+            "node": self.node,
+            "span": name,
+            "start": round(start, 6),
+            "dur": round(duration, 6),
+        }
+        if attrs:
+            span["attrs"] = attrs
+        try:
+            self._get_logger().info(json.dumps(span, ensure_ascii=False))
+        except Exception as e:
+            print(f"[ERREUR TRACE] Écriture impossible : {e}")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la coloration syntaxique sur un fichier de 10 000 lignes.
+
+ - Tokenisation complète (sans Qt) pour chaque langage
+ - Modification d'une ligne : nombre de lignes re-tokenisées (comme Qt, on
+   s'arrête dès que l'état de fin de ligne redevient identique)
+ - Si PyQt6 est installé : coloration d'un QTextDocument complet et temps d'une
+   frappe au milieu du document, avec CodeHighlighter
+
+Usage :
+    python bench_coloration.py [--lines 10000]
+"""
+
+import gc
+import os
+import sys
+import time
+import argparse
+
+from coloration import LANGUAGES, get_tokenizer, tokenize_lines
+
+SAMPLES = {
+    "Python": [
+        "import math",
+        "@decorateur",
+        "def calcul(x, y=3):",
+        '    """Docstring',
+        "    sur plusieurs lignes",
+        '    """',
+        "    total = 0  # accumulateur",
+        "    for i in range(x):",
+        "        total += math.sqrt(i) * 1.5e3 + 0x1F",
+        "    print(f'total = {total}', \"fin\")",
+        "    return total",
+    ],
+    "C": [
+        "#include <stdio.h>",
+        "/* commentaire",
+        "   bloc */",
+        "static int calcul(int x) {",
+        "    double total = 0.5; // accumulateur",
+        "    for (int i = 0; i < x; i++) {",
+        "        total += i * 0x1F;",
+        "    }",
+        '    printf("total = %f\\n", total);',
+        "    return (int) total;",
+        "}",
+    ],
+    "Java": [
+        "import java.util.List;",
+        "/**",
+        " * Javadoc",
+        " */",
+        "@Override",
+        "public static int calcul(int x) {",
+        "    long total = 0L; // accumulateur",
+        "    for (int i = 0; i < x; i++) { total += i * 3; }",
+        '    System.out.println("total = " + total);',
+        "    return (int) total;",
+        "}",
+    ],
+}
+SAMPLES["C++"] = SAMPLES["C"] + ["namespace ns { template <typename T> class A { public: std::vector<T> v; }; }"]
+
+
+def make_lines(language, count):
+    sample = SAMPLES[language]
+    return [sample[i % len(sample)] for i in range(count)]
+
+
+def bench_tokenizer(language, lines):
+    t0 = time.perf_counter()
+    _, states = tokenize_lines(lines, language)
+    full = time.perf_counter() - t0
+
+    # Frappe au milieu du fichier : re-tokenisation jusqu'à stabilisation de l'état
+    tokenizer = get_tokenizer(language)
+    index = len(lines) // 2
+    lines = list(lines)
+    lines[index] = lines[index] + " x"
+    gc.collect()
+    t0 = time.perf_counter()
+    state = states[index - 1] if index else 0
+    retokenized = 0
+    for i in range(index, len(lines)):
+        _, state = tokenizer.tokenize(lines[i], state)
+        retokenized += 1
+        if state == states[i]:
+            break
+    incremental = time.perf_counter() - t0
+    return full, incremental, retokenized
+
+
+def bench_qt(language, lines):
+    """Coloration d'un QTextDocument (nécessite PyQt6, plate-forme offscreen)."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtGui import QGuiApplication, QTextDocument, QTextCursor
+    from client import CodeHighlighter
+
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv)
+    document = QTextDocument()
+    highlighter = CodeHighlighter(document, language)
+
+    t0 = time.perf_counter()
+    document.setPlainText("\n".join(lines))
+    full = time.perf_counter() - t0
+
+    cursor = QTextCursor(document.findBlockByNumber(len(lines) // 2))
+    cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock)
+    t0 = time.perf_counter()
+    cursor.insertText(" x")
+    incremental = time.perf_counter() - t0
+    del highlighter, app
+    return full, incremental
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de la coloration syntaxique.")
+    parser.add_argument("--lines", type=int, default=10_000, help="taille du fichier généré")
+    args = parser.parse_args(argv)
+
+    try:
+        import PyQt6  # noqa: F401
+        has_qt = True
+    except ImportError:
+        has_qt = False
+        print("[INFO] PyQt6 absent : seul le tokeniseur est mesuré.\n")
+
+    print(f"{'langage':<8} {'tokenisation':>14} {'frappe':>10} {'lignes':>7}"
+          + (f" {'Qt complet':>12} {'Qt frappe':>10}" if has_qt else ""))
+    for language in LANGUAGES:
+        lines = make_lines(language, args.lines)
+        full, incremental, retokenized = bench_tokenizer(language, lines)
+        row = f"{language:<8} {full * 1000:>11.1f} ms {incremental * 1000:>7.3f} ms {retokenized:>7}"
+        if has_qt:
+            qt_full, qt_incremental = bench_qt(language, lines)
+            row += f" {qt_full * 1000:>9.1f} ms {qt_incremental * 1000:>7.3f} ms"
+        print(row)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
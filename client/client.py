@@ -1,59 +1,212 @@
 import sys
 import socket
 import os
+import re
+import time
+import uuid
+import struct
+import codecs
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QLabel, QLineEdit, QPushButton,
-    QVBoxLayout, QHBoxLayout, QTextEdit, QComboBox, QFileDialog, QMenuBar, QMenu,
-    QMessageBox, QGroupBox, QGridLayout, QSplitter
+    QVBoxLayout, QHBoxLayout, QPlainTextEdit, QComboBox, QFileDialog, QMenuBar, QMenu,
+    QMessageBox, QGroupBox, QGridLayout, QSplitter, QCheckBox
 )
-from PyQt6.QtCore import Qt, QRegularExpression
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QFont, QTextCharFormat, QColor, QSyntaxHighlighter
 
+from coloration import TOKEN_KINDS, get_tokenizer
+from sortie import ResultView
+from tableau import LoadDashboard
+from client_cli import USAGE_PREFIX, split_usage, format_usage, is_busy, job_options
+
 # =========================
-# Simple highlighter Python
+# Coloration syntaxique
 # =========================
-class PythonSyntaxHighlighter(QSyntaxHighlighter):
+# Caractères hors BMP : comptent pour 2 unités UTF-16 dans les positions Qt
+_NON_BMP = re.compile("[\U00010000-\U0010FFFF]")
+
+class CodeHighlighter(QSyntaxHighlighter):
     """
-      Un simple QSyntaxHighlighter pour le code Python.
+      QSyntaxHighlighter multi-langage : un tokeniseur combiné par langage
+      (voir coloration.py) et un état par bloc pour les chaînes/commentaires
+      multi-lignes. Qt ne recolore que les blocs modifiés et les suivants
+      tant que leur état de fin change.
     """
-    def __init__(self, parent=None):
+    COLORS = {
+        "keyword": "#0000FF",       # Bleu
+        "type": "#800080",          # Violet
+        "string": "#008000",        # Vert
+        "comment": "#999999",       # Gris
+        "number": "#B8860B",        # Ocre
+        "preprocessor": "#A0522D",  # Brun
+        "decorator": "#AA22FF",
+    }
+
+    def __init__(self, parent=None, language="Python"):
         super().__init__(parent)
-        self._rules = []
-
-        # Format pour les mots-clés
-        keyword_format = QTextCharFormat()
-        keyword_format.setForeground(QColor("#0000FF"))  # Bleu
-        keyword_words = [
-            "def", "class", "import", "from", "as", "if", "elif", "else", 
-            "for", "while", "return", "in", "and", "or", "not", "print"
-        ]
-        for word in keyword_words:
-            pattern = QRegularExpression(r"\b" + word + r"\b")
-            self._rules.append((pattern, keyword_format))
-
-        # Format pour les chaînes de caractères (simple / double quotes)
-        string_format = QTextCharFormat()
-        string_format.setForeground(QColor("#008000"))  # Vert
-        # Simple quotes
-        pattern_single = QRegularExpression(r"'[^'\\]*(\\.[^'\\]*)*'")
-        self._rules.append((pattern_single, string_format))
-        # Double quotes
-        pattern_double = QRegularExpression(r"\"[^\"\\]*(\\.[^\"\\]*)*\"")
-        self._rules.append((pattern_double, string_format))
-
-        # Format pour les commentaires (# ...)
-        comment_format = QTextCharFormat()
-        comment_format.setForeground(QColor("#999999"))  # Gris
-        pattern_comment = QRegularExpression(r"#.*")
-        self._rules.append((pattern_comment, comment_format))
+        self._formats = {}
+        for kind in TOKEN_KINDS:
+            fmt = QTextCharFormat()
+            fmt.setForeground(QColor(self.COLORS[kind]))
+            self._formats[kind] = fmt
+        self._tokenizer = get_tokenizer(language)
+
+    def set_language(self, language):
+        tokenizer = get_tokenizer(language)
+        if tokenizer is not self._tokenizer:
+            self._tokenizer = tokenizer
+            self.rehighlight()
 
     def highlightBlock(self, text):
-        for pattern, fmt in self._rules:
-            matcher = pattern.globalMatch(text)
-            while matcher.hasNext():
-                match = matcher.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), fmt)
+        tokens, state = self._tokenizer.tokenize(text, max(0, self.previousBlockState()))
+        if _NON_BMP.search(text):
+            # Conversion des positions Python (points de code) en unités UTF-16
+            offsets = [0]
+            for c in text:
+                offsets.append(offsets[-1] + (2 if ord(c) > 0xFFFF else 1))
+            tokens = [(offsets[start], offsets[start + length] - offsets[start], kind)
+                      for start, length, kind in tokens]
+        formats = self._formats
+        for start, length, kind in tokens:
+            self.setFormat(start, length, formats[kind])
+        self.setCurrentBlockState(state)
+
+# =========================
+# Réception en arrière-plan
+# =========================
+class RunWorker(QThread):
+    """
+      Envoie une requête d'exécution et transmet la réponse morceau par morceau
+      (décodage UTF-8 incrémental), sans bloquer l'interface.
+      En mode asynchrone : SUBMIT, puis STATUS périodiques sur des connexions
+      courtes, puis FETCH du résultat ; le délai ne porte que sur chaque requête,
+      et l'attente du job est bornée par ASYNC_MAX_WAIT.
+      La dernière ligne reçue est retenue : si c'est la ligne RESSOURCES du
+      serveur, elle est transmise par usage_received au lieu d'être affichée.
+    """
+    chunk_received = pyqtSignal(str)
+    status_changed = pyqtSignal(str)
+    usage_received = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+    # Au-delà, la ligne retenue ne peut pas être la ligne RESSOURCES : elle est affichée
+    MAX_HELD_LINE = 4096
+
+    # États finaux renvoyés par STATUS (voir Server/resultats.py)
+    FINISHED_STATES = ("termine", "annule", "expire")
+    # Attente maximale d'un job asynchrone (comme --max-wait de client_cli.py)
+    ASYNC_MAX_WAIT = 300.0
+
+    def __init__(self, server_ip, server_port, payload, timeout=10, async_mode=False, parent=None):
+        super().__init__(parent)
+        self.server_ip = server_ip
+        self.server_port = server_port
+        self.payload = payload
+        self.timeout = timeout
+        self.async_mode = async_mode
+        self.timed_out = False
+        self._socket = None
+
+    def run(self):
+        try:
+            if self.async_mode:
+                self._run_async()
+            else:
+                self._stream(self.payload)
+        except socket.timeout:
+            self.timed_out = True
+            self.failed.emit("délai dépassé")
+        except Exception as e:
+            if not self.isInterruptionRequested():
+                self.failed.emit(str(e))
+        finally:
+            self._socket = None
+
+    def _stream(self, payload):
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        held = ""   # dernière ligne (peut-être la ligne RESSOURCES)
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            self._socket = s
+            s.settimeout(self.timeout)  # évite de se bloquer
+            s.connect((self.server_ip, self.server_port))
+            s.sendall(payload.encode('utf-8'))
+            while True:
+                chunk = s.recv(65536)
+                if not chunk:
+                    break
+                held += decoder.decode(chunk)
+                start = held.rfind("\n", 0, len(held) - 1) + 1
+                last_line = held[start:]
+                if len(last_line) > self.MAX_HELD_LINE or not last_line.startswith(USAGE_PREFIX[:len(last_line)]):
+                    start = len(held)
+                if start:
+                    self.chunk_received.emit(held[:start])
+                    held = held[start:]
+        held += decoder.decode(b"", final=True)
+        output, usage = split_usage(held)
+        if output:
+            self.chunk_received.emit(output)
+        if usage is not None:
+            self.usage_received.emit(usage)
+
+    def _request(self, payload):
+        """Requête courte (SUBMIT/STATUS) : réponse complète décodée."""
+        with socket.create_connection((self.server_ip, self.server_port), timeout=self.timeout) as s:
+            self._socket = s
+            s.sendall(payload.encode('utf-8'))
+            response = []
+            while True:
+                chunk = s.recv(4096)
+                if not chunk:
+                    break
+                response.append(chunk)
+        return b"".join(response).decode('utf-8', errors='replace')
+
+    def _run_async(self):
+        response = self._request("SUBMIT|" + self.payload)
+        if not response.startswith("OK:"):
+            self.chunk_received.emit(response)   # serveur occupé ou requête invalide
+            return
+        job_id = response.split(":", 1)[1].strip()
+
+        deadline = time.monotonic() + self.ASYNC_MAX_WAIT
+        delay = 0.2
+        while not self.isInterruptionRequested():
+            response = self._request(f"STATUS|{job_id}")
+            if is_busy(response):
+                status = ""   # serveur occupé : on réessaie plus tard, le job continue
+            elif response.startswith("STATUT:"):
+                status = response.partition(":")[2].strip()
+                if status == "inconnu":
+                    raise RuntimeError(f"job {job_id} inconnu du serveur (expiré ou serveur redémarré)")
+            else:
+                raise RuntimeError(response.strip())
+            if status in self.FINISHED_STATES:
+                break
+            if status:
+                self.status_changed.emit(status)
+            if time.monotonic() >= deadline:
+                raise socket.timeout(f"job non terminé après {self.ASYNC_MAX_WAIT:g}s")
+            self.msleep(int(delay * 1000))
+            delay = min(delay * 1.5, 2.0)
+        else:
+            return
+        self._stream(f"FETCH|{job_id}")
+
+    def abort(self):
+        """
+        Coupe la connexion. SO_LINGER à 0 : la fermeture envoie un reset, que le serveur
+        prend pour une déconnexion (une simple fin d'écriture n'annule pas le job).
+        """
+        self.requestInterruption()
+        sock = self._socket
+        if sock is not None:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
 
 class ClientGUI(QMainWindow):
     def __init__(self):
@@ -126,21 +279,33 @@ class ClientGUI(QMainWindow):
         # =========================
         #  Éditeur de code
         # =========================
-        self.code_edit = QTextEdit()
+        # QPlainTextEdit : pas de mise en page rich-text, bien plus rapide sur les gros fichiers
+        self.code_edit = QPlainTextEdit()
         font = QFont("Courier New", 11)
         self.code_edit.setFont(font)
-        self.syntax_highlighter = PythonSyntaxHighlighter(self.code_edit.document())
+        self.syntax_highlighter = CodeHighlighter(self.code_edit.document(), self.lang_combo.currentText())
+        self.lang_combo.currentTextChanged.connect(self.syntax_highlighter.set_language)
 
         # =========================
         #  Résultats
         # =========================
-        self.result_edit = QTextEdit()
-        self.result_edit.setReadOnly(True)
-        self.result_edit.setFont(font)
+        # Vue texte brut en ajout seul, historique borné (voir sortie.py)
+        self.result_view = ResultView(font)
 
         self.run_button = QPushButton("Exécuter le code")
         self.run_button.clicked.connect(self.run_code)
 
+        self.cancel_button = QPushButton("Annuler")
+        self.cancel_button.clicked.connect(self.cancel_run)
+        self.cancel_button.setEnabled(False)
+        self.run_worker = None
+
+        # Mode asynchrone : pas de connexion ouverte pendant la compilation/exécution
+        self.async_checkbox = QCheckBox("Mode asynchrone")
+        self.async_checkbox.setToolTip("Soumission SUBMIT puis suivi STATUS/FETCH (jobs longs, Java)")
+        self.current_job_id = None
+        self.current_trace_id = None
+
         self.clear_result_button = QPushButton("Vider la sortie")
         self.clear_result_button.clicked.connect(self.clear_result)
 
@@ -166,6 +331,11 @@ class ClientGUI(QMainWindow):
         self.btn_get_info = QPushButton("Obtenir info du serveur (Tâches, MAX_TASKS, MAX_SLAVES, etc.)")
         self.btn_get_info.clicked.connect(self.get_server_info)
 
+        # Tableau de bord : courbes de charge mises à jour en direct (ADMIN GET_SERIES)
+        self.btn_dashboard = QPushButton("Tableau de bord (charge en direct)")
+        self.btn_dashboard.clicked.connect(self.open_dashboard)
+        self.dashboard = None
+
         self.admin_layout.addWidget(self.new_max_label)
         self.admin_layout.addWidget(self.new_max_edit)
         self.admin_layout.addWidget(self.btn_set_max_tasks)
@@ -177,6 +347,7 @@ class ClientGUI(QMainWindow):
         self.admin_layout.addSpacing(10)
 
         self.admin_layout.addWidget(self.btn_get_info)
+        self.admin_layout.addWidget(self.btn_dashboard)
 
         self.admin_groupbox.setLayout(self.admin_layout)
 
@@ -196,10 +367,12 @@ class ClientGUI(QMainWindow):
 
         button_layout = QHBoxLayout()
         button_layout.addWidget(self.run_button)
+        button_layout.addWidget(self.cancel_button)
         button_layout.addWidget(self.clear_result_button)
+        button_layout.addWidget(self.async_checkbox)
 
         result_layout.addLayout(button_layout)
-        result_layout.addWidget(self.result_edit)
+        result_layout.addWidget(self.result_view)
         result_groupbox.setLayout(result_layout)
 
         splitter.addWidget(code_groupbox)
@@ -251,8 +424,10 @@ class ClientGUI(QMainWindow):
     def run_code(self):
         """
         Envoie le code au serveur maître pour compilation/exécution.
-        Affiche la sortie ou l'erreur dans la zone de résultats.
+        La sortie est affichée au fur et à mesure de sa réception.
         """
+        if self.run_worker is not None:
+            return
         server_ip = self.ip_edit.text().strip()
         server_port = int(self.port_edit.text().strip())
 
@@ -260,35 +435,89 @@ class ClientGUI(QMainWindow):
         filename = self.file_edit.text().strip()
         code_source = self.code_edit.toPlainText()
 
-        payload = f"{language}|{filename}|{code_source}"
+        # Identifiant de job : permet d'annuler côté serveur si on abandonne.
+        # Identifiant de trace : affiché avec le résultat (analyse_traces.py --trace)
+        self.current_job_id = uuid.uuid4().hex
+        self.current_trace_id = uuid.uuid4().hex
+        payload = f"{job_options(self.current_job_id, self.current_trace_id)}{language}|{filename}|{code_source}"
+
+        self.result_view.begin()
+        self.run_worker = RunWorker(server_ip, server_port, payload,
+                                    async_mode=self.async_checkbox.isChecked())
+        self.run_worker.chunk_received.connect(self.result_view.append_chunk)
+        self.run_worker.status_changed.connect(self.on_run_status)
+        self.run_worker.usage_received.connect(self.on_run_usage)
+        self.last_usage = None
+        self.run_worker.failed.connect(self.on_run_failed)
+        self.run_worker.finished.connect(self.on_run_finished)
+        self.run_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.run_worker.start()
+
+    def on_run_failed(self, message):
+        worker = self.run_worker
+        if worker is not None and worker.timed_out:
+            # Le serveur libère le créneau au lieu de finir un job que personne ne lira
+            self.cancel_job(worker.server_ip, worker.server_port, self.current_job_id)
+            message = f"délai dépassé, job {self.current_job_id} annulé"
+        self.result_view.append_text(f"\nErreur (exécution) : {message} [trace {self.current_trace_id}]")
+
+    def on_run_status(self, status):
+        self.statusBar().showMessage(f"Job {self.current_job_id} : {status}")
+
+    def on_run_usage(self, usage):
+        self.last_usage = usage
+
+    def on_run_finished(self):
+        if self.last_usage:
+            self.statusBar().showMessage(f"Trace {self.current_trace_id} - "
+                                         f"Ressources : {format_usage(self.last_usage)}")
+        else:
+            self.statusBar().showMessage(f"Trace {self.current_trace_id}")
+        self.result_view.finish()
+        self.run_worker = None
+        self.run_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+
+    def cancel_run(self):
+        """Annule l'exécution en cours (CANCEL côté serveur puis fermeture de la connexion)."""
+        worker = self.run_worker
+        if worker is None:
+            return
+        self.cancel_job(worker.server_ip, worker.server_port, self.current_job_id)
+        worker.abort()
+        self.result_view.append_text(f"\n[Job {self.current_job_id} annulé]")
 
+    def cancel_job(self, server_ip, server_port, job_id):
+        """Envoie CANCEL|<job_id> au serveur maître (best-effort)."""
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(10)  # évite de se bloquer
-                s.connect((server_ip, server_port))
-                s.sendall(payload.encode('utf-8'))
-
-                response = []
-                while True:
-                    chunk = s.recv(4096)
-                    if not chunk:
-                        break
-                    response.append(chunk.decode('utf-8', errors='replace'))
-            result = "".join(response)
-            self.result_edit.setPlainText(result)
-
-        except Exception as e:
-            self.result_edit.setPlainText(f"Erreur (exécution) : {str(e)}")
+            with socket.create_connection((server_ip, server_port), timeout=2) as s:
+                s.sendall(f"CANCEL|{job_id}".encode('utf-8'))
+                s.recv(1024)
+        except Exception:
+            pass
 
     # ======================================================
-    #   Méthodes : Administration (GET_INFO, SET_MAX_TASKS, SET_MAX_SLAVES)
+    #   Méthodes : Administration (GET_INFO, tableau de bord, SET_MAX_TASKS, SET_MAX_SLAVES)
     # ======================================================
     def get_server_info(self):
         """
         Envoie ADMIN|GET_INFO (avec TOKEN si présent en variable d'env) pour connaître la charge
         """
         resp = self.send_admin_command("GET_INFO")
-        self.result_edit.setPlainText(resp)
+        self.result_view.set_text(resp)
+
+    def open_dashboard(self):
+        """Ouvre (ou ramène au premier plan) le tableau de bord du serveur courant."""
+        server_ip = self.ip_edit.text().strip()
+        server_port = int(self.port_edit.text().strip())
+        if self.dashboard is not None and (self.dashboard.server_ip, self.dashboard.server_port) != (server_ip, server_port):
+            self.dashboard.close()
+            self.dashboard = None
+        if self.dashboard is None:
+            self.dashboard = LoadDashboard(server_ip, server_port)
+        self.dashboard.show()
+        self.dashboard.raise_()
 
     def update_max_tasks(self):
         """
@@ -301,7 +530,7 @@ class ClientGUI(QMainWindow):
 
         command = f"SET_MAX_TASKS|{new_max}"
         resp = self.send_admin_command(command)
-        self.result_edit.setPlainText(resp)
+        self.result_view.set_text(resp)
 
     def update_max_slaves(self):
         """
@@ -314,7 +543,7 @@ class ClientGUI(QMainWindow):
 
         command = f"SET_MAX_SLAVES|{new_max_slaves}"
         resp = self.send_admin_command(command)
-        self.result_edit.setPlainText(resp)
+        self.result_view.set_text(resp)
 
     def send_admin_command(self, subcommand):
         """
@@ -386,7 +615,18 @@ class ClientGUI(QMainWindow):
 
     def clear_result(self):
         """Vider la zone de sortie."""
-        self.result_edit.clear()
+        self.result_view.clear()
+
+    def closeEvent(self, event):
+        """Interrompt une exécution en cours et supprime le fichier de sortie avant de fermer la fenêtre."""
+        if self.run_worker is not None:
+            self.cancel_run()
+            self.run_worker.wait(2000)
+        if self.dashboard is not None:
+            self.dashboard.close()
+        # Fichier temporaire de la dernière sortie (option « sortie complète »)
+        self.result_view.remove_spill_file()
+        super().closeEvent(event)
 
 def main():
     app = QApplication(sys.argv)
@@ -0,0 +1,645 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Client en ligne de commande (sans interface graphique) pour le serveur maître.
+
+Utilise le même protocole que ClientGUI (language|filename|code) et permet de
+soumettre des fichiers ou des répertoires entiers en parallèle. Chaque résultat
+est écrit sur la sortie standard sous forme d'une ligne JSON (avec les ressources
+consommées par le job : durées, CPU, mémoire max), puis un résumé des latences
+mesurées côté client est écrit à la fin.
+
+Avec --async, chaque job est soumis par SUBMIT puis suivi par STATUS/FETCH :
+aucune connexion ne reste ouverte pendant la compilation et l'exécution.
+
+Avec --dashboard, les séries de charge du maître (ADMIN GET_SERIES) sont suivies en
+continu : une ligne par nouvel échantillon.
+
+Avec --project, un répertoire est envoyé comme un seul projet multi-fichiers
+(requête PROJECT) : les fichiers déjà envoyés à ce serveur partent par leur
+empreinte, et seuls les fichiers modifiés sont recompilés côté serveur.
+
+Exemples :
+    python client_cli.py --host 127.0.0.1 --port 5000 exercices/
+    python client_cli.py -j 8 --retries 5 a.c b.py Main.java > resultats.jsonl
+    python client_cli.py --async -j 32 exercices/
+    python client_cli.py --project mon_projet/ --main src/main.c
+    python client_cli.py --dashboard --port 5000
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sys
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import suppress
+
+# =========================
+# Protocole
+# =========================
+EXTENSIONS = {
+    ".py": "Python",
+    ".c": "C",
+    ".cpp": "C++",
+    ".cc": "C++",
+    ".cxx": "C++",
+    ".java": "Java",
+}
+
+# Début des réponses du maître signifiant "réessayer plus tard"
+BUSY_PREFIX = "Erreur : serveur occupé"
+
+# Dernière ligne de la sortie d'un job : ressources consommées en JSON (voir Server/executeur.py)
+USAGE_PREFIX = "RESSOURCES "
+
+# Projets multi-fichiers (voir Server/projets.py)
+PROJECT_PREFIX = "PROJECT|"
+MISSING_PREFIX = "MANQUANT:"
+PROJECT_MAX_FILE_BYTES = 1024 * 1024
+# Empreintes des fichiers déjà envoyés, par serveur (gardées d'une exécution à l'autre)
+HASH_CACHE_DIR = os.environ.get("CLIENT_CACHE_DIR",
+                                os.path.join(os.path.expanduser("~"), ".cache", "sae302"))
+MAX_KNOWN_HASHES = 10000
+
+
+def detect_language(path):
+    """Retourne le langage (tel qu'attendu par le serveur) d'après l'extension, ou None."""
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+
+def send_request(host, port, payload, timeout=10.0):
+    """Envoie une requête brute (str ou bytes) au maître et retourne la réponse complète (str)."""
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    with socket.create_connection((host, port), timeout=timeout) as s:
+        s.settimeout(timeout)
+        s.sendall(payload)
+
+        response = []
+        while True:
+            chunk = s.recv(65536)
+            if not chunk:
+                break
+            response.append(chunk)
+    return b"".join(response).decode('utf-8', errors='replace')
+
+
+def job_options(job_id=None, trace_id=None):
+    """Options en tête de requête : JOB=<id>|TRACE=<id>| (les absentes sont omises)."""
+    prefix = f"JOB={job_id}|" if job_id else ""
+    if trace_id:
+        prefix += f"TRACE={trace_id}|"
+    return prefix
+
+
+def submit(host, port, language, filename, code, timeout=10.0, job_id=None, trace_id=None):
+    """
+    Soumet un code source et retourne la réponse. Identifiant de job (annulation) et
+    de trace (retrouvé par Server/analyse_traces.py --trace) facultatifs.
+    """
+    prefix = job_options(job_id, trace_id)
+    return send_request(host, port, f"{prefix}{language}|{filename}|{code}", timeout)
+
+
+def cancel(host, port, job_id, timeout=2.0):
+    """Demande l'annulation d'un job en cours (CANCEL|<job_id>)."""
+    return send_request(host, port, f"CANCEL|{job_id}", timeout)
+
+
+def is_busy(response):
+    return response.startswith(BUSY_PREFIX)
+
+
+def split_usage(response):
+    """Sépare la sortie du job de sa ligne RESSOURCES finale : (sortie, dict ou None)."""
+    body = response[:-1] if response.endswith("\n") else response
+    start = body.rfind("\n") + 1
+    line = body[start:]
+    if not line.startswith(USAGE_PREFIX):
+        return response, None
+    try:
+        usage = json.loads(line[len(USAGE_PREFIX):])
+    except ValueError:
+        return response, None
+    return response[:start], usage
+
+
+def format_usage(usage):
+    """Résumé lisible des ressources d'un job."""
+    parts = []
+    if "compilation_s" in usage:
+        compile_cpu = usage.get("compilation_cpu_s")
+        parts.append(f"compilation {usage['compilation_s']:.3f}s"
+                     + (f" (CPU {compile_cpu:.3f}s)" if compile_cpu is not None else ""))
+    if "execution_s" in usage:
+        parts.append(f"exécution {usage['execution_s']:.3f}s")
+    if "execution_cpu_s" in usage:
+        parts.append(f"CPU {usage['execution_cpu_s']:.3f}s")
+    if "rss_max_ko" in usage:
+        parts.append(f"mémoire max {usage['rss_max_ko'] / 1024:.1f} Mo")
+    if "unites_recompilees" in usage:
+        parts.append(f"{usage['unites_recompilees']} recompilé(s), {usage.get('unites_en_cache', 0)} en cache")
+    return ", ".join(parts)
+
+# États renvoyés par STATUS pour un job asynchrone fini (voir Server/resultats.py)
+FINISHED_STATES = ("termine", "annule", "expire")
+
+
+def request_until_free(host, port, request, timeout=10.0, max_wait=30.0, delay=0.2):
+    """
+    Requête courte (STATUS, FETCH) réessayée avec un délai croissant tant que le
+    serveur répond occupé, pendant au plus `max_wait` secondes. Retourne la dernière réponse.
+    """
+    deadline = time.monotonic() + max_wait
+    while True:
+        response = send_request(host, port, request, timeout)
+        if not is_busy(response) or time.monotonic() + delay > deadline:
+            return response
+        time.sleep(delay)
+        delay = min(delay * 2, 5.0)
+
+
+def job_status(host, port, job_id, timeout=10.0):
+    """État d'un job asynchrone (STATUS|<job_id>) : en_file, en_cours, termine, ..."""
+    response = request_until_free(host, port, f"STATUS|{job_id}", timeout)
+    if not response.startswith("STATUT:"):
+        raise RuntimeError(response.strip())
+    return response.split(":", 1)[1].strip()
+
+
+def submit_async(host, port, language, filename, code, timeout=10.0, job_id=None,
+                 poll=0.2, max_wait=300.0, trace_id=None):
+    """
+    Soumet en mode asynchrone (SUBMIT), attend la fin par STATUS puis retourne la
+    sortie (FETCH). Lève socket.timeout si le job n'est pas fini après `max_wait`.
+    """
+    prefix = job_options(job_id, trace_id)
+    response = send_request(host, port, f"SUBMIT|{prefix}{language}|{filename}|{code}", timeout)
+    if not response.startswith("OK:"):
+        return response    # occupé ou erreur : traité comme une réponse synchrone
+    job_id = response.split(":", 1)[1].strip()
+
+    deadline = time.monotonic() + max_wait
+    delay = poll
+    # Job inconnu (expiré, maître redémarré) : le FETCH renvoie l'erreur sans attendre
+    while job_status(host, port, job_id, timeout) not in FINISHED_STATES + ("inconnu",):
+        if time.monotonic() >= deadline:
+            raise socket.timeout(f"job non terminé après {max_wait:g}s")
+        time.sleep(delay)
+        delay = min(delay * 1.5, 2.0)
+    return request_until_free(host, port, f"FETCH|{job_id}", timeout)
+
+# =========================
+# Séries de charge (tableau de bord)
+# =========================
+
+def admin_request(host, port, subcommand, timeout=10.0):
+    """Commande ADMIN|[TOKEN=..|]<sous-commande> (jeton pris dans ADMIN_TOKEN s'il est défini)."""
+    token = os.environ.get("ADMIN_TOKEN", "").strip()
+    prefix = f"ADMIN|TOKEN={token}|" if token else "ADMIN|"
+    return send_request(host, port, prefix + subcommand, timeout)
+
+
+def fetch_series(host, port, since=0.0, timeout=10.0):
+    """
+    Échantillons de charge du maître postérieurs à `since` (horodatage du serveur) :
+    (liste de dicts ts/running/queued/slaves/..., intervalle d'échantillonnage en s).
+    """
+    response = admin_request(host, port, f"GET_SERIES|{since}", timeout)
+    if not response.startswith("OK:"):
+        raise RuntimeError(response.strip())
+    data = json.loads(response[3:])
+    return [dict(zip(data["fields"], row)) for row in data["samples"]], data["interval"]
+
+
+def format_sample(sample):
+    """Ligne lisible d'un échantillon de charge."""
+    def seconds(value):
+        return f"{value:.3f}s" if value is not None else "-"
+    cpu = f"{sample['cpu']:.0%}" if sample.get("cpu") is not None else "-"
+    return (f"{time.strftime('%H:%M:%S', time.localtime(sample['ts']))}  "
+            f"en cours {sample['running']}/{sample['max_tasks']}  en file {sample['queued']}  "
+            f"esclaves {sample['slaves']}/{sample['max_slaves']}  {sample['jobs_s']:.1f} jobs/s  "
+            f"p50 {seconds(sample['p50'])}  p90 {seconds(sample['p90'])}  p99 {seconds(sample['p99'])}  "
+            f"CPU {cpu}")
+
+
+def watch_series(host, port, timeout=10.0, history=10):
+    """Affiche les `history` derniers échantillons puis chaque nouveau, jusqu'à Ctrl+C."""
+    samples, interval = fetch_series(host, port, 0.0, timeout)
+    samples = samples[-history:]
+    since = samples[-1]["ts"] if samples else 0.0
+    while True:
+        for sample in samples:
+            print(format_sample(sample), flush=True)
+        if samples:
+            since = samples[-1]["ts"]
+        time.sleep(interval)
+        samples, interval = fetch_series(host, port, since, timeout)
+
+# =========================
+# Projets multi-fichiers
+# =========================
+
+def content_hash(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def send_project(host, port, language, main, manifest, timeout=10.0, job_id=None, trace_id=None):
+    """Envoie une requête PROJECT (manifeste JSON déjà sérialisé) et retourne la réponse."""
+    prefix = job_options(job_id, trace_id)
+    body = f"{prefix}{language}|{main}|{manifest}".encode('utf-8')
+    return send_request(host, port, f"{PROJECT_PREFIX}SIZE={len(body)}|".encode('utf-8') + body, timeout)
+
+
+def collect_project(directory):
+    """Fichiers texte d'un projet : {chemin relatif a/b.c : contenu}. Fichiers cachés et binaires ignorés."""
+    files = {}
+    for root, dirs, names in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d != "__pycache__")
+        for name in sorted(names):
+            full = os.path.join(root, name)
+            if name.startswith(".") or os.path.getsize(full) > PROJECT_MAX_FILE_BYTES:
+                continue
+            try:
+                with open(full, 'r', encoding='utf-8', newline="") as f:
+                    content = f.read()
+            except (OSError, UnicodeDecodeError):
+                continue
+            files[os.path.relpath(full, directory).replace(os.sep, "/")] = content
+    return files
+
+
+def find_main(files):
+    """Fichier principal probable d'un projet (main.c, Main.java, ... ou le seul qui définit main)."""
+    for name in ("main.c", "main.cpp", "main.cc", "main.py", "Main.java", "__main__.py"):
+        matches = [p for p in files if p.rsplit("/", 1)[-1] == name]
+        if len(matches) == 1:
+            return matches[0]
+    markers = ("int main(", "int main (", "static void main(", "__name__ == \"__main__\"")
+    candidates = [p for p, c in files.items() if detect_language(p) and any(m in c for m in markers)]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def _hash_cache_path(host, port):
+    return os.path.join(HASH_CACHE_DIR, f"empreintes_{host}_{port}.json")
+
+
+def load_known_hashes(host, port):
+    try:
+        with open(_hash_cache_path(host, port), encoding='utf-8') as f:
+            return set(json.load(f))
+    except (OSError, ValueError, TypeError):
+        return set()
+
+
+def save_known_hashes(host, port, known):
+    with suppress(OSError):
+        os.makedirs(HASH_CACHE_DIR, exist_ok=True)
+        path = _hash_cache_path(host, port)
+        with open(path + ".tmp", "w", encoding='utf-8') as f:
+            json.dump(sorted(known)[-MAX_KNOWN_HASHES:], f)
+        os.replace(path + ".tmp", path)
+
+
+def submit_project(host, port, language, main, files, timeout=10.0, job_id=None, known=None,
+                   trace_id=None):
+    """
+    Soumet un projet {chemin: contenu}. Les fichiers dont l'empreinte est dans `known`
+    (déjà envoyés à ce serveur) partent par empreinte ; si le serveur ne les a plus,
+    il répond MANQUANT et ils sont renvoyés en entier. `known` est mis à jour.
+    Retourne (réponse, nombre de fichiers envoyés en entier, nombre envoyés par empreinte).
+    """
+    if known is None:
+        known = set()
+    hashes = {path: content_hash(content) for path, content in files.items()}
+    for _ in range(2):
+        entries = {path: ({"hash": hashes[path]} if hashes[path] in known else {"content": files[path]})
+                   for path in sorted(files)}
+        by_hash = sum(1 for entry in entries.values() if "hash" in entry)
+        response = send_project(host, port, language, main, json.dumps({"files": entries}), timeout, job_id,
+                                trace_id)
+        if not response.startswith(MISSING_PREFIX):
+            break
+        known.difference_update(response[len(MISSING_PREFIX):].split())
+    if not response.startswith(MISSING_PREFIX):
+        known.update(hashes.values())
+    return response, len(files) - by_hash, by_hash
+
+
+def run_project(host, port, directory, main=None, language=None, timeout=10.0, retries=3, backoff=0.5):
+    """
+    Envoie un répertoire comme projet et retourne un dictionnaire prêt pour JSON
+    (sortie, ressources, fichiers envoyés en entier / par empreinte).
+    """
+    files = collect_project(directory)
+    main = main or find_main(files)
+    language = language or (detect_language(main) if main else None)
+    record = {"project": directory, "main": main, "language": language, "files": len(files)}
+    if main not in files:
+        record.update(status="error", error="fichier principal introuvable (préciser --main)",
+                      attempts=0, latency_s=None)
+        return record
+    if language is None:
+        record.update(status="error", error="langage inconnu", attempts=0, latency_s=None)
+        return record
+
+    known = load_known_hashes(host, port)
+    # Même trace pour chaque tentative
+    trace_id = uuid.uuid4().hex
+    attempts = 0
+    t0 = time.perf_counter()
+    while True:
+        attempts += 1
+        job_id = uuid.uuid4().hex
+        try:
+            response, sent, by_hash = submit_project(host, port, language, main, files, timeout, job_id, known,
+                                                       trace_id)
+        except Exception as e:
+            status, response, error = "error", None, str(e)
+            break
+        status, error = ("busy" if is_busy(response) else "ok"), None
+        if status != "busy" or attempts > retries:
+            break
+        time.sleep(backoff * (2 ** (attempts - 1)))
+    save_known_hashes(host, port, known)
+
+    record.update(status=status, attempts=attempts, job_id=job_id, trace_id=trace_id,
+                  latency_s=round(time.perf_counter() - t0, 6))
+    if error is not None:
+        record["error"] = error
+    if response is not None:
+        output, usage = split_usage(response)
+        record.update(output=output, files_sent=sent, files_by_hash=by_hash)
+        if usage is not None:
+            record["resources"] = usage
+    return record
+
+# =========================
+# Soumission en masse
+# =========================
+
+# Jobs envoyés dont la réponse n'est pas encore arrivée (annulés sur Ctrl+C)
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def cancel_in_flight():
+    """Annule côté serveur tous les jobs encore en attente de réponse."""
+    with _in_flight_lock:
+        pending = list(_in_flight.items())
+    for job_id, (host, port) in pending:
+        try:
+            cancel(host, port, job_id)
+        except Exception:
+            pass
+    return len(pending)
+
+
+def collect_files(paths):
+    """Développe les répertoires et ne garde que les fichiers d'un langage connu."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                for name in sorted(names):
+                    full = os.path.join(root, name)
+                    if detect_language(full):
+                        files.append(full)
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            print(f"[ATTENTION] Chemin introuvable ignoré : {path}", file=sys.stderr)
+    return files
+
+
+def run_job(host, port, path, language=None, timeout=10.0, retries=3, backoff=0.5,
+            async_mode=False, max_wait=300.0):
+    """
+    Exécute un fichier sur le serveur, en réessayant tant que la réponse est "occupé".
+    En mode asynchrone, `max_wait` borne l'attente du résultat.
+    Retourne un dictionnaire prêt à être sérialisé en JSON.
+    """
+    language = language or detect_language(path)
+    record = {"file": path, "language": language}
+    if language is None:
+        record.update(status="error", error="langage inconnu", attempts=0, latency_s=None)
+        return record
+
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            code = f.read()
+    except OSError as e:
+        record.update(status="error", error=str(e), attempts=0, latency_s=None)
+        return record
+
+    # Une trace pour toutes les tentatives : à passer à analyse_traces.py --trace
+    trace_id = uuid.uuid4().hex
+    attempts = 0
+    t0 = time.perf_counter()
+    while True:
+        attempts += 1
+        job_id = uuid.uuid4().hex
+        with _in_flight_lock:
+            _in_flight[job_id] = (host, port)
+        try:
+            if async_mode:
+                response = submit_async(host, port, language, os.path.basename(path), code,
+                                        timeout, job_id, max_wait=max_wait, trace_id=trace_id)
+            else:
+                response = submit(host, port, language, os.path.basename(path), code, timeout, job_id,
+                                  trace_id)
+        except socket.timeout as e:
+            # Abandon : inutile de laisser le serveur finir ce job
+            status, response, error = "error", None, f"timeout ({e})"
+            with suppress(Exception):
+                cancel(host, port, job_id)
+        except Exception as e:
+            status, response, error = "error", None, str(e)
+        else:
+            status, error = ("busy" if is_busy(response) else "ok"), None
+        finally:
+            with _in_flight_lock:
+                _in_flight.pop(job_id, None)
+
+        if status != "busy" or attempts > retries:
+            break
+        # Attente exponentielle avant de réessayer
+        time.sleep(backoff * (2 ** (attempts - 1)))
+
+    record.update(status=status, attempts=attempts, job_id=job_id, trace_id=trace_id,
+                  latency_s=round(time.perf_counter() - t0, 6))
+    if error is not None:
+        record["error"] = error
+    if response is not None:
+        output, usage = split_usage(response)
+        record["output"] = output
+        if usage is not None:
+            record["resources"] = usage
+    return record
+
+
+def run_batch(host, port, paths, concurrency=4, language=None, timeout=10.0,
+              retries=3, backoff=0.5, async_mode=False, max_wait=300.0):
+    """
+    Soumet plusieurs fichiers avec au plus `concurrency` connexions simultanées.
+    Générateur : rend les résultats dans l'ordre de fin d'exécution.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [pool.submit(run_job, host, port, path, language, timeout, retries, backoff,
+                               async_mode, max_wait)
+                   for path in paths]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        except BaseException:
+            # Interruption : ne pas lancer les fichiers restants et libérer le serveur
+            for future in futures:
+                future.cancel()
+            cancel_in_flight()
+            raise
+
+# =========================
+# Statistiques
+# =========================
+
+def percentile(sorted_values, p):
+    """Percentile par interpolation linéaire sur une liste déjà triée."""
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def latency_stats(records, elapsed):
+    """Résumé des latences (secondes) et du débit des jobs terminés."""
+    latencies = sorted(r["latency_s"] for r in records if r.get("latency_s") is not None)
+    usages = [r["resources"] for r in records if r.get("resources")]
+    summary = {
+        "jobs": len(records),
+        "ok": sum(1 for r in records if r["status"] == "ok"),
+        "busy": sum(1 for r in records if r["status"] == "busy"),
+        "errors": sum(1 for r in records if r["status"] == "error"),
+        "retries": sum(max(0, r.get("attempts", 0) - 1) for r in records),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_jobs_s": round(len(records) / elapsed, 3) if elapsed > 0 else None,
+    }
+    if latencies:
+        summary.update(
+            latency_mean_s=round(sum(latencies) / len(latencies), 6),
+            latency_min_s=latencies[0],
+            latency_p50_s=round(percentile(latencies, 50), 6),
+            latency_p90_s=round(percentile(latencies, 90), 6),
+            latency_p99_s=round(percentile(latencies, 99), 6),
+            latency_max_s=latencies[-1],
+        )
+    if usages:
+        summary.update(
+            cpu_total_s=round(sum(u.get("execution_cpu_s", 0.0) + u.get("compilation_cpu_s", 0.0)
+                                  for u in usages), 4),
+            rss_max_ko=max(u.get("rss_max_ko", 0) for u in usages),
+        )
+    return summary
+
+# =========================
+# Point d'entrée
+# =========================
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Soumet des fichiers au serveur maître et écrit les résultats en JSON (une ligne par job).")
+    parser.add_argument("paths", nargs="*", help="fichiers ou répertoires à soumettre")
+    parser.add_argument("--host", default="127.0.0.1", help="IP du serveur maître")
+    parser.add_argument("--port", type=int, default=5000, help="port du serveur maître")
+    parser.add_argument("-j", "--concurrency", type=int, default=4,
+                        help="nombre de connexions simultanées (défaut : 4)")
+    parser.add_argument("--language", choices=sorted(set(EXTENSIONS.values())),
+                        help="forcer le langage (sinon déduit de l'extension)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="timeout réseau par requête (s)")
+    parser.add_argument("--retries", type=int, default=3,
+                        help="nombre de nouvelles tentatives si le serveur est occupé")
+    parser.add_argument("--backoff", type=float, default=0.5,
+                        help="attente initiale entre deux tentatives (s), doublée à chaque essai")
+    parser.add_argument("--no-output", action="store_true",
+                        help="ne pas inclure la sortie des programmes dans les lignes JSON")
+    parser.add_argument("--async", dest="async_mode", action="store_true",
+                        help="soumission asynchrone (SUBMIT puis STATUS/FETCH), sans connexion ouverte pendant le job")
+    parser.add_argument("--max-wait", type=float, default=300.0,
+                        help="attente max du résultat d'un job asynchrone (s)")
+    parser.add_argument("--cancel", metavar="JOB_ID", action="append",
+                        help="annuler un job en cours par son identifiant (répétable)")
+    parser.add_argument("--project", metavar="DIR",
+                        help="envoyer ce répertoire comme un seul projet multi-fichiers (recompilation incrémentale)")
+    parser.add_argument("--main", help="fichier principal du projet, relatif à --project (sinon deviné)")
+    parser.add_argument("--dashboard", action="store_true",
+                        help="suivre en continu les séries de charge du maître (Ctrl+C pour quitter)")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.dashboard:
+        try:
+            watch_series(args.host, args.port, args.timeout)
+        except KeyboardInterrupt:
+            return 0
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"[ERREUR] Séries de charge indisponibles : {e}", file=sys.stderr)
+            return 1
+
+    if args.cancel:
+        for job_id in args.cancel:
+            try:
+                print(cancel(args.host, args.port, job_id, args.timeout))
+            except Exception as e:
+                print(f"[ERREUR] Annulation de {job_id} impossible : {e}", file=sys.stderr)
+        if not args.paths and not args.project:
+            return 0
+
+    if args.project:
+        record = run_project(args.host, args.port, args.project, args.main, args.language,
+                             args.timeout, args.retries, args.backoff)
+        if args.no_output:
+            record = {k: v for k, v in record.items() if k != "output"}
+        print(json.dumps(record, ensure_ascii=False), flush=True)
+        return 0 if record["status"] == "ok" else 1
+
+    if not args.paths:
+        parser.error("au moins un fichier ou répertoire est requis")
+
+    files = collect_files(args.paths)
+    if not files:
+        print("[ERREUR] Aucun fichier à soumettre.", file=sys.stderr)
+        return 2
+
+    records = []
+    t0 = time.perf_counter()
+    try:
+        for record in run_batch(args.host, args.port, files, args.concurrency, args.language,
+                                args.timeout, args.retries, args.backoff,
+                                args.async_mode, args.max_wait):
+            records.append(record)
+            if args.no_output:
+                record = {k: v for k, v in record.items() if k != "output"}
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+    except KeyboardInterrupt:
+        print("[INTERRUPTION] Jobs en cours annulés côté serveur.", file=sys.stderr)
+        return 130
+
+    summary = latency_stats(records, time.perf_counter() - t0)
+    print(json.dumps({"summary": summary}, ensure_ascii=False), flush=True)
+    return 0 if summary["ok"] == summary["jobs"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
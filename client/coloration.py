@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Tokeniseur de coloration syntaxique, indépendant de Qt.
+
+Pour chaque langage, une seule expression régulière combinée (groupes nommés)
+découpe une ligne en jetons. Les constructions multi-lignes (chaînes triples
+Python, commentaires /* */) sont gérées par un état de fin de ligne, que
+QSyntaxHighlighter conserve par bloc : seul le texte modifié (et les lignes
+dont l'état change en cascade) est recoloré.
+"""
+
+import re
+
+# =========================
+# Définition des langages
+# =========================
+_C_KEYWORDS = [
+    "auto", "break", "case", "const", "continue", "default", "do", "else", "enum",
+    "extern", "for", "goto", "if", "inline", "register", "restrict", "return",
+    "sizeof", "static", "struct", "switch", "typedef", "union", "volatile", "while",
+]
+_C_TYPES = [
+    "char", "double", "float", "int", "long", "short", "signed", "unsigned", "void",
+    "bool", "size_t", "FILE", "NULL", "true", "false",
+]
+_CPP_KEYWORDS = _C_KEYWORDS + [
+    "alignas", "alignof", "catch", "class", "constexpr", "const_cast", "decltype",
+    "delete", "dynamic_cast", "explicit", "export", "friend", "mutable", "namespace",
+    "new", "noexcept", "operator", "private", "protected", "public", "reinterpret_cast",
+    "static_assert", "static_cast", "template", "this", "throw", "try", "typeid",
+    "typename", "using", "virtual", "override", "final",
+]
+_CPP_TYPES = _C_TYPES + ["auto", "nullptr", "std", "string", "vector", "map", "wchar_t"]
+
+LANGUAGES = {
+    "Python": {
+        "keywords": [
+            "False", "None", "True", "and", "as", "assert", "async", "await", "break",
+            "class", "continue", "def", "del", "elif", "else", "except", "finally", "for",
+            "from", "global", "if", "import", "in", "is", "lambda", "nonlocal", "not",
+            "or", "pass", "raise", "return", "try", "while", "with", "yield",
+        ],
+        "types": [
+            "print", "len", "range", "int", "float", "str", "list", "dict", "set",
+            "tuple", "bool", "open", "input", "enumerate", "zip", "map", "filter",
+            "sorted", "sum", "min", "max", "abs", "isinstance", "super", "self",
+        ],
+        "line_comment": r"#",
+        "multiline": [('"""', '"""'), ("'''", "'''")],
+        "decorator": r"@[\w.]+",
+    },
+    "C": {
+        "keywords": _C_KEYWORDS,
+        "types": _C_TYPES,
+        "line_comment": r"//",
+        "multiline": [("/*", "*/")],
+        "preprocessor": r"^\s*#\s*\w+",
+    },
+    "C++": {
+        "keywords": _CPP_KEYWORDS,
+        "types": _CPP_TYPES,
+        "line_comment": r"//",
+        "multiline": [("/*", "*/")],
+        "preprocessor": r"^\s*#\s*\w+",
+    },
+    "Java": {
+        "keywords": [
+            "abstract", "assert", "break", "case", "catch", "class", "const", "continue",
+            "default", "do", "else", "enum", "extends", "final", "finally", "for", "goto",
+            "if", "implements", "import", "instanceof", "interface", "native", "new",
+            "package", "private", "protected", "public", "return", "static", "strictfp",
+            "super", "switch", "synchronized", "this", "throw", "throws", "transient",
+            "try", "var", "volatile", "while", "record", "yield",
+        ],
+        "types": [
+            "boolean", "byte", "char", "double", "float", "int", "long", "short", "void",
+            "String", "Object", "System", "Integer", "Math", "true", "false", "null",
+        ],
+        "line_comment": r"//",
+        "multiline": [("/*", "*/")],
+        "decorator": r"@\w+",
+    },
+}
+
+# Types de jetons produits (la vue associe un format à chacun)
+TOKEN_KINDS = ("keyword", "type", "string", "comment", "number", "preprocessor", "decorator")
+
+# =========================
+# Tokeniseur
+# =========================
+class Tokenizer:
+    """
+    Découpe une ligne en jetons (début, longueur, type) à partir de l'état de la
+    ligne précédente. État 0 : normal ; état k > 0 : dans la construction
+    multi-ligne n° k (chaîne triple ou commentaire bloc) non refermée.
+    """
+
+    def __init__(self, spec):
+        self._multiline = spec.get("multiline", [])
+        self._ml_kinds = []
+        self._ml_closers = []
+        groups = []
+
+        # Ouvreurs multi-lignes en premier pour qu'ils priment sur les chaînes simples
+        for i, (opener, closer) in enumerate(self._multiline):
+            groups.append(f"(?P<ml{i}>{re.escape(opener)})")
+            self._ml_kinds.append("string" if opener[0] in "'\"" else "comment")
+            self._ml_closers.append(re.compile(re.escape(closer)))
+
+        if spec.get("preprocessor"):
+            groups.append(f"(?P<preprocessor>{spec['preprocessor']})")
+        groups.append(f"(?P<comment>{spec['line_comment']}.*)")
+        groups.append(r"""(?P<string>"[^"\\]*(?:\\.[^"\\]*)*"?|'[^'\\]*(?:\\.[^'\\]*)*'?)""")
+        if spec.get("decorator"):
+            groups.append(f"(?P<decorator>{spec['decorator']})")
+        groups.append(r"(?P<number>\b(?:0[xX][0-9a-fA-F_]+|\d[\d_]*\.?\d*(?:[eE][+-]?\d+)?)[lLfFuU]*\b)")
+        groups.append(r"(?P<keyword>\b(?:" + "|".join(map(re.escape, spec["keywords"])) + r")\b)")
+        groups.append(r"(?P<type>\b(?:" + "|".join(map(re.escape, spec["types"])) + r")\b)")
+        self._pattern = re.compile("|".join(groups))
+
+    def _close_multiline(self, text, start, pos, index, tokens):
+        """
+        Cherche la fin de la construction multi-ligne `index` à partir de `pos` et
+        ajoute le jeton commençant à `start`. Retourne (position suivante, état).
+        """
+        match = self._ml_closers[index].search(text, pos)
+        kind = self._ml_kinds[index]
+        if match is None:
+            tokens.append((start, len(text) - start, kind))
+            return len(text), index + 1
+        tokens.append((start, match.end() - start, kind))
+        return match.end(), 0
+
+    def tokenize(self, text, state=0):
+        """Retourne (liste de (début, longueur, type), état de fin de ligne)."""
+        tokens = []
+        pos = 0
+        if state > 0:
+            pos, state = self._close_multiline(text, 0, 0, state - 1, tokens)
+            if state:
+                return tokens, state
+
+        search = self._pattern.search
+        while True:
+            match = search(text, pos)
+            if match is None:
+                return tokens, 0
+            kind = match.lastgroup
+            if kind.startswith("ml"):
+                pos, state = self._close_multiline(text, match.start(), match.end(), int(kind[2:]), tokens)
+                if state:
+                    return tokens, state
+                continue
+            start, pos = match.span()
+            tokens.append((start, pos - start, kind))
+
+
+_TOKENIZERS = {}
+
+
+def get_tokenizer(language):
+    """Tokeniseur (mis en cache) du langage ; Python par défaut si inconnu."""
+    if language not in LANGUAGES:
+        language = "Python"
+    tokenizer = _TOKENIZERS.get(language)
+    if tokenizer is None:
+        tokenizer = _TOKENIZERS[language] = Tokenizer(LANGUAGES[language])
+    return tokenizer
+
+
+def tokenize_lines(lines, language):
+    """Tokenise un texte complet ligne par ligne (utilisé par le benchmark)."""
+    tokenizer = get_tokenizer(language)
+    state = 0
+    states = []
+    result = []
+    for line in lines:
+        tokens, state = tokenizer.tokenize(line, state)
+        result.append(tokens)
+        states.append(state)
+    return result, states
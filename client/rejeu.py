@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rejeu d'une capture de trafic du maître (ADMIN SET_CAPTURE|on, ou CAPTURE=1).
+
+Les requêtes sont renvoyées dans le même ordre, avec les mêmes sources, en
+respectant les écarts d'arrivée enregistrés divisés par --speed (1 = temps réel,
+10 = dix fois plus vite, max = sans attente). Les latences et le débit du
+rejeu sont ensuite comparés à ceux de l'exécution enregistrée.
+
+Exemples :
+    python rejeu.py captures/capture_20260101_120000.jsonl
+    python rejeu.py capture.jsonl --speed 5 --port 5001
+    python rejeu.py capture.jsonl --speed max --json > comparaison.json
+    python rejeu.py captures/capture_20260101_120000_*.jsonl   # MASTER_WORKERS > 1
+"""
+
+import sys
+import json
+import time
+import uuid
+import socket
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from client_cli import submit, submit_async, send_project, is_busy, percentile
+
+
+# =========================
+# Lecture de la capture
+# =========================
+
+def load_capture(paths):
+    """
+    Retourne (sources par empreinte, requêtes triées par arrivée, résultats par job).
+    Plusieurs fichiers (un par processus maître) sont fusionnés en un seul flux.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    sources, requests, results = {}, [], {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue    # dernière ligne tronquée (capture en cours)
+                kind = event.get("t")
+                if kind == "src":
+                    sources[event["h"]] = event["code"]
+                elif kind == "req":
+                    requests.append(event)
+                elif kind == "res":
+                    results[event["id"]] = event
+    requests = [r for r in requests if r["h"] in sources]
+    requests.sort(key=lambda r: r["ts"])
+    return sources, requests, results
+
+
+# =========================
+# Rejeu
+# =========================
+
+def replay_one(host, port, request, code, timeout):
+    """Renvoie une requête capturée (même mode sync/async/projet) ; retourne le résultat mesuré."""
+    job_id = uuid.uuid4().hex
+    t0 = time.perf_counter()
+    try:
+        if request.get("mode") == "projet":
+            # Source capturée = manifeste complet du projet
+            response = send_project(host, port, request["lang"], request["file"], code, timeout, job_id)
+        elif request.get("mode") == "async":
+            response = submit_async(host, port, request["lang"], request["file"], code,
+                                    timeout, job_id, max_wait=timeout)
+        else:
+            response = submit(host, port, request["lang"], request["file"], code, timeout, job_id)
+        status = "occupe" if is_busy(response) else "ok"
+    except (OSError, socket.timeout, RuntimeError):
+        status = "erreur"
+    return {"id": request["id"], "status": status, "latency_s": time.perf_counter() - t0}
+
+
+def replay(host, port, sources, requests, speed=1.0, max_inflight=256, timeout=60.0):
+    """
+    Rejoue les requêtes ; `speed` None = au plus vite. Retourne (résultats, durée totale).
+    Au plus `max_inflight` requêtes sont en cours en même temps.
+    """
+    results = []
+    lock = threading.Lock()
+
+    def run(request):
+        result = replay_one(host, port, request, sources[request["h"]], timeout)
+        with lock:
+            results.append(result)
+
+    if not requests:
+        return results, 0.0
+    ts0 = requests[0]["ts"]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, max_inflight)) as pool:
+        for request in requests:
+            if speed:
+                delay = (request["ts"] - ts0) / speed - (time.perf_counter() - t0)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(run, request)
+    return results, time.perf_counter() - t0
+
+
+# =========================
+# Comparaison
+# =========================
+
+def summarize(latencies, statuses, elapsed):
+    latencies = sorted(latencies)
+    summary = {
+        "jobs": len(statuses),
+        "ok": statuses.count("ok"),
+        "occupe": statuses.count("occupe"),
+        "erreurs": len(statuses) - statuses.count("ok") - statuses.count("occupe"),
+        "duree_s": round(elapsed, 3),
+        "debit_jobs_s": round(len(statuses) / elapsed, 3) if elapsed > 0 else None,
+    }
+    if latencies:
+        summary.update(
+            latence_moy_s=round(sum(latencies) / len(latencies), 4),
+            latence_p50_s=round(percentile(latencies, 50), 4),
+            latence_p90_s=round(percentile(latencies, 90), 4),
+            latence_p99_s=round(percentile(latencies, 99), 4),
+            latence_max_s=round(latencies[-1], 4),
+        )
+    return summary
+
+
+def recorded_summary(requests, results):
+    """Résumé de l'exécution enregistrée (requêtes sans résultat ignorées)."""
+    done = [results[r["id"]] for r in requests if r["id"] in results]
+    if not done:
+        return summarize([], [], 0.0)
+    elapsed = max(r["ts"] for r in done) - requests[0]["ts"]
+    return summarize([r["lat"] for r in done if r["status"] == "ok"], [r["status"] for r in done], elapsed)
+
+
+def replay_summary(results, elapsed):
+    """Résumé du rejeu ; comme pour l'enregistrement, latences des jobs réussis seulement."""
+    return summarize([r["latency_s"] for r in results if r["status"] == "ok"],
+                     [r["status"] for r in results], elapsed)
+
+
+def compare(recorded, replayed):
+    """Écart relatif rejeu / enregistré pour chaque mesure numérique commune."""
+    diff = {}
+    for key, before in recorded.items():
+        after = replayed.get(key)
+        if isinstance(before, (int, float)) and isinstance(after, (int, float)) and before:
+            diff[key] = round((after - before) / before, 4)
+    return diff
+
+
+def print_report(recorded, replayed, diff):
+    print(f"{'mesure':<16} {'enregistré':>12} {'rejeu':>12} {'écart':>9}")
+    for key in list(recorded) + [k for k in replayed if k not in recorded]:
+        before, after = recorded.get(key, "-"), replayed.get(key, "-")
+        change = f"{diff[key]:+.1%}" if key in diff else ""
+        print(f"{key:<16} {before!s:>12} {after!s:>12} {change:>9}")
+
+
+# =========================
+# Point d'entrée
+# =========================
+
+def parse_speed(value):
+    if value.lower() == "max":
+        return None
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("la vitesse doit être > 0 (ou max)")
+    return speed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rejoue une capture de trafic contre un maître.")
+    parser.add_argument("capture", nargs="+",
+                        help="fichier(s) de capture (.jsonl, un par processus maître)")
+    parser.add_argument("--host", default="127.0.0.1", help="IP du serveur maître")
+    parser.add_argument("--port", type=int, default=5000, help="port du serveur maître")
+    parser.add_argument("--speed", type=parse_speed, default=1.0,
+                        help="facteur d'accélération (1 = temps réel, N, ou max)")
+    parser.add_argument("--max-inflight", type=int, default=256,
+                        help="requêtes simultanées au maximum")
+    parser.add_argument("--timeout", type=float, default=60.0, help="timeout par requête (s)")
+    parser.add_argument("--json", action="store_true", help="écrire la comparaison en JSON")
+    args = parser.parse_args(argv)
+
+    sources, requests, results = load_capture(args.capture)
+    if not requests:
+        print("[ERREUR] Aucune requête dans la capture.", file=sys.stderr)
+        return 2
+
+    speed_label = "max" if args.speed is None else f"{args.speed:g}x"
+    print(f"[REJEU] {len(requests)} requêtes, {len(sources)} sources distinctes, vitesse {speed_label}",
+          file=sys.stderr)
+    replayed_results, elapsed = replay(args.host, args.port, sources, requests, args.speed,
+                                       args.max_inflight, args.timeout)
+
+    recorded = recorded_summary(requests, results)
+    replayed = replay_summary(replayed_results, elapsed)
+    diff = compare(recorded, replayed)
+    if args.json:
+        print(json.dumps({"vitesse": speed_label, "enregistre": recorded, "rejeu": replayed,
+                          "ecart": diff}, ensure_ascii=False, indent=2))
+    else:
+        print_report(recorded, replayed, diff)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Zone de résultats pour de grosses sorties.
+
+ - QPlainTextEdit en lecture seule, alimenté en ajout seulement
+ - Historique borné (nombre de lignes max) : les plus anciennes sont supprimées
+ - Les morceaux reçus sont regroupés et affichés périodiquement (pas de
+   re-mise en page à chaque recv)
+ - Recherche dans la sortie
+ - Option : sortie complète écrite dans un fichier temporaire, seule la fin
+   reste affichée ; le fichier est supprimé à la sortie suivante, à
+   l'effacement de la vue et à la fermeture de la fenêtre (remove_spill_file)
+"""
+
+import os
+import tempfile
+
+from PyQt6.QtWidgets import (
+    QWidget, QPlainTextEdit, QLineEdit, QPushButton, QCheckBox, QLabel,
+    QVBoxLayout, QHBoxLayout,
+)
+from PyQt6.QtCore import QTimer, QUrl
+from PyQt6.QtGui import QTextCursor, QTextDocument, QDesktopServices
+
+# Nombre de lignes conservées dans la vue (anneau)
+SCROLLBACK_LINES = 20_000
+# Avec sortie dans un fichier : seule la fin est affichée
+SPILL_SCROLLBACK_LINES = 2_000
+# Intervalle de rafraîchissement de la vue pendant la réception (ms)
+FLUSH_INTERVAL_MS = 50
+
+
+class ResultView(QWidget):
+    def __init__(self, font=None, parent=None):
+        super().__init__(parent)
+
+        self.text_edit = QPlainTextEdit()
+        self.text_edit.setReadOnly(True)
+        self.text_edit.setUndoRedoEnabled(False)
+        self.text_edit.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.text_edit.setMaximumBlockCount(SCROLLBACK_LINES)
+        if font is not None:
+            self.text_edit.setFont(font)
+
+        # Recherche
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Rechercher dans la sortie...")
+        self.search_edit.returnPressed.connect(self.find_next)
+        self.find_next_button = QPushButton("Suivant")
+        self.find_next_button.clicked.connect(self.find_next)
+        self.find_prev_button = QPushButton("Précédent")
+        self.find_prev_button.clicked.connect(self.find_previous)
+
+        # Sortie complète dans un fichier temporaire
+        self.spill_checkbox = QCheckBox("Sortie complète dans un fichier temporaire")
+        self.spill_label = QLabel()
+        self.open_spill_button = QPushButton("Ouvrir le fichier")
+        self.open_spill_button.clicked.connect(self.open_spill_file)
+        self.open_spill_button.setEnabled(False)
+
+        search_layout = QHBoxLayout()
+        search_layout.addWidget(self.search_edit)
+        search_layout.addWidget(self.find_prev_button)
+        search_layout.addWidget(self.find_next_button)
+
+        spill_layout = QHBoxLayout()
+        spill_layout.addWidget(self.spill_checkbox)
+        spill_layout.addWidget(self.spill_label, stretch=1)
+        spill_layout.addWidget(self.open_spill_button)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(search_layout)
+        layout.addWidget(self.text_edit)
+        layout.addLayout(spill_layout)
+        self.setLayout(layout)
+
+        self._pending = []
+        self._received = 0
+        self._spill_file = None
+        self.spill_path = None
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setInterval(FLUSH_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self._flush)
+
+    # ======================================================
+    #   Réception incrémentale
+    # ======================================================
+    def begin(self):
+        """Prépare la vue pour une nouvelle sortie."""
+        self.remove_spill_file()
+        self.text_edit.clear()
+        self._pending = []
+        self._received = 0
+        self.open_spill_button.setEnabled(False)
+        self.spill_label.clear()
+
+        if self.spill_checkbox.isChecked():
+            self._spill_file = tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", prefix="sortie_", suffix=".txt", delete=False)
+            self.spill_path = self._spill_file.name
+            self.text_edit.setMaximumBlockCount(SPILL_SCROLLBACK_LINES)
+        else:
+            self.text_edit.setMaximumBlockCount(SCROLLBACK_LINES)
+        self._flush_timer.start()
+
+    def append_chunk(self, text):
+        """Ajoute un morceau de sortie (affiché au prochain rafraîchissement)."""
+        self._received += len(text)
+        if self._spill_file is not None:
+            self._spill_file.write(text)
+        self._pending.append(text)
+
+    def finish(self):
+        """Fin de réception : dernier affichage et fermeture du fichier éventuel."""
+        self._flush_timer.stop()
+        self._flush()
+        if self._spill_file is not None:
+            self._close_spill()
+            self.spill_label.setText(f"{self._received:,} caractères → {self.spill_path}".replace(",", " "))
+            self.open_spill_button.setEnabled(True)
+
+    def _flush(self):
+        if not self._pending:
+            return
+        text = "".join(self._pending)
+        self._pending = []
+        cursor = QTextCursor(self.text_edit.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(text)
+        scrollbar = self.text_edit.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
+
+    def _close_spill(self):
+        if self._spill_file is not None:
+            try:
+                self._spill_file.close()
+            except OSError:
+                pass
+            self._spill_file = None
+
+    def remove_spill_file(self):
+        """Ferme et supprime le fichier de la sortie précédente (s'il existe)."""
+        self._close_spill()
+        if self.spill_path is not None:
+            try:
+                os.remove(self.spill_path)
+            except OSError:
+                pass
+            self.spill_path = None
+            self.open_spill_button.setEnabled(False)
+
+    # ======================================================
+    #   Texte simple (commandes ADMIN, erreurs)
+    # ======================================================
+    def set_text(self, text):
+        self.clear()
+        self.text_edit.setMaximumBlockCount(SCROLLBACK_LINES)
+        self.text_edit.setPlainText(text)
+
+    def append_text(self, text):
+        """Ajoute un message en fin de sortie (erreur de réception, etc.)."""
+        self.append_chunk(text)
+        self._flush()
+
+    def clear(self):
+        self._flush_timer.stop()
+        self.remove_spill_file()
+        self._pending = []
+        self.text_edit.clear()
+        self.spill_label.clear()
+
+    # ======================================================
+    #   Recherche / fichier
+    # ======================================================
+    def find_next(self):
+        self._find(QTextDocument.FindFlag(0))
+
+    def find_previous(self):
+        self._find(QTextDocument.FindFlag.FindBackward)
+
+    def _find(self, flags):
+        needle = self.search_edit.text()
+        if not needle:
+            return
+        if not self.text_edit.find(needle, flags):
+            # Recherche circulaire : on repart du début (ou de la fin)
+            cursor = self.text_edit.textCursor()
+            backward = bool(flags & QTextDocument.FindFlag.FindBackward)
+            cursor.movePosition(QTextCursor.MoveOperation.End if backward else QTextCursor.MoveOperation.Start)
+            self.text_edit.setTextCursor(cursor)
+            self.text_edit.find(needle, flags)
+
+    def open_spill_file(self):
+        if self.spill_path and os.path.exists(self.spill_path):
+            QDesktopServices.openUrl(QUrl.fromLocalFile(self.spill_path))
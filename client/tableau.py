@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Tableau de bord de charge du maître, mis à jour en direct.
+
+ - Interroge ADMIN GET_SERIES|<ts> toutes les POLL_INTERVAL_MS : seuls les
+   échantillons plus récents que le dernier reçu sont transférés
+ - Requête dans un QThread : l'interface ne se fige pas si le serveur tarde
+ - Courbes (QPainter, sans dépendance) sur les DASHBOARD_POINTS derniers
+   échantillons : tâches (avec MAX_TASKS), esclaves (avec MAX_SLAVES),
+   jobs/s, latences p50/p90/p99, CPU de la machine
+ - Les paliers de MAX_TASKS / MAX_SLAVES apparaissent sur les courbes : on voit
+   si un changement de réglage améliore le débit ou les latences
+"""
+
+from collections import deque
+
+from PyQt6.QtWidgets import QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QGridLayout
+from PyQt6.QtCore import Qt, QThread, QTimer, QPointF, pyqtSignal
+from PyQt6.QtGui import QPainter, QPen, QColor, QPolygonF
+
+from client_cli import fetch_series, format_sample
+
+# Intervalle d'interrogation du maître (ms)
+POLL_INTERVAL_MS = 1000
+# Nombre d'échantillons affichés (10 min à un échantillon par seconde)
+DASHBOARD_POINTS = 600
+
+
+class SeriesPoller(QThread):
+    """Une requête GET_SERIES depuis `since` ; résultat par signal."""
+    samples_received = pyqtSignal(list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, server_ip, server_port, since, parent=None):
+        super().__init__(parent)
+        self.server_ip = server_ip
+        self.server_port = server_port
+        self.since = since
+
+    def run(self):
+        try:
+            samples, _ = fetch_series(self.server_ip, self.server_port, self.since, timeout=5)
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.samples_received.emit(samples)
+
+
+class SeriesChart(QWidget):
+    """
+    Courbes d'un groupe de champs des échantillons. `curves` : liste de
+    (champ, couleur, libellé, pointillés). Échelle de 0 au maximum visible (ou `fixed_max`).
+    """
+    MARGIN = 6
+
+    def __init__(self, title, curves, unit="", scale=1.0, fixed_max=None, parent=None):
+        super().__init__(parent)
+        self.title = title
+        self.curves = curves
+        self.unit = unit
+        self.scale = scale
+        self.fixed_max = fixed_max
+        self.samples = []
+        self.setMinimumSize(320, 130)
+
+    def set_samples(self, samples):
+        self.samples = samples
+        self.update()
+
+    def _value(self, sample, field):
+        value = sample.get(field)
+        return None if value is None else value * self.scale
+
+    def _format(self, value):
+        if value is None:
+            return "-"
+        return f"{value:.3g}{self.unit}"
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        rect = self.rect().adjusted(self.MARGIN, self.MARGIN, -self.MARGIN, -self.MARGIN)
+        painter.fillRect(self.rect(), QColor("#FFFFFF"))
+
+        # Titre et légende (dernière valeur de chaque courbe)
+        last = self.samples[-1] if self.samples else {}
+        legend = "   ".join(f"{label} {self._format(self._value(last, field))}"
+                           for field, _, label, _ in self.curves)
+        painter.setPen(QColor("#000000"))
+        metrics = painter.fontMetrics()
+        painter.drawText(rect.left(), rect.top() + metrics.ascent(), f"{self.title}   {legend}")
+        plot = rect.adjusted(0, metrics.height() + 4, 0, 0)
+        painter.setPen(QColor("#CCCCCC"))
+        painter.drawRect(plot)
+        if len(self.samples) < 2 or plot.width() <= 0 or plot.height() <= 0:
+            painter.end()
+            return
+
+        values = [self._value(s, field) for s in self.samples for field, _, _, _ in self.curves]
+        values = [v for v in values if v is not None]
+        top = self.fixed_max if self.fixed_max is not None else max(values, default=0.0)
+        top = top * 1.1 if top > 0 else 1.0
+        painter.setPen(QColor("#888888"))
+        painter.drawText(plot.left() + 2, plot.top() + metrics.ascent(), self._format(top))
+
+        step = plot.width() / max(1, DASHBOARD_POINTS - 1)
+        x0 = plot.right() - step * (len(self.samples) - 1)
+        for field, color, _, dashed in self.curves:
+            pen = QPen(QColor(color), 1.5)
+            if dashed:
+                pen.setStyle(Qt.PenStyle.DashLine)
+            painter.setPen(pen)
+            # Une valeur absente (None) coupe la courbe
+            segment = QPolygonF()
+            for i, sample in enumerate(self.samples):
+                value = self._value(sample, field)
+                if value is None:
+                    if segment.size() > 1:
+                        painter.drawPolyline(segment)
+                    segment = QPolygonF()
+                    continue
+                y = plot.bottom() - min(1.0, value / top) * plot.height()
+                segment.append(QPointF(x0 + i * step, y))
+            if segment.size() > 1:
+                painter.drawPolyline(segment)
+        painter.end()
+
+
+class LoadDashboard(QWidget):
+    """Fenêtre du tableau de bord (interrogation incrémentale du maître)."""
+
+    def __init__(self, server_ip, server_port, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Tableau de bord - {server_ip}:{server_port}")
+        self.resize(900, 600)
+        self.server_ip = server_ip
+        self.server_port = server_port
+        self.samples = deque(maxlen=DASHBOARD_POINTS)
+        self.since = 0.0
+        self.poller = None
+
+        self.charts = [
+            SeriesChart("Tâches", [("running", "#1f77b4", "en cours", False),
+                                   ("queued", "#ff7f0e", "en file", False),
+                                   ("max_tasks", "#1f77b4", "MAX_TASKS", True)]),
+            SeriesChart("Esclaves", [("slaves", "#2ca02c", "actifs", False),
+                                     ("max_slaves", "#2ca02c", "MAX_SLAVES", True)]),
+            SeriesChart("Débit", [("jobs_s", "#9467bd", "jobs/s", False)]),
+            SeriesChart("Latence", [("p50", "#17becf", "p50", False),
+                                    ("p90", "#bcbd22", "p90", False),
+                                    ("p99", "#d62728", "p99", False)], unit="s"),
+            SeriesChart("CPU machine", [("cpu", "#8c564b", "utilisation", False)],
+                        unit="%", scale=100.0, fixed_max=100.0),
+        ]
+
+        self.status_label = QLabel("En attente des premiers échantillons...")
+        self.status_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.setCheckable(True)
+        self.pause_button.toggled.connect(self.toggle_pause)
+
+        grid = QGridLayout()
+        for i, chart in enumerate(self.charts):
+            grid.addWidget(chart, i // 2, i % 2)
+        bottom = QHBoxLayout()
+        bottom.addWidget(self.status_label, stretch=1)
+        bottom.addWidget(self.pause_button)
+        layout = QVBoxLayout()
+        layout.addLayout(grid)
+        layout.addLayout(bottom)
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start(POLL_INTERVAL_MS)
+        self.poll()
+
+    def poll(self):
+        # Une seule requête à la fois : si le maître tarde, on saute ce tour
+        if self.poller is not None:
+            return
+        self.poller = SeriesPoller(self.server_ip, self.server_port, self.since, self)
+        self.poller.samples_received.connect(self.on_samples)
+        self.poller.failed.connect(self.on_failed)
+        self.poller.finished.connect(self.on_poll_finished)
+        self.poller.start()
+
+    def on_samples(self, samples):
+        if not samples:
+            return
+        self.samples.extend(samples)
+        self.since = samples[-1]["ts"]
+        visible = list(self.samples)
+        for chart in self.charts:
+            chart.set_samples(visible)
+        self.status_label.setText(format_sample(samples[-1]))
+
+    def on_failed(self, message):
+        self.status_label.setText(f"Erreur (tableau de bord) : {message}")
+
+    def on_poll_finished(self):
+        self.poller.deleteLater()
+        self.poller = None
+
+    def toggle_pause(self, paused):
+        self.pause_button.setText("Reprendre" if paused else "Pause")
+        if paused:
+            self.timer.stop()
+        else:
+            self.timer.start(POLL_INTERVAL_MS)
+            self.poll()
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        if self.poller is not None:
+            self.poller.wait(5000)
+        super().closeEvent(event)
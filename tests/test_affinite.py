@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Tests du routage par affinité (Server/affinite.py) : anneau de hachage et charge bornée."""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Server"))
+
+from affinite import HashRing, AffinityStats, bounded_order, format_affinity
+
+SLAVES = [("127.0.0.1", port) for port in range(6001, 6005)]
+KEYS = [f"projet-{i}" for i in range(2000)]
+
+
+class HashRingTest(unittest.TestCase):
+    def test_empty_ring(self):
+        self.assertEqual(HashRing().preference("projet"), [])
+
+    def test_preference_lists_every_member_once(self):
+        ring = HashRing()
+        ring.update(SLAVES)
+        order = ring.preference("projet")
+        self.assertEqual(sorted(order), sorted(SLAVES))
+        self.assertEqual(order, ring.preference("projet"))
+
+    def test_update_only_when_members_change(self):
+        ring = HashRing()
+        self.assertTrue(ring.update(SLAVES))
+        self.assertFalse(ring.update(list(reversed(SLAVES))))
+        self.assertEqual(ring.changes, 1)
+
+    def test_keys_are_spread(self):
+        ring = HashRing()
+        ring.update(SLAVES)
+        homes = [ring.preference(key)[0] for key in KEYS]
+        for slave in SLAVES:
+            self.assertGreater(homes.count(slave), len(KEYS) / len(SLAVES) / 2)
+
+    def test_adding_a_slave_moves_only_its_keys(self):
+        ring = HashRing()
+        ring.update(SLAVES)
+        before = {key: ring.preference(key)[0] for key in KEYS}
+        new = ("127.0.0.1", 6005)
+        ring.update(SLAVES + [new])
+        moved = [key for key in KEYS if ring.preference(key)[0] != before[key]]
+        self.assertTrue(all(ring.preference(key)[0] == new for key in moved))
+        self.assertLess(len(moved), len(KEYS) * 0.35)   # ~1/5 attendu
+
+    def test_removing_a_slave_moves_to_next_in_ring(self):
+        ring = HashRing()
+        ring.update(SLAVES)
+        before = {key: ring.preference(key) for key in KEYS}
+        ring.update(SLAVES[1:])
+        for key, order in before.items():
+            expected = order[1] if order[0] == SLAVES[0] else order[0]
+            self.assertEqual(ring.preference(key)[0], expected)
+
+
+class BoundedOrderTest(unittest.TestCase):
+    def test_balanced_load_keeps_ring_order(self):
+        loads = {slave: 1 for slave in SLAVES}
+        self.assertEqual(bounded_order(SLAVES, loads, 1.25), SLAVES)
+
+    def test_overloaded_home_spills_to_next(self):
+        loads = {SLAVES[0]: 6, SLAVES[1]: 0, SLAVES[2]: 2, SLAVES[3]: 0}
+        # borne : ceil(1.25 * (8 + 1) / 4) = 3
+        self.assertEqual(bounded_order(SLAVES, loads, 1.25),
+                         [SLAVES[1], SLAVES[2], SLAVES[3], SLAVES[0]])
+
+    def test_members_over_bound_sorted_by_load(self):
+        loads = {SLAVES[0]: 9, SLAVES[1]: 5, SLAVES[2]: 0, SLAVES[3]: 0}
+        self.assertEqual(bounded_order(SLAVES, loads, 1.0),
+                         [SLAVES[2], SLAVES[3], SLAVES[1], SLAVES[0]])
+
+    def test_empty_preference(self):
+        self.assertEqual(bounded_order([], {}, 1.25), [])
+
+
+class AffinityStatsTest(unittest.TestCase):
+    def test_hits_and_spills(self):
+        stats = AffinityStats()
+        stats.record(SLAVES[0], SLAVES[0])
+        stats.record(SLAVES[0], SLAVES[1])
+        self.assertEqual(stats.get(SLAVES[0]), {"home": 2, "hits": 1, "spill_in": 0})
+        self.assertEqual(stats.get(SLAVES[1])["spill_in"], 1)
+        self.assertEqual(stats.totals(), (2, 1))
+        self.assertIn("affinité 1/2 (50%)", format_affinity(stats.get(SLAVES[0])))
+        stats.forget(SLAVES[0])
+        self.assertEqual(stats.totals(), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
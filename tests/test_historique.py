@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Tests de l'historique des durées (Server/historique.py) et de l'ordre SJF du maître."""
+
+import os
+import sys
+import heapq
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Server"))
+
+from historique import RuntimeHistory, source_digest, DEFAULT_ESTIMATES, EWMA_ALPHA
+
+
+class RuntimeHistoryTest(unittest.TestCase):
+    def test_estimate_origins(self):
+        history = RuntimeHistory()
+        digest = source_digest("Python", "print(1)\n")
+        self.assertEqual(history.estimate("Python", digest), DEFAULT_ESTIMATES["python"] + ("defaut",))
+        history.record("Python", digest, 0.0, 2.0)
+        self.assertEqual(history.estimate("Python", digest), (0.0, 2.0, "source"))
+        other = source_digest("Python", "print(2)\n")
+        self.assertEqual(history.estimate("Python", other)[2], "langage")
+
+    def test_ewma(self):
+        history = RuntimeHistory()
+        digest = source_digest("C", "int main(){}")
+        history.record("C", digest, 1.0, 1.0)
+        history.record("C", digest, 2.0, 3.0)
+        compile_s, run_s, _ = history.estimate("C", digest)
+        self.assertAlmostEqual(compile_s, 1.0 + EWMA_ALPHA * 1.0)
+        self.assertAlmostEqual(run_s, 1.0 + EWMA_ALPHA * 2.0)
+
+    def test_digest_depends_on_language(self):
+        self.assertNotEqual(source_digest("C", "x"), source_digest("C++", "x"))
+
+    def test_sources_bounded_lru(self):
+        history = RuntimeHistory(max_sources=2)
+        a, b, c = (source_digest("Python", code) for code in "abc")
+        history.record("Python", a, 0.0, 1.0)
+        history.record("Python", b, 0.0, 1.0)
+        history.estimate("Python", a)             # a redevient le plus récent
+        history.record("Python", c, 0.0, 1.0)
+        self.assertEqual(history.estimate("Python", a)[2], "source")
+        self.assertEqual(history.estimate("Python", b)[2], "langage")
+        self.assertEqual(history.stats()["sources"], 2)
+
+    def test_accuracy(self):
+        history = RuntimeHistory()
+        history.record("Python", "x", 0.0, 1.0, predicted=1.2, origin="defaut")
+        history.record("Python", "y", 0.0, 1.0, predicted=3.0, origin="langage")
+        acc = history.stats()["accuracy"]
+        self.assertEqual((acc["count"], acc["within_50"]), (2, 1))
+        self.assertAlmostEqual(acc["abs_error"], 2.2)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "historique.json")
+            history = RuntimeHistory(path=path)
+            digest = source_digest("Java", "class A {}")
+            history.record("Java", digest, 1.5, 0.5)
+            history.save(force=True)
+            reloaded = RuntimeHistory(path=path)
+            self.assertEqual(reloaded.estimate("Java", digest), (1.5, 0.5, "source"))
+
+
+class SjfOrderTest(unittest.TestCase):
+    """Clés de priority_key (server_maitre) dans une file de priorité."""
+
+    @classmethod
+    def setUpClass(cls):
+        import server_maitre
+        cls.maitre = server_maitre
+
+    def order(self, jobs):
+        queue = [(self.maitre.priority_key(estimate, since), name) for name, estimate, since in jobs]
+        heapq.heapify(queue)
+        return [heapq.heappop(queue)[1] for _ in range(len(queue))]
+
+    def test_shortest_first(self):
+        with mock.patch.object(self.maitre, "SCHEDULER", "sjf"), \
+                mock.patch.object(self.maitre, "SJF_AGING", 0.5):
+            jobs = [("long", 10.0, 100.0), ("court", 0.1, 101.0), ("moyen", 2.0, 102.0)]
+            self.assertEqual(self.order(jobs), ["court", "moyen", "long"])
+
+    def test_aging_lets_long_jobs_through(self):
+        with mock.patch.object(self.maitre, "SCHEDULER", "sjf"), \
+                mock.patch.object(self.maitre, "SJF_AGING", 0.5):
+            # 10 s d'estimation, mais arrivé 30 s plus tôt : 10 - 0.5 * 30 < 0.1
+            jobs = [("court", 0.1, 130.0), ("ancien", 10.0, 100.0)]
+            self.assertEqual(self.order(jobs), ["ancien", "court"])
+
+    def test_fifo(self):
+        with mock.patch.object(self.maitre, "SCHEDULER", "fifo"):
+            jobs = [("long", 10.0, 100.0), ("court", 0.1, 101.0)]
+            self.assertEqual(self.order(jobs), ["long", "court"])
+
+
+if __name__ == "__main__":
+    unittest.main()
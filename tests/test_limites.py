@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Tests des limites par client (Server/limites.py) : seau à jetons et connexions."""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Server"))
+
+from limites import ClientLimiter, RATE, CONNECTIONS, format_limiter_stats
+from partage import SharedState
+
+
+class Clock:
+    """Horloge monotone pilotée par le test."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenBucketTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch("limites.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_disabled_by_default(self):
+        limiter = ClientLimiter(rate=0, burst=50, max_connections=0)
+        for _ in range(1000):
+            self.assertIsNone(limiter.charge("10.0.0.1"))
+            self.assertIsNone(limiter.admit("10.0.0.1"))
+        self.assertEqual(limiter.rejected, {RATE: 0, CONNECTIONS: 0})
+
+    def test_burst_then_refill(self):
+        limiter = ClientLimiter(rate=2, burst=3, max_connections=0)
+        self.assertEqual([limiter.charge("10.0.0.1") for _ in range(4)], [None, None, None, RATE])
+        self.clock.now += 0.5      # un jeton de plus (2 par seconde)
+        self.assertIsNone(limiter.charge("10.0.0.1"))
+        self.assertEqual(limiter.charge("10.0.0.1"), RATE)
+        self.clock.now += 60       # le seau ne dépasse pas la rafale
+        self.assertEqual([limiter.charge("10.0.0.1") for _ in range(4)], [None, None, None, RATE])
+        self.assertEqual(limiter.rejected[RATE], 3)
+
+    def test_clients_are_independent(self):
+        limiter = ClientLimiter(rate=1, burst=1, max_connections=0)
+        self.assertIsNone(limiter.charge("10.0.0.1"))
+        self.assertEqual(limiter.charge("10.0.0.1"), RATE)
+        self.assertIsNone(limiter.charge("10.0.0.2"))
+        top = limiter.stats()["top"]
+        self.assertEqual([entry["client"] for entry in top], ["10.0.0.1"])
+        self.assertIn("10.0.0.1 : 1 refus (débit)", format_limiter_stats(limiter))
+
+    def test_configure_applies_to_existing_buckets(self):
+        limiter = ClientLimiter(rate=1, burst=1, max_connections=0)
+        self.assertIsNone(limiter.charge("10.0.0.1"))
+        limiter.configure(rate=0)
+        self.assertIsNone(limiter.charge("10.0.0.1"))
+
+
+class ConnectionLimitTest(unittest.TestCase):
+    def test_cap_and_release(self):
+        limiter = ClientLimiter(rate=0, burst=1, max_connections=2)
+        self.assertIsNone(limiter.admit("10.0.0.1"))
+        self.assertIsNone(limiter.admit("10.0.0.1"))
+        self.assertEqual(limiter.admit("10.0.0.1"), CONNECTIONS)
+        self.assertIsNone(limiter.admit("10.0.0.2"))
+        limiter.release("10.0.0.1")
+        self.assertIsNone(limiter.admit("10.0.0.1"))
+        st = limiter.stats()
+        self.assertEqual(st["connections"], 3)
+        self.assertEqual(st["admitted"], 4)
+        self.assertEqual(st["rejected"][CONNECTIONS], 1)
+
+    def test_release_of_unknown_client(self):
+        limiter = ClientLimiter(rate=0, burst=1, max_connections=1)
+        limiter.release("10.0.0.9")
+        self.assertEqual(limiter.stats()["clients"], 0)
+
+    def test_idle_clients_are_pruned_when_table_is_full(self):
+        limiter = ClientLimiter(rate=0, burst=1, max_connections=5, size=4)
+        for i in range(4):
+            limiter.admit(f"10.0.0.{i}")
+        limiter.release("10.0.0.0")
+        limiter.release("10.0.0.1")
+        self.assertIsNone(limiter.admit("10.0.0.9"))
+        st = limiter.stats()
+        self.assertEqual(st["clients"], 3)       # 2 clients connectés gardés + le nouveau
+        self.assertEqual(st["connections"], 3)
+
+
+class SharedLimiterTest(unittest.TestCase):
+    def test_limits_are_global_and_dead_worker_connections_are_returned(self):
+        state = SharedState(1, 1, [], shared=True, workers=2)
+        limiter = ClientLimiter(rate=0, burst=1, max_connections=2, state=state)
+        state.worker_index = 0
+        self.assertIsNone(limiter.admit("10.0.0.1"))
+        state.worker_index = 1
+        self.assertIsNone(limiter.admit("10.0.0.1"))
+        self.assertEqual(limiter.admit("10.0.0.1"), CONNECTIONS)
+        limiter.configure(max_connections=3)
+        state.worker_index = 0
+        self.assertEqual(limiter.max_connections, 3)
+        self.assertEqual(state.reap_worker(1, 0), 0)
+        self.assertEqual(limiter.stats()["connections"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
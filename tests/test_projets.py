@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""Tests du protocole des projets (Server/projets.py) : requête, manifeste, chemins, clé d'affinité."""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Server"))
+
+from projets import (ContentStore, PROJECT_PREFIX, content_hash, format_project_request,
+                     read_project_request, safe_project_path, resolve_project,
+                     project_manifest, project_affinity_key)
+
+
+class FakeSocket:
+    """Socket qui rend un flux d'octets par morceaux."""
+
+    def __init__(self, data, chunk=7):
+        self._data = data
+        self._chunk = chunk
+
+    def recv(self, size):
+        part, self._data = self._data[:min(size, self._chunk)], self._data[min(size, self._chunk):]
+        return part
+
+
+class ProjectRequestTest(unittest.TestCase):
+    def test_round_trip(self):
+        manifest = project_manifest({"main.c": "int main(){return 0;}\n"})
+        request = format_project_request("C", "main.c", manifest, options="JOB=abc|")
+        first, rest = request[:20], request[20:]
+        body = read_project_request(FakeSocket(rest), first)
+        self.assertEqual(body.decode('utf-8'), f"JOB=abc|C|main.c|{manifest}")
+
+    def test_invalid_header(self):
+        with self.assertRaises(ValueError):
+            read_project_request(FakeSocket(b""), PROJECT_PREFIX.encode() + b"TAILLE=3|abc")
+
+    def test_truncated_body(self):
+        with self.assertRaises(ValueError):
+            read_project_request(FakeSocket(b""), PROJECT_PREFIX.encode() + b"SIZE=10|abc")
+
+
+class ProjectPathTest(unittest.TestCase):
+    def test_accepted(self):
+        for path in ("main.c", "src/util.c", "include/a-b_c.h"):
+            self.assertEqual(safe_project_path(path), path)
+
+    def test_refused(self):
+        for path in ("../x.c", "a/../../x.c", "/etc/passwd", "./a.c", "a//b.c", "a b.c", "", None,
+                     "a" * 201):
+            self.assertIsNone(safe_project_path(path), path)
+
+
+class ResolveProjectTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = ContentStore(directory.name)
+
+    def test_contents_and_hashes(self):
+        header = "int f(void);\n"
+        known = self.store.put(header)
+        unknown = content_hash("absent\n")
+        manifest = json.dumps({"files": {
+            "main.c": {"content": "int main(){}\n"},
+            "f.h": {"hash": known},
+            "g.h": {"hash": unknown.upper()},
+        }})
+        files, missing = resolve_project(manifest, self.store)
+        self.assertEqual(files, {"main.c": "int main(){}\n", "f.h": header})
+        self.assertEqual(missing, [unknown])
+        # Les contenus reçus sont ajoutés au magasin
+        self.assertEqual(self.store.get(content_hash("int main(){}\n")), "int main(){}\n")
+
+    def test_invalid_manifests(self):
+        for manifest in ("pas du json", "[]", '{"files": {}}',
+                         '{"files": {"../x.c": {"content": ""}}}',
+                         '{"files": {"a.c": "int main(){}"}}',
+                         '{"files": {"a.c": {"hash": "1234"}}}'):
+            with self.assertRaises(ValueError, msg=manifest):
+                resolve_project(manifest, self.store)
+
+
+class AffinityKeyTest(unittest.TestCase):
+    def test_key_ignores_contents_and_order(self):
+        v1 = project_manifest({"main.c": "v1", "util.c": "a"})
+        v2 = json.dumps({"files": {"util.c": {"content": "b"}, "main.c": {"content": "v2"}}})
+        self.assertEqual(project_affinity_key("C", "main.c", v1), project_affinity_key("c", "main.c", v2))
+
+    def test_key_depends_on_language_main_and_paths(self):
+        manifest = project_manifest({"main.c": "", "util.c": ""})
+        key = project_affinity_key("C", "main.c", manifest)
+        self.assertNotEqual(key, project_affinity_key("C++", "main.c", manifest))
+        self.assertNotEqual(key, project_affinity_key("C", "util.c", manifest))
+        self.assertNotEqual(key, project_affinity_key("C", "main.c", project_manifest({"main.c": ""})))
+
+
+if __name__ == "__main__":
+    unittest.main()
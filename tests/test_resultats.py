@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Tests du stockage des résultats asynchrones (Server/resultats.py) : TTL et débordement."""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Server"))
+
+from resultats import ResultStore, PENDING, RUNNING, DONE, EXPIRED
+
+
+class Clock:
+    """Horloge murale pilotée par le test."""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ResultStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch("resultats.time.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lifecycle(self):
+        store = ResultStore(max_bytes=1000, ttl=60)
+        self.assertTrue(store.create("a"))
+        self.assertFalse(store.create("a"))
+        self.assertEqual(store.fetch("a"), (PENDING, None))
+        store.start("a")
+        self.assertEqual(store.status("a")["status"], RUNNING)
+        store.complete("a", b"sortie")
+        self.assertEqual(store.fetch("a"), (DONE, b"sortie"))
+        self.assertEqual(store.status("a")["size"], 6)
+        self.assertEqual(store.fetch("inconnu"), (None, None))
+
+    def test_ttl(self):
+        store = ResultStore(max_bytes=1000, ttl=60)
+        store.create("a")
+        store.complete("a", b"x")
+        self.clock.now += 59
+        self.assertIsNotNone(store.status("a"))
+        self.clock.now += 2
+        self.assertIsNone(store.status("a"))
+        st = store.stats()
+        self.assertEqual((st["expired"], st["memory_bytes"], st["entries"]), (1, 0, 0))
+
+    def test_pending_jobs_do_not_expire(self):
+        store = ResultStore(max_bytes=1000, ttl=60)
+        store.create("a")
+        self.clock.now += 3600
+        self.assertEqual(store.status("a")["status"], PENDING)
+
+    def test_eviction_without_spill(self):
+        store = ResultStore(max_bytes=10, ttl=60)
+        for job_id in "abc":
+            store.create(job_id)
+        store.complete("a", b"123456")
+        store.complete("b", b"123456")
+        self.assertEqual(store.fetch("a"), (EXPIRED, None))
+        self.assertEqual(store.fetch("b"), (DONE, b"123456"))
+        self.assertEqual(store.stats()["evicted"], 1)
+
+    def test_least_recently_fetched_is_evicted_first(self):
+        store = ResultStore(max_bytes=12, ttl=60)
+        for job_id in "abc":
+            store.create(job_id)
+        store.complete("a", b"123456")
+        store.complete("b", b"123456")
+        store.fetch("a")
+        store.complete("c", b"123456")
+        self.assertEqual(store.fetch("b"), (EXPIRED, None))
+        self.assertEqual(store.fetch("a"), (DONE, b"123456"))
+
+    def test_spill_to_disk_and_cleanup(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = ResultStore(max_bytes=10, ttl=60, spill_dir=directory)
+            for job_id in ("../a", "b"):
+                store.create(job_id)
+            store.complete("../a", b"123456")
+            store.complete("b", b"123456")
+            self.assertEqual(store.stats()["spilled"], 1)
+            spilled = os.listdir(directory)
+            self.assertEqual(len(spilled), 1)
+            self.assertTrue(spilled[0].startswith("resultat_"))   # nom indépendant de l'identifiant
+            self.assertEqual(store.fetch("../a"), (DONE, b"123456"))
+            self.clock.now += 61
+            self.assertIsNone(store.status("../a"))
+            self.assertEqual(os.listdir(directory), [])
+
+    def test_forget(self):
+        store = ResultStore(max_bytes=100, ttl=60)
+        store.create("a")
+        store.complete("a", b"xyz")
+        store.forget("a")
+        self.assertEqual(store.stats()["memory_bytes"], 0)
+        self.assertTrue(store.create("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Tests des séries de charge (Server/series.py) : tampon circulaire et histogramme des latences."""
+
+import os
+import sys
+import json
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Server"))
+
+from series import (TimeSeries, FIELDS, LATENCY_BUCKETS, LATENCY_MIN,
+                    latency_bucket, histogram_percentile)
+
+
+class TimeSeriesTest(unittest.TestCase):
+    def test_oldest_samples_are_overwritten(self):
+        series = TimeSeries(size=3, interval=1)
+        for ts in range(5):
+            series.add({"ts": float(ts)})
+        self.assertEqual(len(series), 3)
+        self.assertEqual([s["ts"] for s in series.since(0)], [2.0, 3.0, 4.0])
+
+    def test_since_is_strict(self):
+        series = TimeSeries(size=10, interval=1)
+        for ts in range(5):
+            series.add({"ts": float(ts)})
+        self.assertEqual([s["ts"] for s in series.since(2.0)], [3.0, 4.0])
+        self.assertEqual(series.since(4.0), [])
+
+    def test_to_json_columns(self):
+        series = TimeSeries(size=10, interval=1)
+        series.add({"ts": 1.0, "running": 2, "cpu": 0.5})
+        data = json.loads(series.to_json(since=0.0))
+        self.assertEqual(data["fields"], list(FIELDS))
+        self.assertEqual(len(data["samples"]), 1)
+        row = dict(zip(data["fields"], data["samples"][0]))
+        self.assertEqual((row["ts"], row["running"], row["cpu"], row["p50"]), (1.0, 2, 0.5, None))
+
+
+class LatencyHistogramTest(unittest.TestCase):
+    def test_bucket_bounds(self):
+        self.assertEqual(latency_bucket(0.0), 0)
+        self.assertEqual(latency_bucket(LATENCY_MIN), 0)
+        self.assertEqual(latency_bucket(1e9), LATENCY_BUCKETS - 1)
+        buckets = [latency_bucket(s) for s in (0.002, 0.01, 0.1, 1.0, 10.0)]
+        self.assertEqual(buckets, sorted(buckets))
+
+    def test_empty_histogram(self):
+        self.assertIsNone(histogram_percentile([0] * LATENCY_BUCKETS, 50))
+
+    def test_percentiles_within_bucket_precision(self):
+        counts = [0] * LATENCY_BUCKETS
+        latencies = [0.01] * 50 + [0.1] * 40 + [2.0] * 10
+        for latency in latencies:
+            counts[latency_bucket(latency)] += 1
+        for p, expected in ((50, 0.01), (90, 0.1), (99, 2.0)):
+            self.assertAlmostEqual(histogram_percentile(counts, p) / expected, 1.0, delta=0.2)
+
+    def test_interval_is_difference_of_snapshots(self):
+        before = [0] * LATENCY_BUCKETS
+        before[latency_bucket(5.0)] = 100
+        after = list(before)
+        after[latency_bucket(0.05)] += 10
+        interval = [a - b for a, b in zip(after, before)]
+        self.assertAlmostEqual(histogram_percentile(interval, 99) / 0.05, 1.0, delta=0.2)
+
+
+if __name__ == "__main__":
+    unittest.main()